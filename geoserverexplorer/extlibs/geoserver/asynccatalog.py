@@ -0,0 +1,328 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+import asyncio
+import functools
+import logging
+import time
+from geoserver.cache import response_validators
+from geoserver.catalog import (Catalog, FailedRequestError, ConflictingDataError, MissingDocuments,
+                               CircuitOpenError, _check_coveragestore, _name, _read_version)
+from geoserver.scheduler import carry_priority
+from geoserver.codec import document_url
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from past.builtins import basestring
+except ImportError:
+    pass
+
+logger = logging.getLogger("gsconfig.asynccatalog")
+
+
+class _Response(object):
+    '''the parts of a requests response that the catalog code reads'''
+
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+
+class AsyncCatalog(object):
+    """
+    Coroutine interface to a GeoServer catalog, for scripts that drive many
+    catalogs or make many independent requests: gathering coroutines of one
+    or several AsyncCatalog runs their requests concurrently.
+
+    An AsyncCatalog wraps a synchronous Catalog (`catalog`), which can be
+    passed instead of a service URL, and shares its object model, response
+    cache and index: the coroutines return the objects of that catalog, and
+    the synchronous catalog can keep being used alongside, from the QGIS GUI
+    for instance. Reading a property of a returned object that was not
+    fetched yet (Layer.resource, Resource.title, ...) is a blocking request
+    of the synchronous catalog.
+
+    The listing coroutines run the code of the synchronous catalog in
+    deferred mode (see Catalog.deferred): every time it needs documents that
+    are not fetched yet, they are fetched concurrently, at most `limit` at
+    once, and the code runs again.
+
+    Requests are made with aiohttp when it is installed. Otherwise, and for
+    catalogs with their own transport (such as the QGIS AuthCatalog), each
+    request runs the blocking http_request of the catalog in the default
+    executor of the event loop, retries included. aiohttp requests are
+    bounded by the timeout of the catalog and fail fast while its circuit
+    breaker is open, but are not retried. An AsyncCatalog must be used from
+    a single event loop, and closed when done.
+    """
+
+    def __init__(self, catalog, username="admin", password="geoserver", limit=20, **kwargs):
+        if isinstance(catalog, basestring):
+            catalog = Catalog(catalog, username, password, **kwargs)
+        self.catalog = catalog
+        self.limit = limit
+        self._session = None
+        self._semaphore = None
+        # url -> the task fetching it, shared by the coroutines that need it meanwhile
+        self._fetching = {}
+
+    @property
+    def service_url(self):
+        return self.catalog.service_url
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # requests
+
+    def _uses_aiohttp(self):
+        # subclasses with their own transport have their own authentication
+        klass = type(self.catalog)
+        return (aiohttp is not None and klass._send is Catalog._send
+                and klass.http_request is Catalog.http_request)
+
+    async def http_request(self, url, data=None, method='get', headers=None, timeout=None):
+        '''see Catalog.http_request, timeout defaults to the timeout of the catalog'''
+        headers = dict(headers or {})
+        timeout = timeout or self.catalog.timeout
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            if not self._uses_aiohttp():
+                loop = asyncio.get_event_loop()
+                call = functools.partial(self.catalog._call_until, time.time() + timeout,
+                                         carry_priority(self.catalog.http_request), url, data, method, headers)
+                return await loop.run_in_executor(None, call)
+            breaker = self.catalog.breaker
+            if not breaker.allow():
+                raise CircuitOpenError("{} keeps failing, not sending {} {}".format(self.service_url, method.upper(), url))
+            try:
+                resp = await self._aiohttp_request(url, data, method, headers, timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record(True)
+                raise FailedRequestError("{} {} failed: {}".format(method.upper(), url, e))
+            breaker.record(resp.status_code >= 500)
+            return resp
+
+    async def _aiohttp_request(self, url, data, method, headers, timeout):
+        catalog = self.catalog
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        params = None
+        auth = None
+        if catalog.access_token:
+            headers['Authorization'] = "Bearer {}".format(catalog.access_token)
+            params = {'access_token': catalog.access_token}
+        else:
+            auth = aiohttp.BasicAuth(catalog.username, catalog.password)
+        ssl = None if catalog.validate_ssl_certificate else False
+        async with self._session.request(method.upper(), url, data=data, headers=headers, params=params,
+                                         auth=auth, ssl=ssl, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            content = await resp.read()
+            return _Response(resp.status, content, resp.headers)
+
+    async def gsversion(self):
+        '''see Catalog.gsversion'''
+        if not self.catalog._version:
+            resp = await self.http_request("{}/about/version.xml".format(self.service_url))
+            self.catalog._version = _read_version(resp)
+        return self.catalog._version
+
+    async def get_xml(self, rest_url):
+        '''see Catalog.get_xml'''
+        return self.catalog._parsed(rest_url, await self.get_content(rest_url))
+
+    async def get_content(self, rest_url):
+        '''see Catalog.get_content'''
+        content = self.catalog._cache.get(rest_url)
+        if content is None:
+            status_code, content = await self._conditional_get(rest_url)
+            if status_code != 200:
+                raise FailedRequestError(content)
+        return content
+
+    async def _conditional_get(self, rest_url):
+        cache = self.catalog._cache
+        resp = await self.http_request(rest_url, headers=cache.conditional_headers(rest_url))
+        if resp.status_code == 304:
+            content = cache.revalidate(rest_url)
+            if content is not None:
+                return 200, content
+            resp = await self.http_request(rest_url)
+        if resp.status_code == 200:
+            etag, last_modified = response_validators(resp.headers)
+            cache.put(rest_url, resp.content, etag, last_modified)
+        return resp.status_code, resp.content
+
+    async def _fetch(self, url):
+        task = self._fetching.get(url)
+        if task is None:
+            task = self._fetching[url] = asyncio.ensure_future(self._fetch_once(url))
+            task.add_done_callback(lambda _: self._fetching.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_once(self, url):
+        try:
+            return await self.get_content(url), None
+        except FailedRequestError as e:
+            return None, e
+
+    async def _fetch_all(self, documents, urls):
+        urls = [url for url in set(urls) if url not in documents]
+        documents.update(zip(urls, await asyncio.gather(*[self._fetch(url) for url in urls])))
+
+    async def _run(self, call, *args, **kwargs):
+        '''
+        run a call of the synchronous catalog in deferred mode, fetching the
+        documents it asks for until it has them all. The documents dict can
+        be passed as a `documents` keyword to share it between calls
+        '''
+        documents = kwargs.pop("documents", {})
+        while True:
+            try:
+                with self.catalog.deferred(documents):
+                    return call(*args, **kwargs)
+            except MissingDocuments as e:
+                logger.debug("Fetching {} documents".format(len(e.urls)))
+                await self._fetch_all(documents, e.urls)
+
+    # listings
+
+    async def get_workspaces(self, names=None):
+        return await self._run(self.catalog.get_workspaces, names)
+
+    async def get_default_workspace(self):
+        return await self._run(self.catalog.get_default_workspace)
+
+    async def get_stores(self, names=None, workspaces=None):
+        return await self._run(self.catalog.get_stores, names, workspaces)
+
+    async def get_resources(self, names=None, stores=None, workspaces=None):
+        # the index lists resources differently depending on the version
+        await self.gsversion()
+        return await self._run(self.catalog.get_resources, names, stores, workspaces)
+
+    async def get_layer(self, name):
+        return await self._run(self.catalog.get_layer, name)
+
+    async def get_layers(self, resource=None):
+        await self.gsversion()
+        documents = {}
+        layers = await self._run(self.catalog.get_layers, documents=documents)
+        if resource is None:
+            return layers
+        # filtering reads the document of every layer, fetch them all at once
+        await self._fetch_all(documents, [document_url(layer.href, self.catalog.codec) for layer in layers])
+        return await self._run(self.catalog.get_layers, resource, documents=documents)
+
+    async def get_layergroups(self, names=None, workspaces=None):
+        return await self._run(self.catalog.get_layergroups, names, workspaces)
+
+    async def get_styles(self, names=None, workspaces=None):
+        return await self._run(self.catalog.get_styles, names, workspaces)
+
+    # changes
+
+    async def save(self, obj, content_type="application/xml"):
+        '''see Catalog.save'''
+        rest_url, data = await self._run(lambda: (obj.href, obj.message()))
+        headers = {
+            "Content-type": content_type,
+            "Accept": content_type
+        }
+        logger.debug("{} {}".format(obj.save_method, rest_url))
+        resp = await self.http_request(rest_url, data, obj.save_method.lower(), headers)
+        if resp.status_code not in (200, 201):
+            raise FailedRequestError('Failed to save to Geoserver catalog: {}, {}'.format(resp.status_code, resp.text))
+        self.catalog.invalidate(obj, obj.save_method)
+        return resp
+
+    async def delete(self, config_object, purge=None, recurse=False):
+        '''see Catalog.delete'''
+        rest_url = await self._run(self.catalog._delete_url, config_object, purge, recurse)
+        headers = {
+            "Content-type": "application/xml",
+            "Accept": "application/xml"
+        }
+        resp = await self.http_request(rest_url, method='delete', headers=headers)
+        if resp.status_code != 200:
+            raise FailedRequestError('Failed to make DELETE request: {}, {}'.format(resp.status_code, resp.text))
+        self.catalog.invalidate(config_object, "DELETE", recurse or bool(purge))
+        return resp
+
+    # uploads
+
+    async def _workspace_name(self, workspace):
+        if workspace is None:
+            workspace = await self.get_default_workspace()
+        return _name(workspace)
+
+    async def _send_upload(self, upload):
+        try:
+            resp = await self.http_request(upload.url, upload.data, upload.method, upload.headers,
+                                           self.catalog.upload_timeout)
+            if resp.status_code != 201:
+                raise FailedRequestError('{} : {}, {}'.format(upload.failure, resp.status_code, resp.text))
+            self.catalog._invalidate(upload.invalidation)
+        finally:
+            upload.close()
+        return resp
+
+    async def add_data_to_store(self, store, name, data, workspace=None, overwrite=False, charset=None):
+        '''see Catalog.add_data_to_store'''
+        if isinstance(store, basestring):
+            store = (await self.get_stores(names=store, workspaces=workspace))[0]
+        if workspace is not None:
+            workspace = _name(workspace)
+            assert store.workspace.name == workspace, "Specified store (%s) is not in specified workspace (%s)!" % (store, workspace)
+        else:
+            workspace = store.workspace.name
+        await self._send_upload(self.catalog._data_upload(store.name, name, data, workspace, overwrite, charset))
+
+    async def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None):
+        '''see Catalog.create_featurestore'''
+        workspace = await self._workspace_name(workspace)
+        if not overwrite and await self.get_stores(names=name, workspaces=workspace):
+            msg = "There is already a store named {} in workspace {}".format(name, workspace)
+            raise ConflictingDataError(msg)
+        await self._send_upload(self.catalog._featurestore_upload(name, data, workspace, charset))
+
+    async def create_imagemosaic(self, name, data, configure='first', workspace=None, overwrite=False, charset=None):
+        '''see Catalog.create_imagemosaic'''
+        workspace = await self._workspace_name(workspace)
+        if not overwrite and await self.get_stores(names=name, workspaces=workspace):
+            raise ConflictingDataError("There is already a store named {}".format(name))
+        await self._send_upload(self.catalog._imagemosaic_upload(name, data, configure, workspace, charset))
+        return (await self.get_stores(names=name, workspaces=workspace))[0]
+
+    async def create_coveragestore(self, name, workspace=None, path=None, type='GeoTIFF', create_layer=True,
+                                   layer_name=None, source_name=None):
+        '''see Catalog.create_coveragestore'''
+        _check_coveragestore(path, type)
+        workspace = await self._workspace_name(workspace)
+        await self.save(self.catalog._coveragestore(name, workspace, path, type))
+        if create_layer:
+            upload, href = self.catalog._coverage_upload(name, workspace, path, layer_name, source_name)
+            await self._send_upload(upload)
+            return self.catalog.index.from_href(href)
+        return (await self.get_stores(names=name, workspaces=workspace))[0]
@@ -0,0 +1,255 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+
+
+def response_validators(headers):
+    """Return the (ETag, Last-Modified) validators of a response's headers"""
+    found = dict((str(k).lower(), v) for k, v in (headers or {}).items())
+    return found.get("etag"), found.get("last-modified")
+
+
+class CacheEntry(object):
+    """A cached REST response, the time it was stored and its validators"""
+
+    def __init__(self, content, timestamp=None, etag=None, last_modified=None):
+        self.content = content
+        self.size = len(content)
+        self.timestamp = timestamp or datetime.now()
+        self.etag = etag
+        self.last_modified = last_modified
+        # loaded from the persistent store and not revalidated yet
+        self.preloaded = False
+        # the parsed content, shared by every reader and therefore read-only
+        self.tree = None
+
+
+class ResponseCache(object):
+    """
+    Bounded cache of REST responses, keyed by URL.
+
+    Entries older than `ttl` seconds are expired and are not returned, but
+    expired entries with an ETag or Last-Modified validator are kept so they
+    can be revalidated with a conditional GET instead of downloaded again.
+    The cache keeps at most `max_entries` responses and `max_bytes` bytes of
+    content, evicting the least recently used entries once either budget
+    is exceeded. Responses bigger than the whole byte budget are not cached.
+
+    An optional persistent `store` (see geoserver.diskcache) receives every
+    response put in the cache and every invalidation, and can be loaded back
+    with preload().
+
+    Callables in `watchers` are called with the URLs whose content was
+    replaced or dropped, or with None when the whole cache is cleared.
+    """
+
+    def __init__(self, ttl=5, max_entries=1000, max_bytes=32 * 1024 * 1024, store=None):
+        self.ttl = timedelta(seconds=float(ttl or 0))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self.watchers = []
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+
+    def __getstate__(self):
+        '''locks cannot be pickled'''
+        state = dict(vars(self))
+        state.pop('_lock')
+        state['watchers'] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def is_valid(self, entry):
+        return entry is not None and (entry.preloaded or datetime.now() - entry.timestamp < self.ttl)
+
+    def get(self, url, default=None):
+        '''return the cached content for url, or default if missing or expired'''
+        with self._lock:
+            entry = self._entries.get(url)
+            if not self.is_valid(entry):
+                if entry is not None and not (entry.etag or entry.last_modified):
+                    self._discard(url)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry.content
+
+    def conditional_headers(self, url):
+        '''the If-None-Match/If-Modified-Since headers to revalidate url with'''
+        with self._lock:
+            entry = self._entries.get(url)
+            headers = {}
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+            return headers
+
+    def revalidate(self, url):
+        '''
+        the server answered 304 Not Modified for url: restart the entry's TTL
+        and return its content, or None if the entry was evicted meanwhile
+        '''
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            entry.timestamp = datetime.now()
+            entry.preloaded = False
+            self._entries.move_to_end(url)
+            self.revalidations += 1
+            self.bytes_saved += entry.size
+            return entry.content
+
+    def parsed(self, url, content, parse):
+        '''
+        return parse(content), reusing the tree parsed for the cached entry
+        of url as long as that entry still holds the very same content
+        '''
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None or entry.content is not content:
+            return parse(content)
+        if entry.tree is None:
+            # concurrent readers may both parse, which is harmless
+            entry.tree = parse(content)
+        return entry.tree
+
+    def tree(self, url):
+        '''the tree parsed for the cached entry of url, None if there is none'''
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry.tree if entry is not None else None
+
+    def put(self, url, content, etag=None, last_modified=None):
+        with self._lock:
+            self._discard(url)
+            entry = CacheEntry(content, etag=etag, last_modified=last_modified)
+            if entry.size <= self.max_bytes:
+                self._entries[url] = entry
+                self.bytes += entry.size
+                evicted = self._evict()
+            else:
+                evicted = []
+        self._notify([url] + evicted)
+        if self.store is not None and entry.size <= self.max_bytes:
+            self.store.save(url, entry)
+
+    def preload(self):
+        '''
+        load the responses kept by the persistent store and return their URLs.
+        They are served regardless of the TTL until they are revalidated or
+        released, so the caller is expected to revalidate them.
+        '''
+        if self.store is None:
+            return []
+        rows = self.store.load()
+        with self._lock:
+            for url, content, etag, last_modified in rows:
+                if url in self._entries:
+                    continue
+                entry = CacheEntry(bytes(content), etag=etag, last_modified=last_modified)
+                entry.preloaded = True
+                self._entries[url] = entry
+                self.bytes += entry.size
+            evicted = self._evict()
+        if evicted:
+            self._notify(evicted)
+        return [row[0] for row in rows]
+
+    def release(self, urls):
+        '''let preloaded entries expire normally again'''
+        with self._lock:
+            for url in urls:
+                entry = self._entries.get(url)
+                if entry is not None:
+                    entry.preloaded = False
+
+    def pop(self, url, default=None):
+        with self._lock:
+            entry = self._discard(url)
+        self._notify([url])
+        if self.store is not None:
+            self.store.remove([url])
+        return entry.content if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        self._notify(None)
+        if self.store is not None:
+            self.store.purge()
+
+    def invalidate(self, urls=(), prefixes=()):
+        '''drop the given URLs and every URL starting with one of the prefixes'''
+        prefixes = tuple(prefixes)
+        with self._lock:
+            stale = [url for url in self._entries if url in urls or (prefixes and url.startswith(prefixes))]
+            for url in stale:
+                self._discard(url)
+            self.invalidations += len(stale)
+        self._notify(stale)
+        if self.store is not None:
+            self.store.remove(stale)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                entries = len(self._entries),
+                bytes = self.bytes,
+                hits = self.hits,
+                misses = self.misses,
+                evictions = self.evictions,
+                invalidations = self.invalidations,
+                revalidations = self.revalidations,
+                bytes_saved = self.bytes_saved
+            )
+
+    def _notify(self, urls):
+        for watcher in list(self.watchers):
+            watcher(urls)
+
+    def _discard(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            # let the catalog objects holding the tree weakly see that it is gone
+            entry.tree = None
+        return entry
+
+    def _evict(self):
+        '''drop the entries used least recently beyond the bounds, returns their URLs to notify'''
+        evicted = []
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            url = next(iter(self._entries))
+            self._discard(url)
+            self.evictions += 1
+            evicted.append(url)
+        return evicted
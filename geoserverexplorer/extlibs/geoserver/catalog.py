@@ -5,23 +5,34 @@ gsconfig is a python library for manipulating GeoServer via the GeoServer RESTCo
 The project is distributed under a MIT License .
 '''
 
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
 import logging
+import threading
+import time
+from geoserver.cache import ResponseCache, response_validators
+from geoserver.invalidation import Invalidation, object_invalidation, store_invalidation
+from geoserver.index import CatalogIndex
+from geoserver.identity import IdentityMap
 from geoserver.layer import Layer
 from geoserver.resource import FeatureType, Coverage
-from geoserver.store import (coveragestore_from_index, datastore_from_index,
-                             wmsstore_from_index, UnsavedDataStore,
-                             UnsavedCoverageStore, UnsavedWmsStore)
+from geoserver.store import UnsavedDataStore, UnsavedCoverageStore, UnsavedWmsStore
 from geoserver.style import Style
-from geoserver.support import prepare_upload_bundle, build_url, JDBCVirtualTable
-from geoserver.layergroup import LayerGroup, UnsavedLayerGroup
+from geoserver.support import prepare_upload_bundle, build_url, JDBCVirtualTable, ResourceInfo
+from geoserver.layergroup import UnsavedLayerGroup
 from geoserver.workspace import workspace_from_index, Workspace
 import os
-from xml.etree.ElementTree import XML
+from xml.etree.ElementTree import XML, ParseError
 from xml.parsers.expat import ExpatError
 import requests
-from requests.packages.urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from geoserver.pool import tuned_session, shared_session, release_session, session_stats
+from geoserver.retry import RetryPolicy, CircuitBreaker
+from geoserver.singleflight import SingleFlight
+from geoserver.scheduler import RequestScheduler, carry_priority, current_priority, BULK
+from geoserver.ratelimit import RateLimiter
+from geoserver.listing import iter_listing
+from geoserver.codec import CODECS, XML_CODEC, document_url
 
 try:
     from past.builtins import basestring
@@ -34,9 +45,39 @@ except ImportError:
     from urlparse import urlparse, parse_qsl
     from urllib import urlencode
 
+try:
+    from concurrent.futures import ThreadPoolExecutor, Future, wait
+except ImportError:
+    # without the futures backport, fan-outs run one request after another
+    ThreadPoolExecutor = None
+
 
 logger = logging.getLogger("gsconfig.catalog")
 
+_pool_lock = threading.Lock()
+_index_lock = threading.Lock()
+
+# the documents of the catalogs in deferred mode, per thread
+_deferred = threading.local()
+
+# the time by which the requests of the catalogs must be answered, per thread
+_deadlines = threading.local()
+
+# whether the thread, of the pool of a catalog, runs a call of a fan-out
+_pool_threads = threading.local()
+
+# failures worth sending a request again for, SSL errors are not
+_TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# the answers of a server asking for fewer requests
+_OVERLOADED = (429, 503)
+
+# uploads too large for their time to tell how busy the server is
+_LARGE_UPLOAD = 64 * 1024
+
+# the size of the parts of the listings parsed as they are downloaded
+_CHUNK_SIZE = 64 * 1024
+
 
 class UploadError(Exception):
     pass
@@ -54,6 +95,60 @@ class FailedRequestError(Exception):
     pass
 
 
+class CircuitOpenError(FailedRequestError):
+    """Raised instead of sending a request to a server that kept failing, see CircuitBreaker"""
+    pass
+
+
+class DeadlineExceeded(FailedRequestError):
+    """Raised when the deadline of a request is reached before it is answered, see Catalog.deadline"""
+    pass
+
+
+class MissingDocuments(Exception):
+    """Raised in deferred mode (see Catalog.deferred) with the URLs of the documents a call needs"""
+
+    def __init__(self, urls):
+        Exception.__init__(self, "{} documents are not fetched yet".format(len(urls)))
+        self.urls = urls
+
+
+class _Upload(object):
+    """
+    A request that uploads data into a store, the failure message to use if
+    it does not answer 201, the Invalidation of the cached responses it makes
+    stale, and the files to close or remove once it is sent
+    """
+
+    def __init__(self, url, method, data, headers, failure, invalidation, files=(), temporary=None):
+        self.url = url
+        self.method = method
+        self.data = data
+        self.headers = headers
+        self.failure = failure
+        self.invalidation = invalidation
+        self.files = files
+        self.temporary = temporary
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        if self.temporary is not None:
+            os.unlink(self.temporary)
+
+
+def _upload_size(data):
+    '''the number of bytes of the body of a request'''
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, str)):
+        return len(data)
+    try:
+        return os.fstat(data.fileno()).st_size - data.tell()
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
 def _name(named):
     """Get the name out of an object.  This varies based on the type of the input:
        * the "name" of a string is itself
@@ -70,6 +165,66 @@ def _name(named):
         raise ValueError("Can't interpret %s as a name or a configuration object" % named)
 
 
+def _read_version(resp):
+    '''the GeoServer version in an about/version.xml response'''
+    version = None
+    if resp.status_code == 200:
+        dom = XML(resp.content)
+        resources = dom.findall("resource")
+        for resource in resources:
+            if resource.attrib["name"] == "GeoServer":
+                try:
+                    version = resource.find("Version").text
+                    break
+                except:
+                    pass
+
+    # This will raise an exception if the catalog is not available
+    # If the catalog is available but could not return version information,
+    # it is an old version that does not support that
+    if version is None:
+        # just to inform that version < 2.3.x
+        version = "2.2.x"
+    return version
+
+
+def _check_coveragestore(path, type):
+    if path is None:
+        raise Exception('You must provide a full path to the raster')
+
+    allowed_types = [
+        'ImageMosaic',
+        'GeoTIFF',
+        'Gtopo30',
+        'WorldImage',
+        'AIG',
+        'ArcGrid',
+        'DTED',
+        'EHdr',
+        'ERDASImg',
+        'ENVIHdr',
+        'GeoPackage (mosaic)',
+        'NITF',
+        'RPFTOC',
+        'RST',
+        'VRT'
+    ]
+
+    if type is None:
+        raise Exception('Type must be declared')
+    elif type not in allowed_types:
+        raise Exception('Type must be one of {}'.format(", ".join(allowed_types)))
+
+
+def _names(names):
+    """Get a list of names out of None, a comma delimited string or an array"""
+    if names is None:
+        return []
+    elif isinstance(names, basestring):
+        return [s.strip() for s in names.split(',') if s.strip()]
+    return names
+
+
 class Catalog(object):
     """
     The GeoServer catalog represents all of the information in the GeoServer
@@ -83,46 +238,212 @@ class Catalog(object):
     - Maps, which provide a set of OWS services with a subset of the server's
         Layers
     - Namespaces, which provide unique identifiers for resources
+
+    A catalog can be used from several threads at once, from QgsTasks for
+    instance: its response cache and index are locked, and every thread has
+    its own HTTP session over the shared connection pool. The catalog
+    objects it returns share what they read with the ones returned before
+    (see identities), but each call returns objects of its own.
     """
 
-    def __init__(self, service_url, username="admin", password="geoserver", validate_ssl_certificate=True, access_token=None):
+    def __init__(self, service_url, username="admin", password="geoserver", validate_ssl_certificate=True, access_token=None,
+                 cache_time=5, cache_max_entries=1000, cache_max_bytes=32 * 1024 * 1024, max_workers=4,
+                 pool_size=10, pool_block=False, keep_alive=True, idle_timeout=None, share_session=False,
+                 timeout=30, upload_timeout=600, max_requests=10, priority_limits=None,
+                 rate_limit=None, upload_rate_limit=None, codec="json"):
         self.service_url = service_url.strip("/")
         self.username = username
         self.password = password
         self.validate_ssl_certificate = validate_ssl_certificate
         self.access_token = access_token
+        self._setup(cache_time, cache_max_entries, cache_max_bytes, max_workers, pool_size, pool_block, keep_alive,
+                    idle_timeout, share_session, timeout, upload_timeout, max_requests, priority_limits,
+                    rate_limit, upload_rate_limit, codec)
+
+    def _setup(self, cache_time=5, cache_max_entries=1000, cache_max_bytes=32 * 1024 * 1024, max_workers=4,
+               pool_size=10, pool_block=False, keep_alive=True, idle_timeout=None, share_session=False,
+               timeout=30, upload_timeout=600, max_requests=10, priority_limits=None,
+               rate_limit=None, upload_rate_limit=None, codec="json"):
+        '''
+        set up everything but the server and credentials, see __init__. For
+        subclasses with their own constructor, which must call it as well
+        '''
+        # the connections kept open to the server, see geoserver.pool.TunedAdapter
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.share_session = share_session
+        # seconds to answer a request, retries included, unless a deadline says otherwise
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.retry = RetryPolicy()
+        # the number of requests sent at once, in all and per priority class, see geoserver.scheduler
+        self.max_requests = max_requests
+        self.priority_limits = priority_limits
         self.setup_connection()
-
-        self._cache = {}
+        self.scheduler = RequestScheduler(max_requests, priority_limits)
+        # how fast bulk requests are sent, in requests and uploaded bytes per second
+        self.limiter = RateLimiter(rate_limit, upload_rate_limit)
+        # the representation catalog objects are read in, see get_document
+        self.codec = CODECS[codec]
+
+        self._cache = ResponseCache(cache_time, cache_max_entries, cache_max_bytes)
+        self._flights = SingleFlight()
         self._version = None
+        # the number of requests made at once when listing every workspace
+        self.max_workers = max_workers
 
     def __getstate__(self):
         '''http connection cannot be pickled'''
         state = dict(vars(self))
         state.pop('http', None)
         state['http'] = None
+        state.pop('client', None)
+        state.pop('breaker', None)
+        state.pop('scheduler', None)
+        state.pop('_index', None)
+        state.pop('_identities', None)
+        state.pop('_pool', None)
         return state
 
     def __setstate__(self, state):
         '''restore http connection upon unpickling'''
         self.__dict__.update(state)
         self.setup_connection()
+        self.scheduler = RequestScheduler(self.max_requests, self.priority_limits)
 
     def setup_connection(self):
-        self.client = requests.session()
-        self.client.verify = self.validate_ssl_certificate
-        parsed_url = urlparse(self.service_url)
-        retry = Retry(
-            total = 6,
-            status = 6,
-            backoff_factor = 0.9,
-            status_forcelist = [502, 503, 504],
-            method_whitelist = set(['HEAD', 'TRACE', 'GET', 'PUT', 'POST', 'OPTIONS', 'DELETE'])
+        options = dict(
+            validate_ssl_certificate = self.validate_ssl_certificate,
+            pool_size = self.pool_size,
+            pool_block = self.pool_block,
+            keep_alive = self.keep_alive,
+            idle_timeout = self.idle_timeout
         )
+        if self.share_session:
+            self.client = shared_session(self.service_url, self.username, **options)
+        else:
+            self.client = tuned_session(self.service_url, **options)
+        # whether close() has the client to close or give back
+        self._connected = True
+        self.breaker = CircuitBreaker(self._probe)
+
+    def _probe(self):
+        '''whether the server answers, for the circuit breaker'''
+        url = "{}/about/version.xml".format(self.service_url)
+        return self._send(url, None, 'get', {}, self.timeout).status_code < 500
+
+    def close(self):
+        '''
+        stop the background work of the catalog, the probes of its circuit
+        breaker and its fan-out threads, and close its connections, or give
+        back its session if it is shared (see share_session). It can still
+        send requests, over new connections
+        '''
+        self.breaker.close()
+        with _pool_lock:
+            pool, size = getattr(self, "_pool", (None, 0))
+            self._pool = (None, 0)
+            connected = self.__dict__.pop("_connected", False)
+        if pool is not None:
+            pool.shutdown(wait=False)
+        if connected:
+            if self.share_session:
+                release_session(self.client)
+            else:
+                self.client.close()
 
-        self.client.mount("{}://".format(parsed_url.scheme), HTTPAdapter(max_retries=retry))
+    def connection_stats(self):
+        '''
+        the number of connections opened, reused and discarded by the
+        session of the catalog, which may be shared (see share_session)
+        '''
+        client = getattr(self, "client", None)
+        return session_stats(client, self.service_url) if client is not None else None
+
+    def http_request(self, url, data=None, method='get', headers = {}, stream=False):
+        '''
+        send a request, and send it again as the retry policy says after a
+        connection error or an answer such as 503, as long as its deadline is
+        not reached (see deadline). Streamed data is sent only once. Raises
+        CircuitOpenError instead of sending it while the server keeps failing.
+        Every attempt waits for a slot of the scheduler, in the priority class
+        of the calling thread (see geoserver.scheduler.priority). Bulk
+        requests are spaced out by the rate limiter first, which slows them
+        down further while the server is slow to answer them. With stream,
+        the body of the response is read as it is iterated over
+        '''
+        priority = current_priority()
+        size = _upload_size(data) if method.lower() in ("post", "put") else 0
+        if priority == BULK:
+            at = self._deadline_at()
+            if not self.limiter.wait(size, None if at is None else at - time.time()):
+                raise DeadlineExceeded("No time left to send {} {}, bulk requests are rate limited".format(
+                    method.upper(), url))
+        deadline = self._deadline_at() or time.time() + self.timeout
+        resend = not hasattr(data, "read")
+        attempt = 0
+        while True:
+            remaining = self._time_to_send(method, url, deadline)
+            if not self.scheduler.acquire(priority, remaining):
+                raise DeadlineExceeded("No time left to send {} {}, waiting for the {} requests before it".format(
+                    method.upper(), url, priority))
+            resp = None
+            sent = time.time()
+            try:
+                resp = self._send(url, data, method, headers, max(deadline - sent, 0.001), stream)
+            except requests.exceptions.SSLError:
+                raise
+            except _TRANSPORT_ERRORS as e:
+                error = e
+            finally:
+                self.scheduler.release(priority)
+            self._attempted(priority, size, sent, resp)
+            delay = self._retry_delay(attempt, resp, resend, deadline)
+            if delay is None:
+                if resp is None:
+                    raise FailedRequestError("{} {} failed: {}".format(method.upper(), url, error))
+                return resp
+            logger.debug("Sending {} {} again in {:.1f}s".format(method.upper(), url, delay))
+            time.sleep(delay)
+            attempt += 1
+
+    def _time_to_send(self, method, url, deadline):
+        '''
+        the seconds left to send a request by its deadline. Raises instead
+        if there are none, or while the server keeps failing
+        '''
+        if not self.breaker.allow():
+            raise CircuitOpenError("{} keeps failing, not sending {} {}".format(self.service_url, method.upper(), url))
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded("No time left to send {} {}".format(method.upper(), url))
+        return remaining
+
+    def _attempted(self, priority, size, sent, resp):
+        '''
+        tell the circuit breaker, and the rate limiter for bulk requests, how
+        an attempt sent at `sent` went, resp being None after a transport error
+        '''
+        if resp is None:
+            self.breaker.record(True)
+            return
+        self.breaker.record(resp.status_code >= 500)
+        if priority == BULK and size < _LARGE_UPLOAD:
+            self.limiter.record(time.time() - sent, resp.status_code in _OVERLOADED)
+
+    def _retry_delay(self, attempt, resp, resend, deadline):
+        '''the seconds to wait before sending a request again after an attempt, None if it is not sent again'''
+        retry = self.retry
+        if resp is not None and resp.status_code not in retry.statuses:
+            return None
+        delay = retry.delay(attempt, resp.headers if resp is not None else None)
+        if not resend or attempt >= retry.attempts or time.time() + delay >= deadline:
+            return None
+        return delay
 
-    def http_request(self, url, data=None, method='get', headers = {}):
+    def _send(self, url, data, method, headers, timeout, stream=False):
         req_method = getattr(self.client, method.lower())
 
         if self.access_token:
@@ -134,11 +455,76 @@ class Catalog(object):
             url = "{proto}://{address}{path}?{params}".format(proto=parsed_url.scheme, address=parsed_url.netloc,
                                                               path=parsed_url.path, params=params)
 
-            resp = req_method(url, headers=headers, data=data)
+            resp = req_method(url, headers=headers, data=data, timeout=timeout, stream=stream)
         else:
-            resp = req_method(url, headers=headers, data=data, auth=(self.username, self.password))
+            resp = req_method(url, headers=headers, data=data, auth=(self.username, self.password), timeout=timeout,
+                              stream=stream)
         return resp
 
+    def http_request_async(self, url, data=None, method='get', headers=None):
+        '''
+        send a request without waiting for it and return a Future of its
+        response, to be waited for with result(). The request is made by
+        http_request on the fan-out thread pool (see fan_out), or right
+        away from a thread of that pool
+        '''
+        headers = dict(headers or {})
+        pool = self._thread_pool()
+        if pool is None or getattr(_pool_threads, "active", False):
+            future = Future()
+            try:
+                future.set_result(self.http_request(url, data, method, headers))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return pool.submit(self._pooled_call, self._deadline_at(), carry_priority(self.http_request),
+                           url, data, method, headers)
+
+    def result(self, future, timeout=None):
+        '''
+        wait for the response of a future of http_request_async. Catalogs
+        with an event-driven transport run their event loop meanwhile
+        '''
+        return future.result(timeout)
+
+    @contextmanager
+    def deadline(self, seconds):
+        '''
+        Within the context, the requests of the calling thread, and of the
+        fan-outs it starts, must be answered in `seconds`, retries included,
+        or sooner if an enclosing deadline says so. Without a deadline, each
+        request has `timeout` seconds. Short deadlines suit interactive calls,
+        uploads get `upload_timeout` seconds.
+        '''
+        at = time.time() + seconds
+        enclosing = self._deadline_at()
+        with self._until(at if enclosing is None else min(at, enclosing)):
+            yield
+
+    @contextmanager
+    def _until(self, at):
+        catalogs = getattr(_deadlines, "catalogs", None)
+        if catalogs is None:
+            catalogs = _deadlines.catalogs = {}
+        previous = catalogs.get(id(self))
+        if at is not None:
+            catalogs[id(self)] = at
+        try:
+            yield
+        finally:
+            if previous is None:
+                catalogs.pop(id(self), None)
+            else:
+                catalogs[id(self)] = previous
+
+    def _deadline_at(self):
+        '''the time by which the requests of the calling thread must be answered, if any'''
+        return getattr(_deadlines, "catalogs", {}).get(id(self))
+
+    def _call_until(self, at, function, *args):
+        with self._until(at):
+            return function(*args)
+
     def about(self):
         '''return the about information as a formatted html'''
         about_url = self.service_url + "/about/version.html"
@@ -156,33 +542,30 @@ class Catalog(object):
         if self._version:
             return self._version
         url = "{}/about/version.xml".format(self.service_url)
-        resp = self.http_request(url)
-        version = None
-        if resp.status_code == 200:
-            dom = XML(resp.content)
-            resources = dom.findall("resource")
-            for resource in resources:
-                if resource.attrib["name"] == "GeoServer":
-                    try:
-                        version = resource.find("Version").text
-                        break
-                    except:
-                        pass
-
-        # This will raise an exception if the catalog is not available
-        # If the catalog is available but could not return version information,
-        # it is an old version that does not support that
-        if version is None:
-            # just to inform that version < 2.3.x
-            version = "2.2.x"
-        self._version = version
-        return version
+        self._version = _read_version(self.http_request(url))
+        return self._version
 
     def delete(self, config_object, purge=None, recurse=False):
         """
         send a delete request
         XXX [more here]
         """
+        rest_url = self._delete_url(config_object, purge, recurse)
+        headers = {
+            "Content-type": "application/xml",
+            "Accept": "application/xml"
+        }
+
+        resp = self.http_request(rest_url, method='delete', headers=headers)
+        if resp.status_code != 200:
+            raise FailedRequestError('Failed to make DELETE request: {}, {}'.format(resp.status_code, resp.text))
+
+        self.invalidate(config_object, "DELETE", recurse or bool(purge))
+
+        # do we really need to return anything other than None?
+        return (resp)
+
+    def _delete_url(self, config_object, purge, recurse):
         rest_url = config_object.href
         params = []
 
@@ -196,27 +579,376 @@ class Catalog(object):
 
         if params:
             rest_url = rest_url + "?" + "&".join(params)
+        return rest_url
+
+    @property
+    def index(self):
+        '''the CatalogIndex used to look up catalog objects by name and href'''
+        if getattr(self, "_index", None) is None:
+            with _index_lock:
+                if getattr(self, "_index", None) is None:
+                    self._index = CatalogIndex(self)
+        return self._index
+
+    @property
+    def identities(self):
+        '''the IdentityMap of what the catalog objects handed out have read, by href'''
+        if getattr(self, "_identities", None) is None:
+            with _index_lock:
+                if getattr(self, "_identities", None) is None:
+                    identities = IdentityMap()
+                    self._cache.watchers.append(identities.changed)
+                    self._identities = identities
+        return self._identities
+
+    @contextmanager
+    def deferred(self, documents):
+        '''
+        Within the context, and in the calling thread only, get_content and
+        get_xml serve the documents of the documents dict, a dict of
+        url -> (content, error) pairs, and raise MissingDocuments
+        for any other document instead of fetching it. The catalog index raises
+        it with every listing a walk needs at once. This is how AsyncCatalog
+        runs the code of this class: it fetches the missing documents its own
+        way and runs the call again.
+        '''
+        catalogs = getattr(_deferred, "catalogs", None)
+        if catalogs is None:
+            catalogs = _deferred.catalogs = {}
+        previous = catalogs.get(id(self))
+        catalogs[id(self)] = documents
+        try:
+            yield documents
+        finally:
+            if previous is None:
+                del catalogs[id(self)]
+            else:
+                catalogs[id(self)] = previous
 
-        headers = {
-            "Content-type": "application/xml",
-            "Accept": "application/xml"
-        }
+    def deferred_documents(self):
+        '''the documents dict if the calling thread is in deferred mode, None otherwise'''
+        return getattr(_deferred, "catalogs", {}).get(id(self))
 
-        resp = self.http_request(rest_url, method='delete', headers=headers)
-        if resp.status_code != 200:
-            raise FailedRequestError('Failed to make DELETE request: {}, {}'.format(resp.status_code, resp.text))
+    def fan_out(self, function, items):
+        '''
+        call function on every item, up to max_workers calls at once, and
+        return the results in the order of the items. Once every call is done,
+        the first exception raised, in that order, is raised again.
+        Fan-outs of the calls, which could wait forever for a thread of the
+        pool, call function on their items one after the other instead
+        '''
+        items = list(items)
+        pool = self._thread_pool() if len(items) > 1 else None
+        if pool is None or getattr(_pool_threads, "active", False):
+            return [function(item) for item in items]
+        at = self._deadline_at()
+        function = carry_priority(function)
+        futures = [pool.submit(self._pooled_call, at, function, item) for item in items]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def _pooled_call(self, at, function, *args):
+        '''_call_until on a thread of the pool, marked as such meanwhile'''
+        _pool_threads.active = True
+        try:
+            return self._call_until(at, function, *args)
+        finally:
+            _pool_threads.active = False
+
+    def _thread_pool(self):
+        workers = getattr(self, "max_workers", 1) or 1
+        if ThreadPoolExecutor is None or workers < 2:
+            return None
+        with _pool_lock:
+            pool, size = getattr(self, "_pool", (None, 0))
+            if size != workers:
+                if pool is not None:
+                    pool.shutdown(wait=False)
+                pool = ThreadPoolExecutor(max_workers=workers)
+                self._pool = (pool, workers)
+            return pool
+
+    def prefetch(self, objects, fields=()):
+        '''
+        fetch the documents of catalog objects concurrently, up to max_workers
+        at once (see fan_out), instead of one request after the other as they
+        are read. fields are attributes of the objects, such as "resource"
+        for layers, whose catalog objects are then prefetched as well.
+        Objects holding their document already are not fetched again.
+
+        Returns the (object, error) pairs of the objects that could not be
+        fetched, or whose fields could not be read. The others are ready, and
+        using the failed ones raises the error again.
+        '''
+        objects = list(objects)
+        failed = self._fetch_objects(objects)
+        broken = set(id(obj) for obj, _ in failed)
+        related = []
+        for obj in objects:
+            if id(obj) in broken:
+                continue
+            for field in fields:
+                try:
+                    value = getattr(obj, field)
+                except MissingDocuments:
+                    raise
+                except Exception as e:
+                    failed.append((obj, e))
+                    break
+                values = value if isinstance(value, (list, tuple)) else [value]
+                related.extend([v for v in values if isinstance(v, ResourceInfo)])
+        failed.extend(self._fetch_objects(related))
+        if failed:
+            logger.warning("Could not prefetch {} of {} catalog objects".format(len(failed), len(objects)))
+        return failed
+
+    def prefetched(self, objects, fields=(), batch=100):
+        '''
+        yield the objects, such as the layers of iter_layers, prefetched
+        (see prefetch) `batch` at a time, so that their documents are there
+        when they are used and are still in the response cache, however
+        many objects there are
+        '''
+        pending = []
+        for obj in objects:
+            pending.append(obj)
+            if len(pending) >= batch:
+                self.prefetch(pending, fields)
+                for ready in pending:
+                    yield ready
+                pending = []
+        self.prefetch(pending, fields)
+        for ready in pending:
+            yield ready
+
+    def _fetch_objects(self, objects):
+        '''fetch the documents the objects do not hold, one request per href, and return the failures'''
+        groups = OrderedDict()
+        for obj in objects:
+            if obj.dom is None:
+                groups.setdefault(obj.href, []).append(obj)
+        def fetch(group):
+            # the objects after the first one read the response it cached
+            try:
+                for obj in group:
+                    obj.fetch()
+            except MissingDocuments:
+                raise
+            except Exception as e:
+                return e
+            return None
+        groups = list(groups.values())
+        if self.deferred_documents() is not None:
+            # deferred mode is for the calling thread only
+            errors = [fetch(group) for group in groups]
+        else:
+            errors = self.fan_out(fetch, groups)
+        return [(obj, error) for group, error in zip(groups, errors) if error is not None for obj in group]
+
+    def cache_stats(self):
+        '''return the hit, miss, eviction and revalidation counters of the XML response cache'''
+        return self._cache.stats()
+
+    def identity_stats(self):
+        '''return the number of catalog objects in the identity map, and of lookups that found one or not'''
+        return self.identities.stats()
+
+    def request_stats(self):
+        '''
+        return the number of GETs made for cache misses (calls), and the
+        number of identical GETs that waited for one of them instead of
+        being sent as well (collapsed)
+        '''
+        return self._flights.stats()
+
+    def scheduler_stats(self):
+        '''
+        return, for every priority class of requests, the number waiting to be
+        sent (the queue depth) and being sent, and the time they waited
+        '''
+        return self.scheduler.stats()
+
+    def rate_limit_stats(self):
+        '''
+        return the rates bulk requests are sent at, which go down while the
+        server is slow, and how many were held back and for how long
+        '''
+        return self.limiter.stats()
+
+    def attach_store(self, store):
+        '''
+        back the response cache with a persistent store (see geoserver.diskcache)
+        and return the urls loaded from it, which should be revalidated
+        '''
+        self._cache.store = store
+        return self._cache.preload()
 
+    def purge_cache(self):
+        '''drop every cached response, including those in the persistent store'''
         self._cache.clear()
 
-        # do we really need to return anything other than None?
-        return (resp)
+    def invalidate(self, obj, method="PUT", recurse=False):
+        '''
+        drop the cached responses made stale by saving (PUT/POST) or
+        deleting (DELETE) obj, instead of flushing the whole cache
+        '''
+        self._invalidate(object_invalidation(self, obj, method, recurse))
+
+    def _invalidate(self, invalidation):
+        logger.debug("Invalidating {}".format(invalidation))
+        # documents are cached under the URL of the representation they were read in
+        urls = set(document_url(url, codec) for url in invalidation.urls for codec in CODECS.values())
+        self._cache.invalidate(urls, invalidation.prefixes)
+        self.identities.invalidate(invalidation.urls, invalidation.prefixes)
+
+    def _store_href(self, workspace, store_type, store):
+        return build_url(self.service_url, ["workspaces", workspace, store_type, store + ".xml"])
+
+    def get_cached(self, rest_url):
+        '''
+        GET rest_url through the response cache and return (status_code, content).
+        Expired entries are revalidated with a conditional GET, so an unchanged
+        document costs a 304 round-trip instead of a full download.
+        '''
+        content = self._cache.get(rest_url)
+        if content is not None:
+            return 200, content
+        # concurrent callers wait for the same request and share its response
+        return self._flights.do((rest_url, self._auth_key()), self._fetch_document, rest_url)
+
+    def _fetch_document(self, rest_url):
+        return self._conditional_get(rest_url)[:2]
+
+    def _auth_key(self):
+        '''what the answers of the server depend on besides the URL'''
+        return self.username, self.access_token
+
+    def identity(self):
+        '''a digest of _auth_key, to keep the responses of users apart without keeping their tokens'''
+        return hashlib.sha256(repr(self._auth_key()).encode("utf-8")).hexdigest()
+
+    def revalidate(self, urls):
+        '''
+        revalidate the cached responses for urls regardless of their TTL,
+        typically after they were preloaded from a persistent cache.
+        Return the urls whose content changed on the server.
+        '''
+        changed = []
+        try:
+            for url in urls:
+                status_code, content, modified = self._conditional_get(url)
+                if status_code != 200:
+                    self._cache.pop(url)
+                if modified:
+                    changed.append(url)
+        finally:
+            self._cache.release(urls)
+        return changed
+
+    def _conditional_get(self, rest_url):
+        '''return (status_code, content, modified) for a conditional GET of rest_url'''
+        resp = self.http_request(rest_url, headers=self._cache.conditional_headers(rest_url))
+        if resp.status_code == 304:
+            content = self._cache.revalidate(rest_url)
+            if content is not None:
+                return 200, content, False
+            resp = self.http_request(rest_url, headers={})
+        if resp.status_code == 200:
+            etag, last_modified = response_validators(resp.headers)
+            self._cache.put(rest_url, resp.content, etag, last_modified)
+        return resp.status_code, resp.content, True
 
     def get_xml(self, rest_url):
-        cached_response = self._cache.get(rest_url)
+        '''
+        return the parsed XML document at rest_url. Trees are cached and
+        shared with every other caller, so they must not be modified
+        '''
+        return self._parsed(rest_url, self.get_content(rest_url))
 
-        def is_valid(cached_response):
-            return cached_response is not None and datetime.now() - cached_response[0] < timedelta(seconds=5)
+    def get_document(self, rest_url):
+        '''
+        return the document at rest_url, the URL of its XML representation,
+        read in the representation of the codec of the catalog: an XML tree,
+        or with the JSON codec a JsonNode answering the same calls (see
+        geoserver.codec). A server that does not answer in JSON is read in
+        XML from then on. Like trees, documents must not be modified
+        '''
+        codec = self.codec
+        url = document_url(rest_url, codec)
+        if codec is not XML_CODEC and url != rest_url:
+            content = self.get_content(url)
+            try:
+                return self._cache.parsed(url, content, codec.parse)
+            except ValueError:
+                logger.warning("GeoServer gave non-JSON response for [GET %s], reading XML instead" % url)
+                self.codec = XML_CODEC
+        return self.get_xml(rest_url)
 
+    def get_content(self, rest_url):
+        '''
+        return the content of the document at rest_url, from the response
+        cache, or from the documents given to deferred mode
+        '''
+        documents = self.deferred_documents()
+        if documents is not None:
+            if rest_url not in documents:
+                raise MissingDocuments([rest_url])
+            content, error = documents[rest_url]
+            if error is not None:
+                raise error
+            return content
+
+        status_code, content = self.get_cached(rest_url)
+        if status_code != 200:
+            raise FailedRequestError(content)
+        return content
+
+    def keeps_document(self, rest_url, document):
+        '''whether document, returned by get_document for rest_url, is kept by the response cache'''
+        return any(self._cache.tree(document_url(rest_url, codec)) is document for codec in CODECS.values())
+
+    def iter_listing(self, rest_url, element):
+        '''
+        yield the (name, href) pairs of the `element` entries of the listing
+        at rest_url, such as the layer entries of layers.xml, as the listing
+        is downloaded and parsed, without building its tree. A listing in the
+        response cache is parsed from there, and a downloaded one is cached
+        once read to the end
+        '''
+        content = self._cache.get(rest_url)
+        if content is not None or self.deferred_documents() is not None:
+            chunks = content if content is not None else self.get_content(rest_url)
+        else:
+            chunks = self._download(rest_url)
+        try:
+            for pair in iter_listing(chunks, element):
+                yield pair
+        except ParseError as e:
+            raise Exception("GeoServer gave non-XML response for [GET %s]" % rest_url, e)
+
+    def _download(self, rest_url):
+        '''yield the parts of the document at rest_url as they arrive, and cache it'''
+        resp = self.http_request(rest_url, headers=self._cache.conditional_headers(rest_url), stream=True)
+        if resp.status_code == 304:
+            content = self._cache.revalidate(rest_url)
+            if content is not None:
+                yield content
+                return
+            resp = self.http_request(rest_url, headers={}, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise FailedRequestError(resp.content)
+            parts = []
+            for part in resp.iter_content(_CHUNK_SIZE):
+                parts.append(part)
+                yield part
+            etag, last_modified = response_validators(resp.headers)
+            self._cache.put(rest_url, b"".join(parts), etag, last_modified)
+        finally:
+            resp.close()
+
+    def _parsed(self, rest_url, content):
+        '''the tree of the content of rest_url, shared through the response cache'''
         def parse_or_raise(xml):
             try:
                 return XML(xml)
@@ -225,16 +957,7 @@ class Catalog(object):
                 msg = msg % (rest_url, xml)
                 raise Exception(msg, e)
 
-        if is_valid(cached_response):
-            raw_text = cached_response[1]
-            return parse_or_raise(raw_text)
-        else:
-            resp = self.http_request(rest_url)
-            if resp.status_code == 200:
-                self._cache[rest_url] = (datetime.now(), resp.content)
-                return parse_or_raise(resp.content)
-            else:
-                raise FailedRequestError(resp.content)
+        return self._cache.parsed(rest_url, content, parse_or_raise)
 
     def reload(self):
         url = "{}/reload".format(self.service_url)
@@ -268,7 +991,7 @@ class Catalog(object):
         if resp.status_code not in (200, 201):
             raise FailedRequestError('Failed to save to Geoserver catalog: {}, {}'.format(resp.status_code, resp.text))
 
-        self._cache.clear()
+        self.invalidate(obj, obj.save_method)
         return resp
 
     def get_stores(self, names=None, workspaces=None):
@@ -279,33 +1002,21 @@ class Catalog(object):
           Will return an empty list if no stores are found.
         '''
 
-        if isinstance(workspaces, Workspace):
-            workspaces = [workspaces]
-        elif isinstance(workspaces, list) and [w for w in workspaces if isinstance(w, Workspace)]:
-            # nothing
-            pass
-        else:
-            workspaces = self.get_workspaces(names=workspaces)
-
+        workspaces = self._workspace_objects(workspaces)
+        names = _names(names)
         stores = []
         for ws in workspaces:
-            ds_list = self.get_xml(ws.datastore_url)
-            cs_list = self.get_xml(ws.coveragestore_url)
-            wms_list = self.get_xml(ws.wmsstore_url)
-            stores.extend([datastore_from_index(self, ws, n) for n in ds_list.findall("dataStore")])
-            stores.extend([coveragestore_from_index(self, ws, n) for n in cs_list.findall("coverageStore")])
-            stores.extend([wmsstore_from_index(self, ws, n) for n in wms_list.findall("wmsStore")])
-
-        if names is None:
-            names = []
-        elif isinstance(names, basestring):
-            names = [s.strip() for s in names.split(',') if s.strip()]
-
-        if stores and names:
-            return ([store for store in stores if store.name in names])
+            stores.extend([self.index.object(e, ws) for e in self.index.select("store", names, ws.name)])
 
         return stores
 
+    def _workspace_objects(self, workspaces):
+        if isinstance(workspaces, Workspace):
+            return [workspaces]
+        elif isinstance(workspaces, list) and [w for w in workspaces if isinstance(w, Workspace)]:
+            return workspaces
+        return self.get_workspaces(names=workspaces)
+
     def create_datastore(self, name, workspace=None):
         if isinstance(workspace, basestring):
             workspace = self.get_workspaces(names=workspace)[0]
@@ -336,7 +1047,7 @@ class Catalog(object):
         if resp.status_code not in (200, 201):
             raise FailedRequestError('Failed to create WMS layer: {}, {}'.format(resp.status_code, resp.text))
 
-        self._cache.clear()
+        self._invalidate(store_invalidation(self, store.href))
         return self.get_layer(name)
 
     def add_data_to_store(self, store, name, data, workspace=None, overwrite = False, charset = None):
@@ -347,8 +1058,9 @@ class Catalog(object):
             assert store.workspace.name == workspace, "Specified store (%s) is not in specified workspace (%s)!" % (store, workspace)
         else:
             workspace = store.workspace.name
-        store = store.name
+        self._send_upload(self._data_upload(store.name, name, data, workspace, overwrite, charset))
 
+    def _data_upload(self, store, name, data, workspace, overwrite, charset):
         if isinstance(data, dict):
             bundle = prepare_upload_bundle(name, data)
         else:
@@ -376,12 +1088,22 @@ class Catalog(object):
         try:
             with open(bundle, "rb") as f:
                 data = f.read()
-                resp = self.http_request(upload_url, method='put', data=data, headers=headers)
-                if resp.status_code != 201:
-                    FailedRequestError('Failed to add data to store {} : {}, {}'.format(store, resp.status_code, resp.text))
-                self._cache.clear()
-        finally:
+        except:
             os.unlink(bundle)
+            raise
+        return _Upload(upload_url, 'put', data, headers, 'Failed to add data to store {}'.format(store),
+                       store_invalidation(self, self._store_href(workspace, "datastores", store)), temporary=bundle)
+
+    def _send_upload(self, upload):
+        try:
+            with self.deadline(self.upload_timeout):
+                resp = self.http_request(upload.url, method=upload.method, data=upload.data, headers=upload.headers)
+            if resp.status_code != 201:
+                raise FailedRequestError('{} : {}, {}'.format(upload.failure, resp.status_code, resp.text))
+            self._invalidate(upload.invalidation)
+        finally:
+            upload.close()
+        return resp
 
     def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None):
         if workspace is None:
@@ -393,7 +1115,9 @@ class Catalog(object):
             if len(stores) > 0:
                 msg = "There is already a store named {} in workspace {}".format(name, workspace)
                 raise ConflictingDataError(msg)
+        self._send_upload(self._featurestore_upload(name, data, workspace, charset))
 
+    def _featurestore_upload(self, name, data, workspace, charset):
         params = dict()
         if charset is not None:
             params['charset'] = charset
@@ -421,14 +1145,9 @@ class Catalog(object):
             logger.debug('Data is a zipfile')
             archive = data
         file_obj = open(archive, 'rb')
-        try:
-            resp = self.http_request(url, method='put', data=file_obj, headers=headers)
-            if resp.status_code != 201:
-                FailedRequestError('Failed to create FeatureStore {} : {}, {}'.format(name, resp.status_code, resp.text))
-            self._cache.clear()
-        finally:
-            file_obj.close()
-            os.unlink(archive)
+        return _Upload(url, 'put', file_obj, headers, 'Failed to create FeatureStore {}'.format(name),
+                       store_invalidation(self, self._store_href(workspace, "datastores", name)),
+                       files=[file_obj], temporary=archive)
 
     def create_imagemosaic(self, name, data, configure='first', workspace=None, overwrite=False, charset=None):
         if workspace is None:
@@ -439,7 +1158,10 @@ class Catalog(object):
             store = self.get_stores(names=name, workspaces=workspace)
             if store:
                 raise ConflictingDataError("There is already a store named {}".format(name))
+        self._send_upload(self._imagemosaic_upload(name, data, configure, workspace, charset))
+        return self.get_stores(names=name, workspaces=workspace)[0]
 
+    def _imagemosaic_upload(self, name, data, configure, workspace, charset):
         params = dict()
         if charset is not None:
             params['charset'] = charset
@@ -481,16 +1203,9 @@ class Catalog(object):
             "Accept": "application/xml"
         }
 
-        try:
-            resp = self.http_request(url, method='put', data=upload_data, headers=headers)
-            if resp.status_code != 201:
-                FailedRequestError('Failed to create ImageMosaic {} : {}, {}'.format(name, resp.status_code, resp.text))
-            self._cache.clear()
-        finally:
-            if hasattr(upload_data, "close"):
-                upload_data.close()
-
-        return self.get_stores(names=name, workspaces=workspace)[0]
+        return _Upload(url, 'put', upload_data, headers, 'Failed to create ImageMosaic {}'.format(name),
+                       store_invalidation(self, self._store_href(workspace, "coveragestores", name)),
+                       files=[upload_data] if hasattr(upload_data, "close") else [])
 
     def create_coveragestore(self, name, workspace=None, path=None, type='GeoTIFF', create_layer=True, layer_name=None, source_name=None):
         """
@@ -498,58 +1213,41 @@ class Catalog(object):
         If create_layer is set to true, will create a coverage/layer.
         layer_name and source_name are only used if create_layer ia enabled. If not specified, the raster name will be used for both.
         """
-        if path is None:
-            raise Exception('You must provide a full path to the raster')
-
-        allowed_types = [
-            'ImageMosaic',
-            'GeoTIFF',
-            'Gtopo30',
-            'WorldImage',
-            'AIG',
-            'ArcGrid',
-            'DTED',
-            'EHdr',
-            'ERDASImg',
-            'ENVIHdr',
-            'GeoPackage (mosaic)',
-            'NITF',
-            'RPFTOC',
-            'RST',
-            'VRT'
-        ]
-
-        if type is None:
-            raise Exception('Type must be declared')
-        elif type not in allowed_types:
-            raise Exception('Type must be one of {}'.format(", ".join(allowed_types)))
+        _check_coveragestore(path, type)
 
         if workspace is None:
             workspace = self.get_default_workspace()
         workspace = _name(workspace)
 
-        cs = UnsavedCoverageStore(self, name, workspace)
-        cs.type = type
-        cs.url = path if path.startswith("file:") else "file:{}".format(path)
-        self.save(cs)
+        self.save(self._coveragestore(name, workspace, path, type))
 
         if create_layer:
-            if layer_name is None:
-                layer_name = os.path.splitext(os.path.basename(path))[0]
-            if source_name is None:
-                source_name = os.path.splitext(os.path.basename(path))[0]
-
-            data = "<coverage><name>{}</name><nativeName>{}</nativeName></coverage>".format(layer_name, source_name)
-            url = "{}/workspaces/{}/coveragestores/{}/coverages.xml".format(self.service_url, workspace, name)
-            headers = {"Content-type": "application/xml"}
-
-            resp = self.http_request(url, method='post', data=data, headers=headers)
-            if resp.status_code != 201:
-                FailedRequestError('Failed to create coverage/layer {} for : {}, {}'.format(layer_name, name, resp.status_code, resp.text))
-            self._cache.clear()
-            return self.get_resources(names=layer_name, workspaces=workspace)[0]
+            upload, href = self._coverage_upload(name, workspace, path, layer_name, source_name)
+            self._send_upload(upload)
+            return self.index.from_href(href)
         return self.get_stores(names=name, workspaces=workspace)[0]
 
+    def _coveragestore(self, name, workspace, path, type):
+        cs = UnsavedCoverageStore(self, name, workspace)
+        cs.type = type
+        cs.url = path if path.startswith("file:") else "file:{}".format(path)
+        return cs
+
+    def _coverage_upload(self, name, workspace, path, layer_name, source_name):
+        '''the request creating the coverage of a new coverage store, and the href of the coverage'''
+        if layer_name is None:
+            layer_name = os.path.splitext(os.path.basename(path))[0]
+        if source_name is None:
+            source_name = os.path.splitext(os.path.basename(path))[0]
+
+        data = "<coverage><name>{}</name><nativeName>{}</nativeName></coverage>".format(layer_name, source_name)
+        url = "{}/workspaces/{}/coveragestores/{}/coverages.xml".format(self.service_url, workspace, name)
+        headers = {"Content-type": "application/xml"}
+        upload = _Upload(url, 'post', data, headers, 'Failed to create coverage/layer {} for {}'.format(layer_name, name),
+                         store_invalidation(self, self._store_href(workspace, "coveragestores", name)))
+        href = build_url(self.service_url, ["workspaces", workspace, "coveragestores", name, "coverages", layer_name + ".xml"])
+        return upload, href
+
     def add_granule(self, data, store, workspace=None):
         '''Harvest/add a granule into an existing imagemosaic'''
         ext = os.path.splitext(data)[-1]
@@ -592,10 +1290,11 @@ class Catalog(object):
         )
 
         try:
-            resp = self.http_request(url, method='post', data=upload_data, headers=headers)
+            with self.deadline(self.upload_timeout):
+                resp = self.http_request(url, method='post', data=upload_data, headers=headers)
             if resp.status_code != 202:
-                FailedRequestError('Failed to add granule to mosaic {} : {}, {}'.format(store, resp.status_code, resp.text))
-            self._cache.clear()
+                raise FailedRequestError('Failed to add granule to mosaic {} : {}, {}'.format(store, resp.status_code, resp.text))
+            self._invalidate(store_invalidation(self, self._store_href(workspace_name, "coveragestores", store_name), False))
         finally:
             if hasattr(upload_data, "close"):
                 upload_data.close()
@@ -642,7 +1341,7 @@ class Catalog(object):
         resp = self.http_request(url, method='delete', headers=headers)
         if resp.status_code != 200:
             FailedRequestError('Failed to delete granule from mosaic {} : {}, {}'.format(store, resp.status_code, resp.text))
-        self._cache.clear()
+        self._invalidate(store_invalidation(self, self._store_href(workspace_name, "coveragestores", store_name), False))
 
         # maybe return a list of all granules?
         return None
@@ -692,7 +1391,6 @@ class Catalog(object):
         if resp.status_code != 200:
             FailedRequestError('Failed to list granules in mosaic {} : {}, {}'.format(store, resp.status_code, resp.text))
 
-        self._cache.clear()
         return resp.json()
 
     def mosaic_coverages(self, store):
@@ -719,7 +1417,6 @@ class Catalog(object):
         if resp.status_code != 200:
             FailedRequestError('Failed to get mosaic coverages {} : {}, {}'.format(store, resp.status_code, resp.text))
 
-        self._cache.clear()
         return resp.json()
 
     def mosaic_coverage_schema(self, coverage, store, workspace):
@@ -749,7 +1446,6 @@ class Catalog(object):
         if resp.status_code != 200:
             FailedRequestError('Failed to get mosaic schema {} : {}, {}'.format(store, resp.status_code, resp.text))
 
-        self._cache.clear()
         return resp.json()
 
     def publish_featuretype(self, name, store, native_crs, srs=None, jdbc_virtual_table=None, native_name=None):
@@ -801,7 +1497,7 @@ class Catalog(object):
         if resp.status_code not in (200, 201, 202):
             FailedRequestError('Failed to publish feature type {} : {}, {}'.format(name, resp.status_code, resp.text))
 
-        self._cache.clear()
+        self._invalidate(store_invalidation(self, store.href))
         feature_type.fetch()
         return feature_type
 
@@ -812,47 +1508,75 @@ class Catalog(object):
         Will always return an array.
         '''
 
+        names = _names(names)
+        if stores is None and workspaces is None:
+            return [self.index.object(e) for e in self.index.select("resource", names)]
+
+        resources = []
+        if stores is None:
+            for ws in self._workspace_objects(workspaces):
+                resources.extend([self.index.object(e, ws) for e in self.index.select("resource", names, ws.name)])
+            return resources
+
         stores = self.get_stores(
             names = stores,
             workspaces = workspaces
         )
 
-        resources = []
+        # resources listed by workspace do not name their store, so ask the stores themselves
         for s in stores:
-            try:
-                resources.extend(s.get_resources())
-            except FailedRequestError:
-                continue
+            resources.extend([r for r in s.get_resources() if not names or r.name in names])
 
-        if names is None:
-            names = []
-        elif isinstance(names, basestring):
-            names = [s.strip() for s in names.split(',') if s.strip()]
+        return resources
 
-        if resources and names:
-            return ([resource for resource in resources if resource.name in names])
+    def iter_resources(self, workspaces=None):
+        '''
+        yield the resources of the workspaces, or of all of them, as their
+        listings are downloaded, instead of waiting for the whole of them.
+        workspaces can be provided as a comma delimited string or as an array
+        '''
+        for ws in self._iter_workspace_names(workspaces):
+            for entry in self.index.stream("resource", ws):
+                yield self.index.object(entry)
 
-        return resources
+    def _iter_workspace_names(self, workspaces):
+        if workspaces is None:
+            return [None]
+        if isinstance(workspaces, Workspace):
+            return [workspaces.name]
+        return [_name(ws) for ws in _names(workspaces)]
 
     def get_layer(self, name):
         try:
             lyr = Layer(self, name)
+            # a layer read before was fetched, or listed, already
+            found = self.identities.get(lyr.href)
+            if found is not None:
+                return found
             lyr.fetch()
-            return lyr
+            return self.identities.share(lyr)
         except FailedRequestError:
             return None
 
     def get_layers(self, resource=None):
         if isinstance(resource, basestring):
             resource = self.get_resources(names = resource)[0]
-        layers_url = "{}/layers.xml".format(self.service_url)
-        data = self.get_xml(layers_url)
-        lyrs = [Layer(self, l.find("name").text) for l in data.findall("layer")]
+        lyrs = [self.index.object(e) for e in self.index.entries("layer")]
         if resource is not None:
-            lyrs = [l for l in lyrs if l.resource.href == resource.href]
+            # the same resource can have an href with its store and one without
+            key = (resource.workspace.name, resource.name)
+            lyrs = [l for l in lyrs if (l.resource.workspace.name, l.resource.name) == key]
         # TODO: Filter by style
         return lyrs
 
+    def iter_layers(self):
+        '''
+        yield the layers of the catalog as layers.xml is downloaded and parsed,
+        so that the first ones can be used before the last ones are read
+        '''
+        for entry in self.index.stream("layer"):
+            yield self.index.object(entry)
+
     def get_layergroups(self, names=None, workspaces=None):
         '''
         names and workspaces can be provided as a comma delimited strings or as arrays, and are used for filtering.
@@ -860,42 +1584,19 @@ class Catalog(object):
         Will always return an array.
         '''
 
-        layergroups = []
-
+        names = _names(names)
         if workspaces is None or len(workspaces) == 0:
-            # Add global layergroups
-            url = "{}/layergroups.xml".format(self.service_url)
-            groups = self.get_xml(url)
-            layergroups.extend([LayerGroup(self, g.find("name").text, None) for g in groups.findall("layerGroup")])
-            workspaces = []
+            # global and workspace layergroups
+            workspaces = [None]
         elif isinstance(workspaces, basestring):
             workspaces = [s.strip() for s in workspaces.split(',') if s.strip()]
         elif isinstance(workspaces, Workspace):
             workspaces = [workspaces]
 
-        if not workspaces:
-            workspaces = self.get_workspaces()
-
+        layergroups = []
         for ws in workspaces:
-            ws_name = _name(ws)
-            url = "{}/workspaces/{}/layergroups.xml".format(self.service_url, ws_name)
-            try:
-                groups = self.get_xml(url)
-            except FailedRequestError as e:
-                if "no such workspace" in str(e).lower():
-                    continue
-                else:
-                    raise FailedRequestError("Failed to get layergroups: {}".format(e))
-
-            layergroups.extend([LayerGroup(self, g.find("name").text, ws_name) for g in groups.findall("layerGroup")])
-
-        if names is None:
-            names = []
-        elif isinstance(names, basestring):
-            names = [s.strip() for s in names.split(',') if s.strip()]
-
-        if layergroups and names:
-            return ([lg for lg in layergroups if lg.name in names])
+            entries = self.index.select("layergroup", names, _name(ws))
+            layergroups.extend([self.index.object(e) for e in entries])
 
         return layergroups
 
@@ -913,14 +1614,10 @@ class Catalog(object):
         Will always return an array.
         '''
 
-        all_styles = []
-
+        names = _names(names)
         if workspaces is None:
-            # Add global styles
-            url = "{}/styles.xml".format(self.service_url)
-            styles = self.get_xml(url)
-            all_styles.extend([Style(self, s.find('name').text) for s in styles.findall("style")])
-            workspaces = []
+            # global and workspace styles
+            workspaces = [None]
         elif isinstance(workspaces, basestring):
             workspaces = [s.strip() for s in workspaces.split(',') if s.strip()]
         elif isinstance(workspaces, Workspace):
@@ -929,30 +1626,23 @@ class Catalog(object):
         if not workspaces:
             workspaces = self.get_workspaces()
 
+        all_styles = []
         for ws in workspaces:
-            url = "{}/workspaces/{}/styles.xml".format(self.service_url, _name(ws))
-            try:
-                styles = self.get_xml(url)
-            except FailedRequestError as e:
-                if "no such workspace" in str(e).lower():
-                    continue
-                elif "workspace {} not found".format(_name(ws)) in str(e).lower():
-                    continue
-                else:
-                    raise FailedRequestError("Failed to get styles: {}".format(e))
-
-            all_styles.extend([Style(self, s.find("name").text, _name(ws)) for s in styles.findall("style")])
-
-        if names is None:
-            names = []
-        elif isinstance(names, basestring):
-            names = [s.strip() for s in names.split(',') if s.strip()]
-
-        if all_styles and names:
-            return ([style for style in all_styles if style.name in names])
+            entries = self.index.select("style", names, _name(ws))
+            all_styles.extend([self.index.object(e) for e in entries])
 
         return all_styles
 
+    def iter_styles(self, workspaces=None):
+        '''
+        yield the styles of the workspaces as their listings are downloaded.
+        If no workspaces are provided, yield all styles in the catalog, the
+        global ones first
+        '''
+        for ws in self._iter_workspace_names(workspaces):
+            for entry in self.index.stream("style", ws):
+                yield self.index.object(entry)
+
     def create_style(self, name, data, overwrite = False, workspace=None, style_format="sld10", raw=False):
         styles = self.get_styles(names=name, workspaces=workspace)
         if len(styles) > 0:
@@ -988,8 +1678,7 @@ class Catalog(object):
         if resp.status_code not in (200, 201, 202):
             FailedRequestError('Failed to create style {} : {}, {}'.format(name, resp.status_code, resp.text))
 
-        self._cache.pop(style.href, None)
-        self._cache.pop(style.body_href, None)
+        self.invalidate(style)
 
     def create_workspace(self, name, uri):
         xml = (
@@ -1006,7 +1695,8 @@ class Catalog(object):
         if resp.status_code not in (200, 201, 202):
             FailedRequestError('Failed to create workspace {} : {}, {}'.format(name, resp.status_code, resp.text))
 
-        self._cache.pop("{}/workspaces.xml".format(self.service_url), None)
+        self._invalidate(Invalidation(["{}/workspaces.xml".format(self.service_url),
+                                       "{}/namespaces.xml".format(self.service_url)]))
         workspaces = self.get_workspaces(names=name)
         # Can only have one workspace with this name
         return workspaces[0] if workspaces else None
@@ -1018,25 +1708,19 @@ class Catalog(object):
           names can either be a comma delimited string or an array.
           Will return an empty list if no workspaces are found.
         '''
-        if names is None:
-            names = []
-        elif isinstance(names, basestring):
-            names = [s.strip() for s in names.split(',') if s.strip()]
-
-        data = self.get_xml("{}/workspaces.xml".format(self.service_url))
-        workspaces = []
-        workspaces.extend([workspace_from_index(self, node) for node in data.findall("workspace")])
-
-        if workspaces and names:
-            return ([ws for ws in workspaces if ws.name in names])
+        names = _names(names)
+        return [self.index.object(e) for e in self.index.select("workspace", names)]
 
-        return workspaces
+    def iter_workspaces(self):
+        '''yield the workspaces of the catalog as workspaces.xml is downloaded'''
+        for entry in self.index.stream("workspace"):
+            yield self.index.object(entry)
 
     def get_default_workspace(self):
+        '''the default workspace, named after the workspace it stands for'''
         ws = Workspace(self, "default")
         # must fetch and resolve the 'real' workspace from the response
-        ws.fetch()
-        return workspace_from_index(self, ws.dom)
+        return self.identities.share(workspace_from_index(self, ws.document()))
 
     def set_default_workspace(self, name):
         if hasattr(name, 'name'):
@@ -1051,8 +1735,7 @@ class Catalog(object):
             if resp.status_code not in (200, 201, 202):
                 FailedRequestError('Failed to set default workspace {} : {}, {}'.format(name, resp.status_code, resp.text))
 
-            self._cache.pop(default_workspace_url, None)
-            self._cache.pop("{}/workspaces.xml".format(self.service_url), None)
+            self._invalidate(Invalidation([default_workspace_url, "{}/workspaces.xml".format(self.service_url)]))
         else:
             raise FailedRequestError("no workspace named {}".format(name))
 
@@ -0,0 +1,202 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+import json
+import re
+from xml.etree.ElementTree import XML
+
+from geoserver.listing import ATOM_LINK, iter_listing
+
+
+class XmlCodec(object):
+    """The XML representation of REST documents, parsed into ElementTree elements."""
+
+    name = "xml"
+    extension = ".xml"
+
+    def parse(self, content):
+        return XML(content)
+
+    def listing(self, content, element):
+        '''the (name, href) pairs of the `element` entries of a listing'''
+        return iter_listing(content, element)
+
+
+class JsonCodec(object):
+    """
+    The JSON representation of REST documents, which GeoServer derives from
+    the XML one: attributes become "@name" keys, the text of an element
+    with attributes a "$" key, repeated elements lists, and atom links
+    "href" keys. Documents are parsed with the json module into JsonNode
+    views that answer the ElementTree calls the catalog objects make, so
+    the same properties read either representation.
+
+    Numbers are kept as the text the server sent, and the hrefs in the
+    documents are given back as the URLs of their XML representations,
+    which is how the catalog objects are addressed.
+    """
+
+    name = "json"
+    extension = ".json"
+
+    def parse(self, content):
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        document = json.loads(content, parse_float=str, parse_int=str)
+        if not isinstance(document, dict) or len(document) != 1:
+            raise ValueError("Not a REST document")
+        tag, value = next(iter(document.items()))
+        return JsonNode(tag, value)
+
+    def listing(self, content, element):
+        # listings are read straight from the dicts, without JsonNode views
+        entries = self.parse(content)._value
+        entries = entries.get(element, []) if isinstance(entries, dict) else []
+        for entry in entries if isinstance(entries, list) else [entries]:
+            if isinstance(entry, dict):
+                yield _text(entry.get("name")), _xml_href(entry.get("href"))
+
+
+# the steps of an ElementTree path, whose namespaced tags contain slashes
+_STEPS = re.compile(r"(?:\{[^}]*\})?[^/{]+")
+_paths = {}
+
+
+def _steps(path):
+    steps = _paths.get(path)
+    if steps is None:
+        steps = _paths[path] = tuple(_STEPS.findall(path))
+    return steps
+
+XML_CODEC = XmlCodec()
+JSON_CODEC = JsonCodec()
+CODECS = dict((codec.name, codec) for codec in (XML_CODEC, JSON_CODEC))
+
+
+def document_url(rest_url, codec):
+    '''the URL of the representation of the document at rest_url in codec'''
+    path, sep, query = rest_url.partition("?")
+    if not path.endswith(".xml"):
+        # not a document with several representations, such as a style body
+        return rest_url
+    return path[:-len(".xml")] + codec.extension + sep + query
+
+
+def _text(value):
+    if value is None or value == "" or isinstance(value, (dict, list)):
+        return None
+    if value is True or value is False:
+        return "true" if value else "false"
+    return value
+
+
+class JsonNode(object):
+    """
+    A read-only element of a JSON REST document, with the part of the
+    ElementTree element interface the catalog objects use: tag, text,
+    attrib, get, find, findall, findtext and iteration over the children.
+    """
+
+    __slots__ = ("tag", "_value", "_attrib", "_children", "__weakref__")
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self._value = value
+        self._attrib = None
+        self._children = None
+
+    @property
+    def text(self):
+        if isinstance(self._value, dict):
+            return _text(self._value.get("$"))
+        return _text(self._value)
+
+    @property
+    def attrib(self):
+        if self._attrib is None:
+            value = self._value
+            self._attrib = dict((k[1:], _text(v)) for k, v in value.items()
+                                if k.startswith("@")) if isinstance(value, dict) else {}
+        return self._attrib
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def _nodes(self):
+        if self._children is None:
+            children = []
+            if isinstance(self._value, dict):
+                for key in self._value:
+                    children.extend(self._tagged(key))
+                    if key == "href":
+                        children.extend(self._tagged(ATOM_LINK))
+            self._children = children
+        return self._children
+
+    def _tagged(self, tag):
+        '''
+        the children with the given tag, read from the key of the same name,
+        without building the other ones. An "href" key is both an element
+        of that name, such as the href of an attribution, and an atom link
+        '''
+        value = self._value
+        if not isinstance(value, dict):
+            return []
+        if tag == ATOM_LINK:
+            href = value.get("href")
+            return [_link(href)] if href is not None and not isinstance(href, (dict, list)) else []
+        if tag == "$" or tag.startswith("@") or tag not in value:
+            return []
+        child = value[tag]
+        if isinstance(child, list):
+            return [JsonNode(tag, item) for item in child]
+        return [JsonNode(tag, child)]
+
+    def __iter__(self):
+        return iter(self._nodes())
+
+    def __len__(self):
+        return len(self._nodes())
+
+    def _find(self, steps, first):
+        found = []
+        tag, rest = steps[0], steps[1:]
+        for child in self._tagged(tag):
+            if rest:
+                found.extend(child._find(rest, first))
+            else:
+                found.append(child)
+            if first and found:
+                break
+        return found
+
+    def findall(self, path):
+        return self._find(_steps(path), False)
+
+    def find(self, path):
+        found = self._find(_steps(path), True)
+        return found[0] if found else None
+
+    def findtext(self, path, default=None):
+        node = self.find(path)
+        if node is None:
+            return default
+        text = node.text
+        return text if text is not None else ""
+
+    def __repr__(self):
+        return "<JsonNode %s>" % self.tag
+
+
+def _xml_href(href):
+    '''the href of the XML representation for an href of the JSON one'''
+    if href is not None and href.endswith(JSON_CODEC.extension):
+        href = href[:-len(JSON_CODEC.extension)] + XML_CODEC.extension
+    return href
+
+
+def _link(href):
+    return JsonNode(ATOM_LINK, {"@href": _xml_href(href)})
@@ -0,0 +1,129 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from contextlib import closing
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# the responses of the first layout were shared by every user of a catalog
+_OBSOLETE = "DROP TABLE IF EXISTS responses"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_responses (
+    catalog TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (catalog, identity, url)
+)
+"""
+
+# store documents hold connection parameters, passwords included
+_STORE_DOCUMENT = re.compile(r"/(datastores|coveragestores|wmsstores|wmtsstores)/[^/?]+\.[a-z]+(\?|$)")
+
+
+class DiskCache(object):
+    """
+    Persistent store of the REST responses of one catalog, kept in an SQLite
+    database that can be shared by several catalogs (rows are keyed by the
+    catalog URL). It backs a ResponseCache so a new session can start from
+    the responses of the previous one.
+
+    What a server answers depends on who asks, so rows are also keyed by
+    `identity`, which tells the users of a catalog apart (see
+    Catalog.identity); it should not be a secret itself. The documents of
+    stores are never written, since they hold the passwords of their
+    connections, and the database is only readable by its owner.
+
+    At most `max_bytes` bytes of content are kept per catalog and identity;
+    the oldest responses are dropped first.
+    """
+
+    def __init__(self, path, catalog_url, identity, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.catalog_url = catalog_url
+        self.identity = identity
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(_OBSOLETE)
+            db.execute(_SCHEMA)
+        try:
+            os.chmod(path, 0o600)
+        except OSError:
+            pass
+
+    def __getstate__(self):
+        '''locks cannot be pickled'''
+        state = dict(vars(self))
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # a connection per operation, so the cache can be used from worker threads
+        return closing(sqlite3.connect(self.path, timeout=10))
+
+    def load(self):
+        '''return (url, content, etag, last_modified) for every stored response, newest last'''
+        with self._lock, self._connect() as db:
+            return db.execute("SELECT url, content, etag, last_modified FROM user_responses "
+                              "WHERE catalog = ? AND identity = ? ORDER BY stored, rowid", self._key()).fetchall()
+
+    def save(self, url, entry):
+        if _STORE_DOCUMENT.search(url):
+            return
+        with self._lock, self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO user_responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (self.catalog_url, self.identity, url, sqlite3.Binary(entry.content), entry.etag,
+                        entry.last_modified, entry.size, time.time()))
+            self._trim(db)
+            db.commit()
+
+    def remove(self, urls):
+        with self._lock, self._connect() as db:
+            db.executemany("DELETE FROM user_responses WHERE catalog = ? AND identity = ? AND url = ?",
+                           [self._key() + (url,) for url in urls])
+            db.commit()
+
+    def purge(self):
+        '''remove every stored response of this catalog and identity'''
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM user_responses WHERE catalog = ? AND identity = ?", self._key())
+            db.commit()
+
+    def size(self):
+        with self._lock, self._connect() as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM user_responses WHERE catalog = ? AND identity = ?",
+                              self._key()).fetchone()[0]
+
+    def _key(self):
+        return self.catalog_url, self.identity
+
+    def _trim(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM user_responses WHERE catalog = ? AND identity = ?",
+                           self._key()).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute("SELECT url, size FROM user_responses WHERE catalog = ? AND identity = ? ORDER BY stored, rowid",
+                          self._key()).fetchall()
+        stale = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append(self._key() + (url,))
+            total -= size
+        db.executemany("DELETE FROM user_responses WHERE catalog = ? AND identity = ? AND url = ?", stale)
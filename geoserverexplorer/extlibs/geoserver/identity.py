@@ -0,0 +1,130 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from collections import OrderedDict
+import copy
+import threading
+
+from geoserver.codec import CODECS, XML_CODEC
+from geoserver.support import ResourceInfo
+
+
+class IdentityMap(object):
+    """
+    What the catalog objects a catalog handed out have read (their document,
+    the resource of a layer, the SLD of a style), by href, so that looking
+    an object up again does not read it all again.
+
+    The map keeps one object per href, as it was first built, which is never
+    handed out itself: lookups get copies of it, with the reads of the object
+    (see ResourceInfo._shared) but with names and changes of their own, so
+    that whatever a caller does to its copy is not seen by the others. The
+    reads made by a copy are given back to the map with remember().
+
+    The map keeps the `max_objects` hrefs used last. Objects are forgotten
+    when the catalog invalidates their documents, by saving or deleting
+    something (see Catalog.invalidate), and when the response cache clears,
+    or replaces or drops the document of an object holding it. An object
+    that does not hold its document anymore reads the new one when it needs
+    it, so it is kept.
+    """
+
+    def __init__(self, max_objects=10000):
+        self.max_objects = max_objects
+        self._objects = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, href):
+        '''a copy of the object for href, None if there is none'''
+        with self._lock:
+            obj = self._objects.get(href)
+            if obj is None:
+                self.misses += 1
+                return None
+            self._objects.move_to_end(href)
+            self.hits += 1
+        return _copy(obj)
+
+    def share(self, obj):
+        '''
+        the object to hand out for obj: a copy of the object mapped to its
+        href, mapping a copy of obj first if there is none
+        '''
+        href = obj.href
+        with self._lock:
+            mapped = self._objects.get(href)
+            if mapped is None:
+                mapped = self._objects[href] = _copy(obj)
+                while len(self._objects) > self.max_objects:
+                    self._objects.popitem(last=False)
+            else:
+                self._objects.move_to_end(href)
+        return _copy(mapped)
+
+    def remember(self, obj):
+        '''keep what obj, a copy handed out by the map, has read'''
+        with self._lock:
+            mapped = self._objects.get(obj.href)
+            if mapped is None or mapped is obj or type(mapped) is not type(obj):
+                return
+            for name in obj._shared:
+                value = getattr(obj, name)
+                setattr(mapped, name, _copy(value) if isinstance(value, ResourceInfo) else value)
+
+    def invalidate(self, urls=(), prefixes=()):
+        '''forget the objects at the given URLs and below the prefixes'''
+        prefixes = tuple(prefixes)
+        with self._lock:
+            for url in urls:
+                self._objects.pop(_key(url), None)
+            if prefixes:
+                for href in [h for h in self._objects if h.startswith(prefixes)]:
+                    del self._objects[href]
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+    def changed(self, urls):
+        '''the response cache watcher, see ResponseCache.watchers'''
+        if urls is None:
+            self.clear()
+            return
+        with self._lock:
+            for href in set(_key(url) for url in urls):
+                obj = self._objects.get(href)
+                if obj is not None and obj.dom is not None:
+                    del self._objects[href]
+
+    def stats(self):
+        with self._lock:
+            return dict(objects = len(self._objects), hits = self.hits, misses = self.misses)
+
+
+def _copy(obj):
+    '''a copy of a catalog object with changes of its own, and with copies of the catalog objects it read'''
+    clone = copy.copy(obj)
+    # stores keep their name with their changes
+    clone.dirty = dict(obj._dirty) if obj._dirty else None
+    for name in obj._shared:
+        value = getattr(obj, name)
+        if isinstance(value, ResourceInfo):
+            setattr(clone, name, _copy(value))
+    return clone
+
+
+def _key(url):
+    '''the href of the object whose document, in any representation, is at url'''
+    path, sep, query = url.partition("?")
+    for codec in CODECS.values():
+        if codec is not XML_CODEC and path.endswith(codec.extension):
+            return path[:-len(codec.extension)] + XML_CODEC.extension + sep + query
+    return url
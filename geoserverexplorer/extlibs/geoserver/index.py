@@ -0,0 +1,509 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from datetime import datetime
+import threading
+from geoserver.layer import Layer
+from geoserver.listing import iter_listing
+from geoserver.layergroup import LayerGroup
+from geoserver.resource import FeatureType, Coverage, WmsLayer
+from geoserver.store import DataStore, CoverageStore, WmsStore
+from geoserver.style import Style
+from geoserver.support import build_url, intern
+from geoserver.workspace import Workspace
+
+try:
+    from urllib.parse import urlparse, unquote
+except ImportError:
+    from urlparse import urlparse
+    from urllib import unquote
+
+# the workspace of the global layer groups and styles, as opposed to None for all of them
+GLOBAL = ""
+
+# listing element -> catalog object class, for stores and resources
+_STORES = [("dataStore", "datastores", DataStore),
+           ("coverageStore", "coveragestores", CoverageStore),
+           ("wmsStore", "wmsstores", WmsStore)]
+_RESOURCES = dict(dataStore=("featureType", "featuretypes.xml", FeatureType),
+                  coverageStore=("coverage", "coverages.xml", Coverage),
+                  wmsStore=("wmsLayer", "wmslayers.xml", WmsLayer))
+
+# the resources that can also be listed for a whole workspace at once
+# (workspaces/ws/featuretypes.xml), and the first version that does it
+_WORKSPACE_LISTED = ["dataStore", "coverageStore"]
+WORKSPACE_LISTINGS_SINCE = (2, 3)
+
+
+class IndexEntry(object):
+    """
+    A catalog object as listed by the REST API: its kind (workspace, store,
+    resource, layer, layergroup or style), its element type in the listing
+    (dataStore, featureType, ...), its name, and the names of its workspace
+    and store. Entries are lightweight records, without an instance dict and
+    sharing their names; CatalogIndex.object() turns them into catalog objects.
+    """
+
+    __slots__ = ("kind", "type", "name", "workspace", "store", "store_type", "link", "href")
+
+    def __init__(self, kind, type, name, workspace=None, store=None, store_type=None, link=None):
+        self.kind = kind
+        self.type = type
+        self.name = intern(name)
+        self.workspace = intern(workspace)
+        self.store = intern(store)
+        self.store_type = store_type
+        # the href advertised by the server, which might not be the one we build
+        self.link = link
+        self.href = None
+
+    def __repr__(self):
+        return "<IndexEntry %s %s:%s>" % (self.type, self.workspace, self.name)
+
+
+class _Section(object):
+    '''the entries parsed from one listing document'''
+
+    def __init__(self, content, entries):
+        self.content = content
+        self.entries = entries
+
+
+class _Scope(object):
+    '''hash indexes over the entries of one kind, in one workspace or in all of them'''
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.checked = datetime.now()
+        self.by_name = {}
+        self.by_href = {}
+        self.positions = {}
+        for position, entry in enumerate(entries):
+            self.positions[entry] = position
+            self.by_name.setdefault(entry.name, []).append(entry)
+            self.by_href[entry.href] = entry
+            if entry.link:
+                self.by_href.setdefault(entry.link, entry)
+
+
+class CatalogIndex(object):
+    """
+    Snapshot of the catalog listings (workspaces, stores, resources, layers,
+    layer groups and styles) with hash indexes by name, by workspace and name,
+    and by href.
+
+    The snapshot is built lazily, one kind and one workspace at a time, from
+    the documents returned by Catalog.get_content, which are parsed as they
+    are read, without building their trees. It is refreshed incrementally:
+    once the cache TTL has elapsed, or as soon as the cache reports that a
+    listing was invalidated or downloaded again, the listings are walked
+    again and only those whose document changed are parsed again.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._lock = threading.RLock()
+        self._sections = {}
+        self._scopes = {}
+        # bumped by every change, so that a walk overtaken by one does not keep its result
+        self._generation = 0
+        # whether resources are listed by workspace, decided on first use
+        self._by_workspace = None
+        catalog._cache.watchers.append(self._changed)
+
+    def _changed(self, urls):
+        # called from the threads fetching listings for a walk that holds the lock,
+        # so it must not take it. Clearing a dict is atomic anyway, and a walk
+        # running meanwhile sees the generation change
+        if urls is None or [url for url in urls if url in self._sections]:
+            self._generation += 1
+            self._scopes.clear()
+
+    def refresh(self):
+        '''forget the freshness of every index, so they are checked on next use'''
+        self._changed(None)
+
+    # lookups
+
+    def entries(self, kind, workspace=None):
+        '''the entries of a kind, in listing order, for a workspace or for all workspaces'''
+        return self._scope(kind, workspace).entries
+
+    def find(self, kind, name, workspace=None):
+        '''the entries of a kind with the given name, for a workspace or for all workspaces'''
+        return self._scope(kind, workspace).by_name.get(name, [])
+
+    def find_href(self, kind, href, workspace=None):
+        return self._scope(kind, workspace).by_href.get(href)
+
+    def select(self, kind, names=None, workspace=None):
+        '''the entries of a kind matching any of names (all if names is empty), in listing order'''
+        scope = self._scope(kind, workspace)
+        if not names:
+            return scope.entries
+        found = [entry for name in set(names) for entry in scope.by_name.get(name, [])]
+        return sorted(found, key=scope.positions.get)
+
+    def style(self, name, workspace=None):
+        '''
+        resolve a style reference. Unqualified names are looked up in the
+        global styles first, so the styles of every workspace are only listed
+        for names that are not global
+        '''
+        if workspace is None:
+            entries = self.find("style", name, GLOBAL) or self.find("style", name)
+        else:
+            entries = self.find("style", name, workspace)
+        return self.object(entries[0])
+
+    def from_href(self, href):
+        '''
+        create the catalog object for the store or resource an href points to,
+        straight from the segments of the href and without listing anything.
+        Returns None if the href is not a store or resource href
+        '''
+        segments = [unquote(s) for s in urlparse(href).path.split("/")]
+        if "workspaces" not in segments:
+            return None
+        segments = segments[segments.index("workspaces") + 1:]
+        store_types = dict((f, t) for t, f, _ in _STORES)
+        resource_types = dict((_RESOURCES[t][1][:-len(".xml")], t) for t in _WORKSPACE_LISTED)
+        if len(segments) == 3 and segments[1] in resource_types:
+            # a resource listed by workspace, whose store is not known yet
+            store_type = resource_types[segments[1]]
+            return self.object(IndexEntry("resource", _RESOURCES[store_type][0], _strip(segments[2]),
+                                          segments[0], None, store_type, href))
+        if len(segments) < 3 or segments[1] not in store_types:
+            return None
+        workspace, store_type, store = segments[0], store_types[segments[1]], _strip(segments[2])
+        if len(segments) == 3:
+            return self.object(IndexEntry("store", store_type, store, workspace, link=href))
+        element, listing, _ = _RESOURCES[store_type]
+        if len(segments) != 5 or segments[3] + ".xml" != listing:
+            return None
+        return self.object(IndexEntry("resource", element, _strip(segments[4]), workspace,
+                                      store, store_type, href))
+
+    def object(self, entry, workspace=None, store=None):
+        '''
+        the catalog object for an index entry, with what the ones handed out
+        before read if they are still in the identity map of the catalog (see
+        Catalog.identities). workspace and store are optional objects to use
+        as the workspace and store of stores and resources that are not
+        '''
+        identities = self.catalog.identities
+        if entry.href is not None:
+            obj = identities.get(entry.href)
+            if obj is not None:
+                return obj
+        return identities.share(self._build(entry, workspace, store))
+
+    def _build(self, entry, workspace=None, store=None):
+        '''create the catalog object for an index entry'''
+        cat = self.catalog
+        if entry.kind == "workspace":
+            return Workspace(cat, entry.name)
+        if entry.kind == "layer":
+            return Layer(cat, entry.name)
+        if entry.kind == "layergroup":
+            return LayerGroup(cat, entry.name, entry.workspace)
+        if entry.kind == "style":
+            return Style(cat, entry.name, entry.workspace)
+        if workspace is None or workspace.name != entry.workspace:
+            workspace = Workspace(cat, entry.workspace)
+        if entry.kind == "store":
+            return self._store(entry.type, entry.name, workspace)
+        cls = _RESOURCES[entry.store_type][2]
+        if entry.store is None:
+            # listed by workspace: the resource finds its store when asked for it
+            href = build_url(cat.service_url, ["workspaces", entry.workspace, cls.url_part_types, entry.name + ".xml"])
+            return cls(cat, workspace, None, entry.name, href=href)
+        if store is None:
+            store = self._store(entry.store_type, entry.store, workspace)
+        return cls(cat, workspace, store, entry.name)
+
+    def _store(self, type, name, workspace):
+        cls = dict((t, c) for t, _, c in _STORES)[type]
+        if cls is WmsStore:
+            return WmsStore(self.catalog, workspace, name, None, None)
+        return cls(self.catalog, workspace, name)
+
+    # building
+
+    def _scope(self, kind, workspace):
+        with self._lock:
+            scope = self._scopes.get((kind, workspace))
+            if scope is not None and datetime.now() - scope.checked < self.catalog._cache.ttl:
+                return scope
+            generation = self._generation
+            entries = getattr(self, "_walk_" + kind)(workspace)
+            if scope is None or entries != scope.entries:
+                scope = _Scope(entries)
+            else:
+                scope.checked = datetime.now()
+            if generation == self._generation:
+                self._scopes[(kind, workspace)] = scope
+            return scope
+
+    def _fetch(self, url):
+        '''return (content, None), or (None, error) if the request failed'''
+        from geoserver.catalog import FailedRequestError
+        try:
+            return self.catalog.get_content(url), None
+        except FailedRequestError as e:
+            return None, e
+
+    def _prefetch(self, urls):
+        '''
+        fetch the listings at urls on the catalog's thread pool, see Catalog.fan_out.
+        In deferred mode (see Catalog.deferred), ask for all the missing ones at once
+        '''
+        from geoserver.catalog import MissingDocuments
+        documents = self.catalog.deferred_documents()
+        if documents is not None:
+            missing = [url for url in urls if url not in documents]
+            if missing:
+                raise MissingDocuments(missing)
+            return dict((url, documents[url]) for url in urls)
+        return dict(zip(urls, self.catalog.fan_out(self._fetch, urls)))
+
+    def _load(self, url, element, make, tolerate=lambda e: False, fetched=None):
+        '''
+        return the entries made from the (name, href) pairs of the `element`
+        entries of the listing at url, parsing it again only if its document
+        changed since the previous call. The listing is taken from the
+        `fetched` dict of _prefetch if it is there
+        '''
+        section = self._sections.get(url)
+        content, error = fetched[url] if fetched and url in fetched else self._fetch(url)
+        if error is not None and not tolerate(error):
+            raise error
+        if section is None or section.content is not content:
+            pairs = iter_listing(content, element) if content is not None else []
+            section = _Section(content, [make(name, link) for name, link in pairs])
+            for entry in section.entries:
+                self._resolve(entry)
+            self._sections[url] = section
+        return section.entries
+
+    def _resolve(self, entry):
+        '''set the href of an entry, the one of its catalog object'''
+        href = self._build(entry).href
+        # the href advertised by the server is most often the same, keep a single copy
+        entry.href = entry.link if entry.link == href else href
+
+    def _workspace_names(self, workspace):
+        if workspace is not None:
+            return [workspace]
+        return [e.name for e in self._scope("workspace", None).entries]
+
+    def _walk_workspace(self, workspace):
+        return self._load(self._workspaces_url(), "workspace", _make("workspace", "workspace"))
+
+    def _workspaces_url(self):
+        return "{}/workspaces.xml".format(self.catalog.service_url)
+
+    def _walk_store(self, workspace):
+        listings = [(ws, type) for ws in self._workspace_names(workspace) for type, _, _ in _STORES]
+        fetched = self._prefetch([self._stores_url(ws, type) for ws, type in listings])
+        entries = []
+        for ws, type in listings:
+            entries.extend(self._walk_stores_of(ws, type, fetched))
+        return entries
+
+    def _stores_url(self, ws, type):
+        return build_url(self.catalog.service_url, ["workspaces", ws, _folder(type) + ".xml"])
+
+    def _walk_stores_of(self, ws, type, fetched=None):
+        return self._load(self._stores_url(ws, type), type, _make("store", type, ws), fetched=fetched)
+
+    def _walk_resource(self, workspace):
+        '''
+        resources are listed by workspace where the server supports it, which
+        costs a request per workspace and resource type instead of one per store
+        '''
+        from geoserver.catalog import FailedRequestError
+        by_workspace = self._lists_by_workspace()
+        listings = [(ws, type, by_workspace and type in _WORKSPACE_LISTED)
+                    for ws in self._workspace_names(workspace) for type, _, _ in _STORES]
+        fetched = self._prefetch([self._workspace_resources_url(ws, type) if listed else self._stores_url(ws, type)
+                                  for ws, type, listed in listings])
+        # the resources of each workspace and type, or the stores to list them from
+        parts = []
+        for ws, type, listed in listings:
+            if listed:
+                try:
+                    parts.append((self._walk_workspace_resources(ws, type, fetched), []))
+                    continue
+                except FailedRequestError as e:
+                    if _missing_workspace(e):
+                        continue
+                    self._by_workspace = False
+            parts.append(([], self._walk_stores_of(ws, type, fetched)))
+        fetched = self._prefetch([self._store_resources_url(store) for _, stores in parts for store in stores])
+        entries = []
+        for resources, stores in parts:
+            entries.extend(resources)
+            for store in stores:
+                entries.extend(self._walk_store_resources(store, fetched))
+        return entries
+
+    def _lists_by_workspace(self):
+        if self._by_workspace is None:
+            self._by_workspace = _version(self.catalog.gsversion()) >= WORKSPACE_LISTINGS_SINCE
+        return self._by_workspace
+
+    def _workspace_resources_url(self, ws, store_type):
+        return build_url(self.catalog.service_url, ["workspaces", ws, _RESOURCES[store_type][1]])
+
+    def _walk_workspace_resources(self, ws, store_type, fetched=None):
+        element = _RESOURCES[store_type][0]
+        return self._load(self._workspace_resources_url(ws, store_type), element,
+                          _make("resource", element, ws, None, store_type), fetched=fetched)
+
+    def _store_resources_url(self, store):
+        return build_url(self.catalog.service_url,
+                         ["workspaces", store.workspace, _folder(store.type), store.name, _RESOURCES[store.type][1]])
+
+    def _walk_store_resources(self, store, fetched=None):
+        element = _RESOURCES[store.type][0]
+        # a broken store should not hide the resources of the other ones
+        return self._load(self._store_resources_url(store), element,
+                          _make("resource", element, store.workspace, store.name, store.type),
+                          tolerate=lambda e: True, fetched=fetched)
+
+    def _walk_layer(self, workspace):
+        return self._load(self._layers_url(), "layer", _make("layer", "layer"))
+
+    def _layers_url(self):
+        return "{}/layers.xml".format(self.catalog.service_url)
+
+    def _walk_layergroup(self, workspace):
+        return self._walk_global("layergroup", "layerGroup", "layergroups.xml", workspace)
+
+    def _walk_style(self, workspace):
+        return self._walk_global("style", "style", "styles.xml", workspace)
+
+    def _walk_global(self, kind, element, listing, workspace):
+        '''
+        layer groups and styles are listed globally and per workspace;
+        the global ones come first when no workspace is given
+        '''
+        entries = []
+        urls = self._global_urls(listing, workspace)
+        fetched = self._prefetch([url for _, url in urls])
+        for ws, url in urls:
+            entries.extend(self._load(url, element, _make(kind, element, ws),
+                                      tolerate=_missing_workspace, fetched=fetched))
+        return entries
+
+    def _global_urls(self, listing, workspace):
+        '''the (workspace, url) pairs of the listings of layer groups or styles'''
+        urls = []
+        if workspace is None or workspace == GLOBAL:
+            urls.append((None, "{}/{}".format(self.catalog.service_url, listing)))
+        if workspace != GLOBAL:
+            for ws in self._workspace_names(workspace):
+                urls.append((ws, "{}/workspaces/{}/{}".format(self.catalog.service_url, ws, listing)))
+        return urls
+
+    # streaming
+
+    def stream(self, kind, workspace=None):
+        '''
+        yield the entries of a kind, for a workspace or for all workspaces, in
+        listing order, as their listings are downloaded and parsed (see
+        Catalog.iter_listing). The index itself is left as it is, but the
+        listings read to the end are cached for it
+        '''
+        return getattr(self, "_stream_" + kind)(workspace)
+
+    def _listing(self, url, element, make, tolerate=lambda e: False):
+        from geoserver.catalog import FailedRequestError
+        try:
+            for name, link in self.catalog.iter_listing(url, element):
+                entry = make(name, link)
+                self._resolve(entry)
+                yield entry
+        except FailedRequestError as e:
+            if not tolerate(e):
+                raise
+
+    def _stream_workspace(self, workspace):
+        return self._listing(self._workspaces_url(), "workspace", _make("workspace", "workspace"))
+
+    def _stream_layer(self, workspace):
+        return self._listing(self._layers_url(), "layer", _make("layer", "layer"))
+
+    def _stream_layergroup(self, workspace):
+        return self._stream_global("layergroup", "layerGroup", "layergroups.xml", workspace)
+
+    def _stream_style(self, workspace):
+        return self._stream_global("style", "style", "styles.xml", workspace)
+
+    def _stream_global(self, kind, element, listing, workspace):
+        for ws, url in self._global_urls(listing, workspace):
+            for entry in self._listing(url, element, _make(kind, element, ws), tolerate=_missing_workspace):
+                yield entry
+
+    def _stream_store(self, workspace):
+        for ws in self._workspace_names(workspace):
+            for type, _, _ in _STORES:
+                for entry in self._listing(self._stores_url(ws, type), type, _make("store", type, ws)):
+                    yield entry
+
+    def _stream_resource(self, workspace):
+        from geoserver.catalog import FailedRequestError
+        by_workspace = self._lists_by_workspace()
+        for ws in self._workspace_names(workspace):
+            for type, _, _ in _STORES:
+                element = _RESOURCES[type][0]
+                if by_workspace and type in _WORKSPACE_LISTED:
+                    try:
+                        # the status is checked before the first entry is read
+                        for entry in self._listing(self._workspace_resources_url(ws, type), element,
+                                                   _make("resource", element, ws, None, type)):
+                            yield entry
+                        continue
+                    except FailedRequestError as e:
+                        if _missing_workspace(e):
+                            continue
+                        self._by_workspace = by_workspace = False
+                for store in self._listing(self._stores_url(ws, type), type, _make("store", type, ws)):
+                    for entry in self._listing(self._store_resources_url(store), element,
+                                               _make("resource", element, ws, store.name, type),
+                                               tolerate=lambda e: True):
+                        yield entry
+
+
+def _make(kind, type, workspace=None, store=None, store_type=None):
+    '''the function making the index entries of a listing from its (name, href) pairs'''
+    def make(name, link):
+        return IndexEntry(kind, type, name, workspace, store, store_type, link)
+    return make
+
+
+def _strip(segment):
+    return segment[:-len(".xml")] if segment.endswith(".xml") else segment
+
+
+def _version(version):
+    '''the leading numbers of a version string: "2.16-SNAPSHOT" -> (2, 16), "2.2.x" -> (2, 2)'''
+    numbers = []
+    for part in str(version).replace("-", ".").split("."):
+        if not part.isdigit():
+            break
+        numbers.append(int(part))
+    return tuple(numbers)
+
+
+def _folder(store_type):
+    return dict((t, f) for t, f, _ in _STORES)[store_type]
+
+
+def _missing_workspace(error):
+    message = str(error).lower()
+    return "no such workspace" in message or ("workspace" in message and "not found" in message)
@@ -0,0 +1,153 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from geoserver.style import Style
+from geoserver.support import workspace_from_url
+
+# Every REST document lives in a listing named after its parent folder, so
+# workspaces/ws/datastores/ds.xml is listed by workspaces/ws/datastores.xml
+# and everything below it (featuretypes, ...) lives under workspaces/ws/datastores/ds/.
+# Unsaved objects are POSTed to the listing itself, e.g. workspaces/ws/datastores?name=ds
+
+
+_STORES_AND_RESOURCES = ("dataStore", "coverageStore", "wmsStore", "featureType", "coverage", "wmsLayer")
+
+
+def listing_url(href):
+    '''the URL of the listing that contains the document at href'''
+    path = href.split("?")[0]
+    if "?" not in href:
+        path = path.rsplit("/", 1)[0]
+    return path + ".xml"
+
+
+def subtree_prefix(href):
+    '''prefix shared by every URL below the document at href'''
+    path = href.split("?")[0]
+    if path.endswith(".xml"):
+        path = path[:-len(".xml")]
+    return path + "/"
+
+
+class Invalidation(object):
+    '''
+    The cached URLs made stale by a catalog mutation: exact URLs, and
+    prefixes matching whole subtrees (a deleted store takes its resources with it).
+    '''
+
+    def __init__(self, urls=(), prefixes=()):
+        self.urls = set(urls)
+        self.prefixes = set(prefixes)
+
+    def add(self, *urls):
+        self.urls.update(urls)
+
+    def add_prefix(self, *prefixes):
+        self.prefixes.update(prefixes)
+
+    def __repr__(self):
+        return "<Invalidation %s %s>" % (sorted(self.urls), sorted(self.prefixes))
+
+
+def _layer_groups(catalog, invalidation, ws=None):
+    '''the global layer groups, and the ones of the workspace ws, list the layers removed'''
+    invalidation.add_prefix("{}/layergroups".format(catalog.service_url))
+    if ws is not None:
+        invalidation.add_prefix("{}/workspaces/{}/layergroups".format(catalog.service_url, ws))
+
+
+def _layers(catalog, invalidation, ws=None):
+    '''layers are removed or changed along with their resources and styles'''
+    invalidation.add("{}/layers.xml".format(catalog.service_url))
+    invalidation.add_prefix("{}/layers/".format(catalog.service_url))
+    _layer_groups(catalog, invalidation, ws)
+
+
+def _layer_workspace(layer):
+    '''the workspace of a layer, from its prefixed name or the resource in its document'''
+    if ":" in layer.name:
+        return layer.name.split(":")[0]
+    dom = layer.dom
+    resource = dom.find("resource") if dom is not None else None
+    links = [n for n in resource if 'href' in n.attrib] if resource is not None else []
+    return workspace_from_url(links[0].get('href')) if links else None
+
+
+def _workspace_resources(catalog, href, invalidation):
+    '''resources are also listed by workspace, outside of their store'''
+    ws = workspace_from_url(href)
+    if ws is None:
+        return
+    for folder in ("featuretypes", "coverages"):
+        url = "{}/workspaces/{}/{}".format(catalog.service_url, ws, folder)
+        invalidation.add(url + ".xml")
+        invalidation.add_prefix(url + "/")
+
+
+def _layer_resource(catalog, layer, invalidation):
+    dom = layer.dom
+    resource = dom.find("resource") if dom is not None else None
+    links = [n for n in resource if 'href' in n.attrib] if resource is not None else []
+    if links:
+        href = links[0].get('href')
+        invalidation.add(href, listing_url(href))
+        invalidation.add_prefix(subtree_prefix(href))
+        _workspace_resources(catalog, href, invalidation)
+        return True
+    return False
+
+
+def object_invalidation(catalog, obj, method, recurse=False):
+    '''
+    Return the Invalidation for saving (method PUT or POST) or deleting
+    (method DELETE) the given catalog object.
+    '''
+    method = method.upper()
+    href = obj.href
+    invalidation = Invalidation([listing_url(href)])
+    if "?" not in href:
+        invalidation.add(href)
+    if isinstance(obj, Style):
+        invalidation.add(obj.body_href)
+    resource_type = getattr(obj, "resource_type", None)
+    if resource_type in _STORES_AND_RESOURCES:
+        _workspace_resources(catalog, href, invalidation)
+    if method != "DELETE":
+        return invalidation
+
+    invalidation.add_prefix(subtree_prefix(href))
+    if isinstance(obj, Style):
+        if recurse:
+            _layers(catalog, invalidation, workspace_from_url(href))
+    elif resource_type == "layer":
+        if recurse and not _layer_resource(catalog, obj, invalidation):
+            # the resource of a layer that was never fetched is unknown,
+            # so every resource listing might have changed
+            invalidation.add_prefix("{}/workspaces/".format(catalog.service_url))
+        ws = _layer_workspace(obj)
+        if ws is None:
+            # any workspace could have a layer group with the layer
+            invalidation.add_prefix("{}/workspaces/".format(catalog.service_url))
+        _layer_groups(catalog, invalidation, ws)
+    elif resource_type == "workspace":
+        invalidation.add("{}/workspaces/default.xml".format(catalog.service_url))
+        _layers(catalog, invalidation)
+    elif resource_type != "layerGroup":
+        # stores and resources
+        _layers(catalog, invalidation, workspace_from_url(href))
+    return invalidation
+
+
+def store_invalidation(catalog, store_href, new_layers=True):
+    '''
+    Return the Invalidation for uploading data into the store at store_href,
+    which may create the store itself, and its resources and layers.
+    '''
+    invalidation = Invalidation([store_href, listing_url(store_href)], [subtree_prefix(store_href)])
+    _workspace_resources(catalog, store_href, invalidation)
+    if new_layers:
+        invalidation.add("{}/layers.xml".format(catalog.service_url))
+    return invalidation
@@ -4,7 +4,7 @@ gsconfig is a python library for manipulating a GeoServer instance via the GeoSe
 The project is distributed under a MIT License .
 '''
 
-from geoserver.support import ResourceInfo, xml_property, write_bool, workspace_from_url
+from geoserver.support import ResourceInfo, xml_property, write_bool, workspace_from_url, intern
 from geoserver.style import Style
 
 
@@ -99,10 +99,16 @@ def _write_alternate_styles(builder, styles):
 
 
 class Layer(ResourceInfo):
+
+    __slots__ = ("name", "_resource")
+
+    _shared = ("_dom", "_resource")
+
     def __init__(self, catalog, name):
         super(Layer, self).__init__()
         self.catalog = catalog
-        self.name = name
+        self.name = intern(name)
+        self._resource = None
 
     resource_type = "layer"
     save_method = "PUT"
@@ -111,21 +117,37 @@ class Layer(ResourceInfo):
     def href(self):
         return "{}/layers/{}.xml".format(self.catalog.service_url, self.name)
 
+    def fetch(self):
+        super(Layer, self).fetch()
+        self._resource = None
+
     @property
     def resource(self):
-        if self.dom is None:
-            self.fetch()
-        name = self.dom.find("resource/name").text
-        atom_link = [n for n in self.dom.find("resource").getchildren() if 'href' in n.attrib]
-        ws_name = workspace_from_url(atom_link[0].get('href'))
-        return self.catalog.get_resources(names=name.split(":")[-1], workspaces=ws_name)[0]
+        '''
+        the resource of the layer, built from the href in the layer document
+        so it costs a single request when it is first read, and kept until
+        the layer is fetched again
+        '''
+        if self._resource is not None:
+            return self._resource
+        dom = self.document()
+        name = dom.find("resource/name").text
+        atom_link = [n for n in list(dom.find("resource")) if 'href' in n.attrib]
+        href = atom_link[0].get('href')
+        index = self.catalog.index
+        resource = index.from_href(href)
+        if resource is None:
+            # not a REST href we understand, look the resource up by name instead
+            ws_name = workspace_from_url(href)
+            resource = index.object(index.find("resource", name.split(":")[-1], ws_name)[0])
+        self._resource = resource
+        self.catalog.identities.remember(self)
+        return resource
 
     def _get_default_style(self):
-        if 'default_style' in self.dirty:
+        if self._is_dirty('default_style'):
             return self.dirty['default_style']
-        if self.dom is None:
-            self.fetch()
-        element = self.dom.find("defaultStyle")
+        element = self.document().find("defaultStyle")
         # aborted data uploads can result in no default style
         return self._resolve_style(element) if element is not None else None
 
@@ -135,10 +157,10 @@ class Layer(ResourceInfo):
         else:
             style_name = element.find('name').text
             ws_name = None
-        atom_link = [n for n in element.getchildren() if 'href' in n.attrib]
+        atom_link = [n for n in list(element) if 'href' in n.attrib]
         if atom_link and ws_name is None:
             ws_name = workspace_from_url(atom_link[0].get("href"))
-        return self.catalog.get_styles(names=style_name, workspaces=ws_name)[0]
+        return self.catalog.index.style(style_name, ws_name)
 
     def _set_default_style(self, style):
         if isinstance(style, Style):
@@ -146,11 +168,9 @@ class Layer(ResourceInfo):
         self.dirty["default_style"] = style
 
     def _get_alternate_styles(self):
-        if "alternate_styles" in self.dirty:
+        if self._is_dirty("alternate_styles"):
             return self.dirty["alternate_styles"]
-        if self.dom is None:
-            self.fetch()
-        styles_list = self.dom.findall("styles/style")
+        styles_list = self.document().findall("styles/style")
         return [self._resolve_style(s) for s in styles_list]
 
     def _set_alternate_styles(self, styles):
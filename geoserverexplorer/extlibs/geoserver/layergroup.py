@@ -106,12 +106,10 @@ class LayerGroup(ResourceInfo):
     title = xml_property("title")
 
     def _layers_getter(self):
-        if "layers" in self.dirty:
+        if self._is_dirty("layers"):
             return self.dirty["layers"]
         else:
-            if self.dom is None:
-                self.fetch()
-            node = self.dom.find(self._layer_parent)
+            node = self.document().find(self._layer_parent)
             return _layer_list(node, self._layer_element) if node is not None else None
 
     def _layers_setter(self, value):
@@ -0,0 +1,69 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from xml.etree.ElementTree import XMLPullParser
+
+ATOM_LINK = "{http://www.w3.org/2005/Atom}link"
+
+
+class ListingParser(object):
+    """
+    Incremental parser of a REST listing such as layers.xml: feed() it the
+    document in as many parts as it comes in, and it returns the (name, href)
+    pairs of the `element` children of the root read so far. Children are
+    dropped as soon as they are read, so that memory does not grow with the
+    size of the listing.
+    """
+
+    def __init__(self, element):
+        self.element = element
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+
+    def feed(self, data):
+        self._parser.feed(data)
+        return self._read()
+
+    def close(self):
+        '''end the document, raises xml.etree.ElementTree.ParseError if it is not complete'''
+        self._parser.close()
+        return self._read()
+
+    def _read(self):
+        found = []
+        for event, node in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = node
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+            if node.tag == self.element:
+                name = node.find("name")
+                link = node.find(ATOM_LINK)
+                found.append((name.text if name is not None else None,
+                              link.get("href") if link is not None else None))
+            self._root.remove(node)
+        return found
+
+
+def iter_listing(chunks, element):
+    '''
+    yield the (name, href) pairs of the `element` children of a REST listing
+    as they are parsed from chunks, the bytes of the whole document or an
+    iterable of parts of it
+    '''
+    if isinstance(chunks, (bytes, str)):
+        chunks = [chunks]
+    parser = ListingParser(element)
+    for chunk in chunks:
+        for pair in parser.feed(chunk):
+            yield pair
+    for pair in parser.close():
+        yield pair
@@ -0,0 +1,243 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+import inspect
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.poolmanager import PoolManager
+
+
+def _counting_supported():
+    '''
+    whether urllib3 has the pool methods _CountingPool and _PoolManager
+    override, with the parameters they expect, as urllib3 1.21 to 2.x do
+    '''
+    expected = [(HTTPConnectionPool, "_new_conn", ["self"]),
+                (HTTPConnectionPool, "_get_conn", ["self", "timeout"]),
+                (HTTPConnectionPool, "_put_conn", ["self", "conn"]),
+                (PoolManager, "_new_pool", ["self", "scheme", "host", "port", "request_context"])]
+    for klass, name, parameters in expected:
+        method = getattr(klass, name, None)
+        if method is None or list(inspect.signature(method).parameters) != parameters:
+            return False
+    return True
+
+
+# whether TunedAdapter can count connections and close idle ones, see requirements.txt for
+# the supported urllib3 versions; pools are left as urllib3 makes them otherwise
+COUNTING = _counting_supported()
+
+
+class PoolStats(object):
+    """
+    Counters of the connections of a TunedAdapter:
+    - opened: connections opened to the server
+    - reused: requests sent over a kept-alive connection
+    - discarded: connections closed because the pool was full when they
+      were released, they were idle for too long, or the server closed them
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(opened = self.opened, reused = self.reused, discarded = self.discarded)
+
+
+class _CountingPool(object):
+    '''urllib3 connection pool keeping PoolStats, set up by _PoolManager'''
+
+    stats = None
+    idle_timeout = None
+
+    def _new_conn(self):
+        self.stats.count("opened")
+        return super(_CountingPool, self)._new_conn()
+
+    def _get_conn(self, timeout=None):
+        conn = super(_CountingPool, self)._get_conn(timeout)
+        idle_since = getattr(conn, "_idle_since", None)
+        if idle_since is None:
+            # a connection that was just opened
+            return conn
+        conn._idle_since = None
+        idle = time.time() - idle_since
+        if conn.sock is None or (self.idle_timeout and idle > self.idle_timeout):
+            conn.close()
+            self.stats.count("discarded")
+            return self._new_conn()
+        self.stats.count("reused")
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._idle_since = time.time()
+            if self.pool is not None and hasattr(self.pool, "full") and self.pool.full():
+                # urllib3 closes it with a warning in the log
+                self.stats.count("discarded")
+        super(_CountingPool, self)._put_conn(conn)
+
+
+class _CountingHTTPConnectionPool(_CountingPool, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPool, HTTPSConnectionPool):
+    pass
+
+
+class _PoolManager(PoolManager):
+
+    def __init__(self, stats, idle_timeout, **kwargs):
+        super(_PoolManager, self).__init__(**kwargs)
+        self.stats = stats
+        self.idle_timeout = idle_timeout
+        if COUNTING:
+            self.pool_classes_by_scheme = {
+                "http": _CountingHTTPConnectionPool,
+                "https": _CountingHTTPSConnectionPool
+            }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super(_PoolManager, self)._new_pool(scheme, host, port, request_context)
+        if COUNTING:
+            pool.stats = self.stats
+            pool.idle_timeout = self.idle_timeout
+        return pool
+
+
+class TunedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter keeping up to `pool_size` connections per host. When they
+    are all in use, further requests wait for one to be released if
+    `pool_block` is set, and open extra connections that are closed after
+    use otherwise. Connections idle for more than `idle_timeout` seconds are
+    closed instead of reused, so that a load balancer does not drop them
+    under our feet. `stats` counts the connections (see PoolStats).
+
+    Counting connections and closing idle ones override methods of the
+    urllib3 pools, which only the supported urllib3 versions have (see
+    COUNTING). With others, the pools only keep their size.
+    """
+
+    def __init__(self, pool_size=10, pool_block=False, idle_timeout=None, max_retries=0):
+        self.stats = PoolStats()
+        self.idle_timeout = idle_timeout
+        super(TunedAdapter, self).__init__(pool_connections=pool_size, pool_maxsize=pool_size,
+                                           max_retries=max_retries, pool_block=pool_block)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _PoolManager(self.stats, self.idle_timeout, num_pools=connections,
+                                        maxsize=maxsize, block=block, **pool_kwargs)
+
+
+class ThreadSessions(object):
+    """
+    Stands for a requests session, but gives every thread a session of its
+    own, as sessions are not meant to be shared between threads. They all
+    send their requests through the same adapter, whose connection pools
+    are thread safe, so the threads share the connections kept open.
+    """
+
+    def __init__(self, service_url, adapter, verify=True, headers=None):
+        self.prefix = requests.utils.urlparse(service_url).scheme + "://"
+        self.adapter = adapter
+        self.verify = verify
+        self.headers = dict(headers or {})
+        self._local = threading.local()
+
+    def session(self):
+        '''the session of the calling thread'''
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.session()
+            session.verify = self.verify
+            session.headers.update(self.headers)
+            session.mount(self.prefix, self.adapter)
+            self._local.session = session
+        return session
+
+    def close(self):
+        '''close the connections kept open, the next requests open new ones'''
+        self.adapter.close()
+
+    def __getattr__(self, name):
+        # get, post, get_adapter... of the session of the calling thread
+        return getattr(self.session(), name)
+
+
+def tuned_session(service_url, validate_ssl_certificate=True, pool_size=10, pool_block=False,
+                  keep_alive=True, idle_timeout=None):
+    '''per-thread requests sessions sending the requests to service_url through a TunedAdapter'''
+    headers = {} if keep_alive else {"Connection": "close"}
+    adapter = TunedAdapter(pool_size, pool_block, idle_timeout)
+    return ThreadSessions(service_url, adapter, validate_ssl_certificate, headers)
+
+
+# connection settings -> [tuned session, number of catalogs using it]
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(service_url, username, validate_ssl_certificate=True, pool_size=10, pool_block=False,
+                   keep_alive=True, idle_timeout=None):
+    '''
+    the tuned session of the catalogs with the same URL, user and connection
+    settings, so that catalog objects created again for the same server keep
+    using the connections already open. Give it back with release_session
+    '''
+    key = (service_url, username, validate_ssl_certificate, pool_size, pool_block, keep_alive, idle_timeout)
+    with _sessions_lock:
+        entry = _sessions.get(key)
+        if entry is None:
+            entry = _sessions[key] = [tuned_session(service_url, validate_ssl_certificate, pool_size,
+                                                    pool_block, keep_alive, idle_timeout), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_session(session):
+    '''give back a session of shared_session, closing it if no other catalog uses it'''
+    with _sessions_lock:
+        for key, entry in list(_sessions.items()):
+            if entry[0] is session:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del _sessions[key]
+                break
+        else:
+            return
+    session.close()
+
+
+def close_sessions():
+    '''close every shared session, whether catalogs use it or not, when unloading for instance'''
+    with _sessions_lock:
+        sessions = [entry[0] for entry in _sessions.values()]
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def session_stats(session, url):
+    '''the PoolStats counters of the adapter of session for url, or None if it is not tuned or cannot count'''
+    adapter = session.get_adapter(url)
+    return adapter.stats.as_dict() if COUNTING and isinstance(adapter, TunedAdapter) else None
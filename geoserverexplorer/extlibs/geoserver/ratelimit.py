@@ -0,0 +1,160 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger("gsconfig.ratelimit")
+
+
+class TokenBucket(object):
+    """
+    Lets through `rate` units per second on average, and bursts of up to
+    `burst` units. A take larger than what is left goes through as soon as
+    the bucket is not empty, and the takes after it wait for the debt to be
+    paid, so that a large upload does not wait for a bucket it can never fit
+    in.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self._updated = time.time()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now):
+        '''the seconds to wait for the bucket not to be empty'''
+        self._refill(now)
+        return 0.0 if self.tokens > 0 else -self.tokens / self.rate + 1e-6
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+
+class RateLimiter(object):
+    """
+    Spaces out the requests going through it to `rate` requests per second,
+    and their uploads to `byte_rate` bytes per second, no limit being None.
+
+    When `adaptive`, the rates follow how the server copes: they are halved
+    when requests take more than `slowdown` times as long as the fastest
+    ones seen lately, and a tenth of a second longer at least, or are answered with a 429 or 503, at most once per
+    second, and grow back by a tenth of the configured rates on every
+    request answered in time. They never go below a tenth of those.
+    """
+
+    def __init__(self, rate=None, byte_rate=None, adaptive=True, slowdown=2.0):
+        self.max_rate = rate
+        self.max_byte_rate = byte_rate
+        self.adaptive = adaptive
+        self.slowdown = slowdown
+        self._requests = TokenBucket(rate) if rate else None
+        self._bytes = TokenBucket(byte_rate) if byte_rate else None
+        # the fraction of the configured rates in use
+        self.factor = 1.0
+        # the time of the fastest answers lately, slowly forgotten
+        self.baseline = None
+        self._backed_off = 0
+        self.throttled = 0
+        self.throttle_time = 0.0
+        self.backoffs = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        '''locks cannot be pickled'''
+        state = dict(vars(self))
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self):
+        return self._requests is not None or self._bytes is not None
+
+    def wait(self, size=0, timeout=None):
+        '''
+        wait for a request uploading size bytes to be allowed through, for up
+        to timeout seconds, and return whether it was
+        '''
+        start = time.time()
+        while True:
+            delay = self.take(size, start)
+            if delay <= 0:
+                return True
+            if timeout is not None and time.time() + delay - start > timeout:
+                return False
+            time.sleep(delay)
+
+    def take(self, size=0, since=None):
+        '''
+        let a request uploading size bytes through if the rates allow it now,
+        and return 0, or return the seconds to wait before asking again.
+        since is the time the request started waiting at, for the stats
+        '''
+        if not self.limited:
+            return 0.0
+        with self._lock:
+            now = time.time()
+            buckets = [b for b in (self._requests, self._bytes if size else None) if b is not None]
+            delay = max([b.delay(now) for b in buckets] + [0.0])
+            if delay > 0:
+                return delay
+            if self._requests is not None:
+                self._requests.take(1, now)
+            if size and self._bytes is not None:
+                self._bytes.take(size, now)
+            waited = now - (now if since is None else since)
+            if waited > 0.001:
+                self.throttled += 1
+                self.throttle_time += waited
+            return 0.0
+
+    def record(self, seconds, overloaded=False):
+        '''adapt the rates to the time a request took, and whether the server said it was overloaded'''
+        if not self.limited or not self.adaptive:
+            return
+        with self._lock:
+            if self.baseline is None or seconds < self.baseline:
+                self.baseline = seconds
+            else:
+                # forget a baseline the server cannot achieve anymore, slowly
+                self.baseline += (seconds - self.baseline) * 0.01
+            now = time.time()
+            if overloaded or seconds > max(self.baseline * self.slowdown, self.baseline + 0.1):
+                if now - self._backed_off >= 1:
+                    self._backed_off = now
+                    self.backoffs += 1
+                    self._scale(max(0.1, self.factor / 2))
+                    logger.info("Server slowing down, bulk requests at {:.0%} of their rate".format(self.factor))
+            elif self.factor < 1:
+                self._scale(min(1.0, self.factor + 0.1))
+
+    def _scale(self, factor):
+        self.factor = factor
+        if self._requests is not None:
+            self._requests.rate = self.max_rate * factor
+        if self._bytes is not None:
+            self._bytes.rate = self.max_byte_rate * factor
+
+    def stats(self):
+        '''
+        the rates in use, the number of requests held back and the seconds
+        they waited, and the number of times the rates were reduced
+        '''
+        with self._lock:
+            return dict(rate = self._requests.rate if self._requests else None,
+                        byte_rate = self._bytes.rate if self._bytes else None,
+                        throttled = self.throttled, throttle_time = self.throttle_time,
+                        backoffs = self.backoffs)
@@ -0,0 +1,74 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+import threading
+
+
+class CatalogRegistry(object):
+    """
+    Hands out a single catalog per service URL and identity (the user, or
+    whatever the catalog authenticates with), so that the parts of an
+    application working with the same server share its connections, cache
+    and index instead of each building a cold catalog of its own.
+
+    acquire() creates the catalog the first time, with a factory, and counts
+    its users. Once every one of them has called release(), the catalog is
+    closed and forgotten.
+    """
+
+    def __init__(self):
+        # (service URL, identity) -> [catalog, number of users]
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, service_url, identity, factory):
+        '''the catalog for service_url and identity, created by calling factory if there is none'''
+        key = (service_url.strip("/"), identity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, catalog):
+        '''give back a catalog returned by acquire, closing it if it has no other user'''
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[0] is catalog:
+                    entry[1] -= 1
+                    if entry[1] > 0:
+                        return
+                    del self._entries[key]
+                    break
+            else:
+                return
+        catalog.close()
+
+    def find(self, service_url):
+        '''a catalog in use for service_url, whatever its identity, or None'''
+        service_url = service_url.strip("/")
+        with self._lock:
+            for (url, identity), entry in self._entries.items():
+                if url == service_url:
+                    return entry[0]
+        return None
+
+    def catalogs(self):
+        with self._lock:
+            return [entry[0] for entry in self._entries.values()]
+
+    def clear(self):
+        '''close every catalog, whether it has users or not'''
+        with self._lock:
+            catalogs = [entry[0] for entry in self._entries.values()]
+            self._entries.clear()
+        for catalog in catalogs:
+            catalog.close()
+
+
+# the registry of the process
+registry = CatalogRegistry()
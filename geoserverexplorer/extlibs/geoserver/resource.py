@@ -5,7 +5,8 @@ The project is distributed under a MIT License .
 '''
 
 from geoserver.support import (ResourceInfo, xml_property, write_string, bbox, metadata, write_metadata,
-                               write_bbox, string_list, write_string_list, attribute_list, write_bool, build_url)
+                               write_bbox, string_list, write_string_list, attribute_list, write_bool, build_url,
+                               intern)
 
 try:
     from past.builtins import basestring
@@ -71,6 +72,10 @@ def wmslayer_from_index(catalog, workspace, store, node):
 class _ResourceBase(ResourceInfo):
     save_method = 'PUT'
 
+    __slots__ = ("_workspace_name", "_store_name", "_href", "_workspace", "_store", "name")
+
+    _shared = ("_dom", "_store")
+
     def __init__(self, catalog, workspace, store, name, href=None):
         super(_ResourceBase, self).__init__()
 
@@ -80,15 +85,18 @@ class _ResourceBase(ResourceInfo):
             assert workspace is not None
         else:
             parts = href.split('/')
-            self._workspace_name = parts[parts.index('workspaces') + 1]
-            self._store_name = parts[parts.index(self.url_part_stores) + 1]
+            self._workspace_name = intern(parts[parts.index('workspaces') + 1])
+            # resources listed by workspace have hrefs without their store
+            self._store_name = None
+            if self.url_part_stores in parts:
+                self._store_name = intern(parts[parts.index(self.url_part_stores) + 1])
             name = parts[-1].replace('.xml', '')
 
         self._href = href
         self.catalog = catalog
         self._workspace = workspace
         self._store = store
-        self.name = name
+        self.name = intern(name)
 
     @property
     def workspace(self):
@@ -99,11 +107,21 @@ class _ResourceBase(ResourceInfo):
     @property
     def store(self):
         if not self._store:
-            self._store = self.catalog.get_stores(names=self._store_name, workspaces=self._workspace_name)
+            if self._store_name is None:
+                # only the resource document knows the store
+                node = self.document().find("store")
+                links = [n for n in list(node) if 'href' in n.attrib]
+                self._store = self.catalog.index.from_href(links[0].get('href')) if links else None
+                self._store_name = intern(node.find("name").text.split(":")[-1])
+            if not self._store:
+                self._store = self.catalog.get_stores(names=self._store_name, workspaces=self._workspace_name)[0]
+            self.catalog.identities.remember(self)
         return self._store
 
     @property
     def href(self):
+        if self._href:
+            return self._href
         url = build_url(
             self.catalog.service_url,
             [
@@ -115,7 +133,7 @@ class _ResourceBase(ResourceInfo):
                 self.name + ".xml"
             ]
         )
-        return self._href or url
+        return url
 
 
 class FeatureType(_ResourceBase):
@@ -124,6 +142,8 @@ class FeatureType(_ResourceBase):
     url_part_stores = 'datastores'
     url_part_types = 'featuretypes'
 
+    __slots__ = ()
+
     title = xml_property("title")
     native_name = xml_property("nativeName")
     abstract = xml_property("abstract")
@@ -209,6 +229,8 @@ class Coverage(_ResourceBase):
     url_part_stores = 'coveragestores'
     url_part_types = 'coverages'
 
+    __slots__ = ()
+
     title = xml_property("title")
     native_name = xml_property("nativeName")
     native_format = xml_property("nativeFormat")
@@ -259,6 +281,8 @@ class WmsLayer(ResourceInfo):
     resource_type = "wmsLayer"
     save_method = "PUT"
 
+    __slots__ = ("workspace", "store", "name")
+
     def __init__(self, catalog, workspace, store, name):
         super(WmsLayer, self).__init__()
         self.catalog = catalog
@@ -0,0 +1,134 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from email.utils import parsedate_tz, mktime_tz
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger("gsconfig.retry")
+
+
+def retry_after(headers):
+    '''the seconds to wait according to the Retry-After header, None without one'''
+    found = dict((str(k).lower(), v) for k, v in (headers or {}).items())
+    value = found.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - time.time())
+
+
+class RetryPolicy(object):
+    """
+    How a request is sent again after a connection error or an answer with
+    one of the `statuses`: at most `attempts` more times, after waiting for
+    the delay of the Retry-After header of the answer if it has one, or a
+    random delay of up to backoff * 2 ** attempt seconds capped to
+    max_backoff otherwise, so that the clients of a sick server do not all
+    retry at the same time.
+    """
+
+    def __init__(self, attempts=4, backoff=0.5, max_backoff=10, statuses=(429, 502, 503, 504)):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+
+    def delay(self, attempt, headers=None):
+        after = retry_after(headers)
+        if after is not None:
+            return after
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to a server after `threshold` failures in a row
+    (connection errors and 5xx answers): allow() is False until the server
+    answers again, so that the calls queued meanwhile fail at once instead
+    of each waiting for its own timeout.
+
+    With a `probe`, a callable returning whether the server answers, the
+    probe is called in a background thread every `cooldown` seconds until
+    it returns True. Without one, a single call is allowed through every
+    `cooldown` seconds to find out.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, probe=None, threshold=5, cooldown=10):
+        self.probe = probe
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        # the number of times the circuit was opened
+        self.trips = 0
+        self._retry_at = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.probe is None and time.time() >= self._retry_at:
+                self._retry_at = time.time() + self.cooldown
+                return True
+            return False
+
+    def record(self, failed):
+        '''count the outcome of a request'''
+        with self._lock:
+            if not failed:
+                if self.state == self.OPEN:
+                    logger.info("Server answers again, closing the circuit")
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.threshold:
+                logger.warning("{} failed requests in a row, opening the circuit".format(self.failures))
+                self.state = self.OPEN
+                self.trips += 1
+                self._retry_at = time.time() + self.cooldown
+                if self.probe is not None:
+                    self._schedule()
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.cooldown, self._probe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _probe(self):
+        try:
+            answers = self.probe()
+        except Exception:
+            answers = False
+        with self._lock:
+            self._timer = None
+            if self.state != self.OPEN:
+                return
+            if not answers:
+                self._schedule()
+                return
+        self.record(False)
+
+    def close(self):
+        '''stop probing'''
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
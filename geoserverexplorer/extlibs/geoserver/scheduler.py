@@ -0,0 +1,213 @@
+'''
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+'''
+
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+
+# the priority classes of requests, the first one goes first
+INTERACTIVE = "interactive"
+PREFETCH = "prefetch"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, PREFETCH, BULK)
+
+_priorities = threading.local()
+
+
+@contextmanager
+def priority(name):
+    '''
+    Within the context, the requests made by the calling thread, and by the
+    fan-outs it starts, are scheduled with the priority class `name`, unless
+    an inner context says otherwise. Requests made out of any context are
+    prefetch requests. Can be used as a decorator as well.
+    '''
+    if name not in PRIORITIES:
+        raise ValueError("Unknown priority class: {}".format(name))
+    with _scheduled_as(name, _current_flow()):
+        yield
+
+
+@contextmanager
+def _scheduled_as(name, flow):
+    previous = getattr(_priorities, "name", None), getattr(_priorities, "flow", None)
+    _priorities.name, _priorities.flow = name, flow
+    try:
+        yield
+    finally:
+        _priorities.name, _priorities.flow = previous
+
+
+def current_priority():
+    '''the priority class of the requests of the calling thread'''
+    return getattr(_priorities, "name", None) or PREFETCH
+
+
+def _current_flow():
+    # the requests of a thread and of the threads it hands work to form a flow
+    return getattr(_priorities, "flow", None) or threading.current_thread().ident
+
+
+def carry_priority(function):
+    '''
+    function, made to run in the thread it is handed to with the priority
+    of the calling thread, and in its flow
+    '''
+    name, flow = current_priority(), _current_flow()
+    def call(*args):
+        with _scheduled_as(name, flow):
+            return function(*args)
+    return call
+
+
+class _Waiter(object):
+
+    def __init__(self, flow, callback=None):
+        self.flow = flow
+        self.since = time.time()
+        self.granted = False
+        self.event = threading.Event()
+        self.callback = callback
+
+
+class _Class(object):
+    '''the requests of a priority class, running and waiting'''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.running = 0
+        # the waiters of every flow, and the flows in their round-robin order
+        self.flows = {}
+        self.order = deque()
+        self.waiting = 0
+        self.granted = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def push(self, waiter):
+        queue = self.flows.get(waiter.flow)
+        if queue is None:
+            queue = self.flows[waiter.flow] = deque()
+            self.order.append(waiter.flow)
+        queue.append(waiter)
+        self.waiting += 1
+
+    def pop(self):
+        flow = self.order.popleft()
+        queue = self.flows[flow]
+        waiter = queue.popleft()
+        if queue:
+            self.order.append(flow)
+        else:
+            del self.flows[flow]
+        self.waiting -= 1
+        return waiter
+
+    def remove(self, waiter):
+        queue = self.flows[waiter.flow]
+        queue.remove(waiter)
+        if not queue:
+            del self.flows[waiter.flow]
+            self.order.remove(waiter.flow)
+        self.waiting -= 1
+
+
+class RequestScheduler(object):
+    """
+    Decides when the requests of a catalog are sent, so that a request made
+    to show something to the user does not wait behind the hundreds queued
+    by a bulk publication.
+
+    At most `slots` requests are sent at once, and at most limits[name] of
+    the priority class `name` (see PRIORITIES). When a slot is released, it
+    goes to a waiting request of the first class below its limit. Within a
+    class, the slots go round-robin to the flows waiting for one, a flow
+    being the requests of a thread and of the fan-outs it starts, so that a
+    busy job does not starve the others. By default, interactive
+    requests can use every slot, the others half of them, so that an
+    interactive request does not even wait for a slot to be released.
+    """
+
+    def __init__(self, slots=10, limits=None):
+        self.slots = max(1, slots)
+        default = max(1, self.slots // 2)
+        limits = dict({INTERACTIVE: self.slots, PREFETCH: default, BULK: default}, **(limits or {}))
+        self._classes = dict((name, _Class(max(1, limits[name]))) for name in PRIORITIES)
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, name, timeout=None):
+        '''
+        wait for a slot for a request of the priority class name, for up to
+        timeout seconds, and return whether one was given
+        '''
+        waiter = self.reserve(name)
+        if waiter.event.wait(timeout):
+            return True
+        return self.cancel(name, waiter)
+
+    def reserve(self, name, callback=None):
+        '''
+        queue a request of the priority class name for a slot without waiting
+        for it, and return its waiter, whose event is set once it is given
+        one. callback, if any, is then called without arguments, with the
+        lock of the scheduler held, so it must only hand the slot over
+        '''
+        waiter = _Waiter(_current_flow(), callback)
+        with self._lock:
+            self._classes[name].push(waiter)
+            self._dispatch()
+        return waiter
+
+    def cancel(self, name, waiter):
+        '''
+        take a waiter of reserve out of the queue, and return whether it was
+        given a slot already, which must then be released
+        '''
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._classes[name].remove(waiter)
+            return False
+
+    def release(self, name):
+        '''give back the slot of a request of the priority class name'''
+        with self._lock:
+            self._classes[name].running -= 1
+            self._running -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        while self._running < self.slots:
+            for name in PRIORITIES:
+                klass = self._classes[name]
+                if klass.waiting and klass.running < klass.limit:
+                    break
+            else:
+                return
+            waiter = klass.pop()
+            waited = time.time() - waiter.since
+            klass.running += 1
+            klass.granted += 1
+            klass.wait_time += waited
+            klass.max_wait = max(klass.max_wait, waited)
+            self._running += 1
+            waiter.granted = True
+            waiter.event.set()
+            if waiter.callback is not None:
+                waiter.callback()
+
+    def stats(self):
+        '''
+        for every priority class, the number of requests waiting for a slot
+        (the queue depth) and running, the number of slots given, and the
+        total and longest time waited for them, in seconds
+        '''
+        with self._lock:
+            return dict((name, dict(waiting = klass.waiting, running = klass.running, granted = klass.granted,
+                                    wait_time = klass.wait_time, max_wait = klass.max_wait))
+                        for name, klass in self._classes.items())
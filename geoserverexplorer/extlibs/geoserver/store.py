@@ -5,7 +5,8 @@ The project is distributed under a MIT License .
 '''
 
 import geoserver.workspace as ws
-from geoserver.resource import featuretype_from_index, coverage_from_index, wmslayer_from_index
+from geoserver.resource import (FeatureType, Coverage, WmsLayer,
+                                featuretype_from_index, coverage_from_index, wmslayer_from_index)
 from geoserver.support import ResourceInfo, xml_property, key_value_pairs, write_bool, write_dict, write_string, build_url
 
 try:
@@ -36,6 +37,8 @@ class DataStore(ResourceInfo):
     resource_type = "dataStore"
     save_method = "PUT"
 
+    __slots__ = ("workspace",)
+
     def __init__(self, catalog, workspace, name):
         super(DataStore, self).__init__()
 
@@ -85,6 +88,8 @@ class DataStore(ResourceInfo):
         return url
 
     def get_resources(self, name=None, available=False):
+        if name is None and not available:
+            return list(self.iter_resources())
         res_url = self.resource_url
         if available:
             res_url += "?list=available"
@@ -93,16 +98,18 @@ class DataStore(ResourceInfo):
         def ft_from_node(node):
             return featuretype_from_index(self.catalog, self.workspace, self, node)
 
-        # if name passed, return only one FeatureType, otherwise return all FeatureTypes in store:
+        # if name passed, return only one FeatureType, otherwise the names of the available ones:
         if name is not None:
             for node in xml.findall("featureType"):
                 if node.findtext("name") == name:
-                    return ft_from_node(node)
+                    return self.catalog.identities.share(ft_from_node(node))
             return None
-        if available:
-            return [str(node.text) for node in xml.findall("featureTypeName")]
-        else:
-            return [ft_from_node(node) for node in xml.findall("featureType")]
+        return [str(node.text) for node in xml.findall("featureTypeName")]
+
+    def iter_resources(self):
+        '''yield the feature types of the store as their listing is downloaded'''
+        for name, _ in self.catalog.iter_listing(self.resource_url, "featureType"):
+            yield self.catalog.identities.share(FeatureType(self.catalog, self.workspace, self, name))
 
 
 class UnsavedDataStore(DataStore):
@@ -130,6 +137,8 @@ class CoverageStore(ResourceInfo):
     resource_type = 'coverageStore'
     save_method = "PUT"
 
+    __slots__ = ("workspace",)
+
     def __init__(self, catalog, workspace, name):
         super(CoverageStore, self).__init__()
 
@@ -163,8 +172,9 @@ class CoverageStore(ResourceInfo):
         workspace = write_string("workspace")
     )
 
-    def get_resources(self, name=None):
-        res_url = build_url(
+    @property
+    def resource_url(self):
+        return build_url(
             self.catalog.service_url,
             [
                 "workspaces",
@@ -175,18 +185,24 @@ class CoverageStore(ResourceInfo):
             ]
         )
 
-        xml = self.catalog.get_xml(res_url)
+    def get_resources(self, name=None):
+        if name is None:
+            return list(self.iter_resources())
+        xml = self.catalog.get_xml(self.resource_url)
 
         def cov_from_node(node):
             return coverage_from_index(self.catalog, self.workspace, self, node)
 
-        # if name passed, return only one Coverage, otherwise return all Coverages in store:
-        if name is not None:
-            for node in xml.findall("coverage"):
-                if node.findtext("name") == name:
-                    return cov_from_node(node)
-            return None
-        return [cov_from_node(node) for node in xml.findall("coverage")]
+        # if name passed, return only one Coverage
+        for node in xml.findall("coverage"):
+            if node.findtext("name") == name:
+                return self.catalog.identities.share(cov_from_node(node))
+        return None
+
+    def iter_resources(self):
+        '''yield the coverages of the store as their listing is downloaded'''
+        for name, _ in self.catalog.iter_listing(self.resource_url, "coverage"):
+            yield self.catalog.identities.share(Coverage(self.catalog, self.workspace, self, name))
 
 
 class UnsavedCoverageStore(CoverageStore):
@@ -220,6 +236,8 @@ class WmsStore(ResourceInfo):
     resource_type = "wmsStore"
     save_method = "PUT"
 
+    __slots__ = ("workspace",)
+
     def __init__(self, catalog, workspace, name, user, password):
         super(WmsStore, self).__init__()
         self.catalog = catalog
@@ -246,12 +264,18 @@ class WmsStore(ResourceInfo):
                    type = write_string("type"),
                    metadata = write_dict("metadata"))
 
-    def get_resources(self, name=None, available=False):
-        res_url = "{}/workspaces/{}/wmsstores/{}/wmslayers.xml".format(
+    @property
+    def resource_url(self):
+        return "{}/workspaces/{}/wmsstores/{}/wmslayers.xml".format(
             self.catalog.service_url,
             self.workspace.name,
             self.name
         )
+
+    def get_resources(self, name=None, available=False):
+        if name is None and not available:
+            return list(self.iter_resources())
+        res_url = self.resource_url
         layer_name_attr = "wmsLayer"
 
         if available:
@@ -263,17 +287,19 @@ class WmsStore(ResourceInfo):
         def wl_from_node(node):
             return wmslayer_from_index(self.catalog, self.workspace, self, node)
 
-        # if name passed, return only one layer, otherwise return all layers in store:
+        # if name passed, return only one layer, otherwise the names of the available ones:
         if name is not None:
             for node in xml.findall(layer_name_attr):
                 if node.findtext("name") == name:
-                    return wl_from_node(node)
+                    return self.catalog.identities.share(wl_from_node(node))
             return None
 
-        if available:
-            return [str(node.text) for node in xml.findall(layer_name_attr)]
-        else:
-            return [wl_from_node(node) for node in xml.findall(layer_name_attr)]
+        return [str(node.text) for node in xml.findall(layer_name_attr)]
+
+    def iter_resources(self):
+        '''yield the WMS layers of the store as their listing is downloaded'''
+        for name, _ in self.catalog.iter_listing(self.resource_url, "wmsLayer"):
+            yield self.catalog.identities.share(WmsLayer(self.catalog, self.workspace, self, name))
 
 
 class UnsavedWmsStore(WmsStore):
@@ -4,7 +4,7 @@ gsconfig is a python library for manipulating a GeoServer instance via the GeoSe
 The project is distributed under a MIT License .
 '''
 
-from geoserver.support import ResourceInfo, build_url, xml_property
+from geoserver.support import ResourceInfo, build_url, xml_property, intern
 try:
     from past.builtins import basestring
 except ImportError:
@@ -19,14 +19,18 @@ class Style(ResourceInfo):
         "zip": "application/zip"
     }
 
+    __slots__ = ("workspace", "name", "style_format", "_sld_dom")
+
+    _shared = ("_dom", "_sld_dom")
+
     def __init__(self, catalog, name, workspace=None, style_format="sld10"):
         super(Style, self).__init__()
         assert isinstance(name, basestring)
         assert style_format in Style.supported_formats
 
         self.catalog = catalog
-        self.workspace = workspace
-        self.name = name
+        self.workspace = intern(workspace)
+        self.name = intern(name)
         self.style_format = style_format
         self._sld_dom = None
 
@@ -66,6 +70,7 @@ class Style(ResourceInfo):
     def _get_sld_dom(self):
         if self._sld_dom is None:
             self._sld_dom = self.catalog.get_xml(self.body_href)
+            self.catalog.identities.remember(self)
         return self._sld_dom
 
     @property
@@ -100,10 +105,11 @@ class Style(ResourceInfo):
 
     @property
     def sld_body(self):
-        resp = self.catalog.http_request(self.body_href)
-        return resp.content
+        return self.catalog.get_cached(self.body_href)[1]
 
     def update_body(self, body):
         headers = {"Content-Type": self.content_type}
         self.catalog.http_request(
             self.body_href, body, "PUT", headers)
+        self.catalog.invalidate(self)
+        self._sld_dom = None
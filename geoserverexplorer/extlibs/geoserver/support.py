@@ -5,6 +5,8 @@ The project is distributed under a MIT License .
 '''
 
 import logging
+import sys
+import weakref
 from xml.etree.ElementTree import TreeBuilder, tostring
 from tempfile import mkstemp
 from zipfile import ZipFile
@@ -65,15 +67,21 @@ def build_url(base, seg, query=None):
     return urljoin(adjusted_base, path)
 
 
+def intern(name):
+    '''
+    the one copy of a name, such as the name of a workspace or store, shared by
+    every catalog object and index entry that uses it
+    '''
+    return sys.intern(name) if type(name) is str else name
+
+
 def xml_property(path, converter = lambda x: x.text, default=None):
     def getter(self):
-        if path in self.dirty:
+        if self._is_dirty(path):
             return self.dirty[path]
         else:
-            if self.dom is None:
-                self.fetch()
-            node = self.dom.find(path)
-            return converter(self.dom.find(path)) if node is not None else default
+            node = self.document().find(path)
+            return converter(node) if node is not None else default
 
     def setter(self, value):
         self.dirty[path] = value
@@ -187,16 +195,67 @@ def write_metadata(name):
 
 
 class ResourceInfo(object):
+    """
+    Catalog objects are created by the thousand for large catalogs, so they
+    use __slots__ instead of an instance dict, and their dirty dict is only
+    created once something is changed.
+
+    The document of an object is read on first use. When the response cache
+    keeps its tree, the object only references it weakly: the tree goes
+    with its cache entry, within the bounds of the cache, and is read again
+    the next time it is needed. A tree the cache does not keep is kept by
+    the object.
+    """
+
+    __slots__ = ("catalog", "_dom", "_dirty", "__weakref__")
+
+    # the attributes holding what the object read, shared with its copies (see geoserver.identity)
+    _shared = ("_dom",)
 
     def __init__(self):
-        self.dom = None
-        self.dirty = dict()
+        self._dom = None
+        self._dirty = None
+
+    @property
+    def dom(self):
+        '''the document of the object, None if it was not read or was dropped from the cache'''
+        dom = self._dom
+        return dom() if isinstance(dom, weakref.ref) else dom
+
+    @dom.setter
+    def dom(self, dom):
+        self._dom = dom
+
+    @property
+    def dirty(self):
+        if self._dirty is None:
+            self._dirty = dict()
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, dirty):
+        self._dirty = dirty
+
+    def _is_dirty(self, key):
+        return self._dirty is not None and key in self._dirty
 
     def fetch(self):
-        self.dom = self.catalog.get_xml(self.href)
+        href = self.href
+        dom = self.catalog.get_document(href)
+        self._dom = weakref.ref(dom) if self.catalog.keeps_document(href, dom) else dom
+        self.catalog.identities.remember(self)
+
+    def document(self):
+        '''the document of the object, read if needed, unlike dom'''
+        dom = self.dom
+        while dom is None:
+            # the cache could drop the tree between fetch and dom, in another thread
+            self.fetch()
+            dom = self.dom
+        return dom
 
     def clear(self):
-        self.dirty = dict()
+        self._dirty = None
 
     def refresh(self):
         self.clear()
@@ -4,7 +4,7 @@ gsconfig is a python library for manipulating a GeoServer instance via the GeoSe
 The project is distributed under a MIT License .
 '''
 
-from geoserver.support import xml_property, write_bool, ResourceInfo, build_url
+from geoserver.support import xml_property, write_bool, ResourceInfo, build_url, intern
 
 
 def workspace_from_index(catalog, node):
@@ -16,10 +16,12 @@ class Workspace(ResourceInfo):
 
     resource_type = "workspace"
 
+    __slots__ = ("name",)
+
     def __init__(self, catalog, name):
         super(Workspace, self).__init__()
         self.catalog = catalog
-        self.name = name
+        self.name = intern(name)
 
     @property
     def href(self):
@@ -20,32 +20,286 @@
 __author__ = 'Alessandro Pasotti'
 __date__ = 'August 2016'
 
-from datetime import timedelta, datetime
-from xml.etree.ElementTree import XML
-from xml.parsers.expat import ExpatError
-from geoserver.catalog import FailedRequestError
-from qgiscommons2.network.networkaccessmanager import NetworkAccessManager
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from geoserver.catalog import FailedRequestError, DeadlineExceeded, MissingDocuments, _upload_size
+from geoserver.cache import response_validators
+from geoserver.retry import CircuitBreaker
+from geoserver.scheduler import carry_priority, current_priority, BULK
 from .basecatalog import BaseCatalog
+from .transport import NetworkTransport
 
 class AuthCatalog(BaseCatalog):
 
-    def __init__(self, service_url, authid, cache_time):
-        # Do not call parent constructor, this is a patching class
+    def __init__(self, service_url, authid, cache_time, **settings):
+        # Do not call parent constructor, this is a patching class: the
+        # credentials are those of the QGIS authentication configuration
+        # authid. settings are the keyword arguments of Catalog
         self.authid = authid
         self.cache_time = cache_time
         self.service_url = service_url.strip("/")
-        self._cache = dict()
-        self._version = None
-        self.nam = NetworkAccessManager(self.authid, exception_class=FailedRequestError, debug=False)
         self.username = ''
         self.password = ''
+        self.validate_ssl_certificate = True
+        self.access_token = None
+        self._setup(cache_time=cache_time, **settings)
 
-    def http_request(self, url, data=None, method='get', headers = {}):
-        resp, content = self.nam.request(url, method, data, headers)
-        return resp
+    def __getstate__(self):
+        state = BaseCatalog.__getstate__(self)
+        state.pop('_transports', None)
+        return state
+
+    def setup_connection(self):
+        # requests go through the NetworkTransport of each thread, not a session
+        self._transports = threading.local()
+        # no background probe, QgsNetworkAccessManager requests belong to the Qt threads
+        self.breaker = CircuitBreaker()
+
+    @property
+    def transport(self):
+        '''
+        the NetworkTransport of the calling thread: QgsNetworkAccessManager
+        instances belong to a thread, whose event loop delivers their replies
+        '''
+        transport = getattr(self._transports, "transport", None)
+        if transport is None:
+            transport = self._transports.transport = NetworkTransport(self.authid)
+        transport.limit = self.max_workers
+        return transport
+
+    def _send(self, url, data, method, headers, timeout, stream=False):
+        transport = self.transport
+        return transport.wait(transport.request(url, method, data, headers, timeout), timeout)
+
+    def http_request_async(self, url, data=None, method='get', headers=None):
+        '''
+        send a request without waiting for it and return a Future of its
+        response, to be waited for with result(). The request goes through
+        the same steps as with http_request (rate limiter, scheduler, circuit
+        breaker, retries and deadline), driven by the event loop of the
+        calling thread, which must be the only one to use the Future
+        '''
+        return _AsyncRequest(self, url, data, method, dict(headers or {})).start()
+
+    def result(self, future, timeout=None):
+        '''wait for the response of a future of http_request_async, running the event loop meanwhile'''
+        return self.transport.wait(future, timeout, getattr(future, "abort", None))
+
+    def fan_out(self, function, items):
+        '''
+        see Catalog.fan_out. QgsNetworkAccessManager must not be used from the
+        threads of a pool, so the calls run in the calling thread, in deferred
+        mode (see Catalog.deferred): the documents they need are requested
+        all at once with http_request_async, and the calls that needed them
+        run again, until they have them all. function must only read
+        documents, since it can run several times
+        '''
+        items = list(items)
+        if len(items) < 2 or self.deferred_documents() is not None:
+            return [function(item) for item in items]
+        documents = {}
+        results = [None] * len(items)
+        errors = [None] * len(items)
+        pending = list(range(len(items)))
+        while pending:
+            waiting = []
+            missing = set()
+            with self.deferred(documents):
+                for i in pending:
+                    try:
+                        results[i] = function(items[i])
+                    except MissingDocuments as e:
+                        waiting.append(i)
+                        missing.update(e.urls)
+                        asked = e
+                    except Exception as e:
+                        errors[i] = e
+            missing = [url for url in missing if url not in documents]
+            if waiting and not missing:
+                # the calls ask for documents they were given, they would run forever
+                raise asked
+            self._fetch_documents(documents, missing)
+            pending = waiting
+        for error in errors:
+            if error is not None:
+                raise error
+        return results
+
+    def _fetch_documents(self, documents, urls):
+        '''add the (content, error) pairs of the documents at urls to documents, requested at once'''
+        futures = [(url, self._content_async(url)) for url in urls]
+        for url, future in futures:
+            try:
+                documents[url] = self.result(future), None
+            except FailedRequestError as e:
+                documents[url] = None, e
+
+    def _content_async(self, url):
+        '''a Future of the content of the document at url, see Catalog.get_content'''
+        future = Future()
+        content = self._cache.get(url)
+        if content is not None:
+            future.set_result(content)
+            return future
+        def answered(sent, conditional):
+            try:
+                resp = sent.result()
+                if resp.status_code == 304 and conditional:
+                    content = self._cache.revalidate(url)
+                    if content is not None:
+                        future.set_result(content)
+                    else:
+                        self.http_request_async(url).add_done_callback(lambda sent: answered(sent, False))
+                    return
+                if resp.status_code != 200:
+                    raise FailedRequestError(resp.content)
+                etag, last_modified = response_validators(resp.headers)
+                self._cache.put(url, resp.content, etag, last_modified)
+                future.set_result(resp.content)
+            except Exception as e:
+                future.set_exception(e)
+        sent = self.http_request_async(url, headers=self._cache.conditional_headers(url))
+        sent.add_done_callback(lambda sent: answered(sent, True))
+        return future
+
+    def _auth_key(self):
+        return self.authid
 
     def setup_connection(self):
         pass
 
 
+class _ResponseFuture(Future):
+    '''a Future of http_request_async, whose request can be given up on'''
+
+    def __init__(self, request):
+        Future.__init__(self)
+        self.abort = request.abort
+
+
+class _AsyncRequest(object):
+    """
+    A request of AuthCatalog.http_request_async, going through the steps of
+    Catalog.http_request without blocking: the rate limiter for bulk
+    requests, a slot of the scheduler in the priority class of the caller,
+    the circuit breaker, and attempts as the retry policy says, by the
+    deadline. The waits are timers of the event loop of the transport, which
+    the slots of the scheduler are handed over to as well, so the steps all
+    run in the thread of the transport.
+    """
+
+    def __init__(self, catalog, url, data, method, headers):
+        self.catalog = catalog
+        self.transport = catalog.transport
+        self.url = url
+        self.data = data
+        self.method = method
+        self.headers = headers
+        self.priority = current_priority()
+        self.size = _upload_size(data) if method.lower() in ("post", "put") else 0
+        self.created = time.time()
+        self.deadline = catalog._deadline_at() or self.created + catalog.timeout
+        self.resend = not hasattr(data, "read")
+        self.attempt = 0
+        self.sent = None
+        self.waiter = None
+        self.sending = None
+        self.future = _ResponseFuture(self)
+        # the steps run from the event loop in the priority class, and the flow, of the caller
+        self._later = carry_priority(self._step)
+
+    def start(self):
+        self._step(self._limit if self.priority == BULK else self._schedule)
+        return self.future
+
+    def _step(self, step):
+        if self.future.done():
+            return
+        try:
+            step()
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+    def _limit(self):
+        delay = self.catalog.limiter.take(self.size, self.created)
+        if delay <= 0:
+            self._schedule()
+        elif time.time() + delay > self.deadline:
+            raise DeadlineExceeded("No time left to send {} {}, bulk requests are rate limited".format(
+                self.method.upper(), self.url))
+        else:
+            self.transport.later(delay, lambda: self._later(self._limit))
+
+    def _schedule(self):
+        remaining = self.catalog._time_to_send(self.method, self.url, self.deadline)
+        transport = self.transport
+        waiter = self.waiter = self.catalog.scheduler.reserve(
+            self.priority, lambda: transport.soon(lambda: self._granted(waiter)))
+        transport.later(remaining, lambda: self._expire(waiter))
+
+    def _expire(self, waiter):
+        if self.waiter is not waiter or self.catalog.scheduler.cancel(self.priority, waiter):
+            # sent already, or about to be
+            return
+        self.waiter = None
+        self._fail(DeadlineExceeded("No time left to send {} {}, waiting for the {} requests before it".format(
+            self.method.upper(), self.url, self.priority)))
+
+    def _granted(self, waiter):
+        if self.future.done() or self.waiter is not waiter:
+            self.catalog.scheduler.release(self.priority)
+            return
+        self.waiter = None
+        self.sent = time.time()
+        try:
+            sending = self.transport.request(self.url, self.method, self.data, self.headers,
+                                             max(self.deadline - self.sent, 0.001))
+        except Exception as e:
+            self.catalog.scheduler.release(self.priority)
+            self._fail(e)
+            return
+        self.sending = sending
+        self.transport.later(self.deadline - self.sent, lambda: self.transport.abort(sending))
+        sending.add_done_callback(self._answered)
+
+    def _answered(self, sending):
+        self.sending = None
+        self.catalog.scheduler.release(self.priority)
+        if self.future.done():
+            return
+        resp = None
+        try:
+            resp = sending.result()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        except Exception as e:
+            self._fail(e)
+            return
+        self.catalog._attempted(self.priority, self.size, self.sent, resp)
+        delay = self.catalog._retry_delay(self.attempt, resp, self.resend, self.deadline)
+        if delay is None:
+            if resp is None:
+                self._fail(FailedRequestError("{} {} failed: {}".format(self.method.upper(), self.url, error)))
+            else:
+                self.future.set_result(resp)
+            return
+        self.attempt += 1
+        self.transport.later(delay, lambda: self._later(self._schedule))
 
+    def abort(self):
+        '''give up on the request, which fails with a Timeout'''
+        if self.future.done():
+            return
+        self._fail(requests.exceptions.Timeout("Gave up on {} {}".format(self.method.upper(), self.url)))
+        # a slot given meanwhile is released when it is handed over, one in use when the answer comes
+        if self.waiter is not None:
+            self.catalog.scheduler.cancel(self.priority, self.waiter)
+            self.waiter = None
+        if self.sending is not None:
+            self.transport.abort(self.sending)
@@ -23,39 +23,28 @@ __author__ = 'Alessandro Pasotti'
 __date__ = 'August 2016'
 
 from geoserver.catalog import Catalog, FailedRequestError
-from geoserver.support import build_url
 from geoserver.layer import Layer
+from geoserver.support import build_url
+from qgis.core import QgsMessageLog, Qgis
 from qgis.gui import *
+from qgis.PyQt.QtCore import QThread, QCoreApplication
 from qgis.utils import iface
 import json
 from xml.etree.ElementTree import XML
 from xml.parsers.expat import ExpatError
 
-class BaseLayer(Layer):
-    """Patched to get correct resources from workspaces"""
-
-    @property
-    def resource(self):
-        if self.dom is None:
-            self.fetch()
-        name = self.dom.find("resource/name").text
-        if self.name.find(':') != -1:
-            return self.catalog.get_resource(name, workspace=self.name.split(':')[0])
-        return self.catalog.get_resource(name)
-
-
 class BaseCatalog(Catalog):
 
     def layersEndpointUrl(self):
         return self.service_url[:self.service_url.find("/rest")]
         
     def _get_res(self, name):
-        return [r for r in self.get_resources() if r.name == name]
+        return [self.index.object(e) for e in self.index.find("resource", name)]
 
     def get_namespaced_name(self, layer_name):
         """
-        Prefix the layer name with the workspace by querying all the resources
-        and finding the workspace from the one that matches the layer name.
+        Prefix the layer name with the workspace by looking up the resources
+        index and finding the workspace from the one that matches the layer name.
         If the layer exists in several workspaces, the first match is returned.
         Return layer_name if the layer resource does not exists.
         """
@@ -68,8 +57,19 @@ class BaseCatalog(Catalog):
             return layer_name
 
 
+    def _resource_workspaces(self):
+        """Map each resource name to the names of the workspaces that have a resource with that name"""
+        workspaces = {}
+        for entry in self.index.entries("resource"):
+            workspaces.setdefault(entry.name, []).append(entry.workspace)
+        return workspaces
+
     def get_layers(self, resource=None):
-        """Prefix the layer name with ws name"""
+        """
+        Prefix the layer name with ws name.
+        The workspaces are taken from a single sweep of the resources, so the
+        number of requests does not depend on the number of layers
+        """
         lyrs = super().get_layers(resource)
         # Start patch:
         layers = {}
@@ -79,28 +79,34 @@ class BaseCatalog(Catalog):
                 layers[l.name].append(l)
             except KeyError:
                 layers[l.name] = [l]
+        workspaces = None
+        if [name for name in layers if name.find(':') == -1]:
+            workspaces = self._resource_workspaces()
         # Prefix all names
         noAscii = False
         for name, ls in list(layers.items()):
             try:
-                if len(ls) == 1:
-                    l = ls[0]
-                    l.name = self.get_namespaced_name(l.name)
-                    result.append(l)
-                else:
-                    i = 0
-                    res = self._get_res(ls[0].name)
-                    for l in ls:
-                        l.name = "%s:%s" % (res[i].workspace.name, l.name)
-                        i += 1
-                        result.append(l)
+                if name.find(':') != -1:
+                    result.extend(ls)
+                    continue
+                wsNames = workspaces.get(name, [])
+                if len(ls) == 1 and not wsNames:
+                    result.extend(ls)
+                    continue
+                # layers listed under the same name can be the same object,
+                # so the prefixed layers are new ones instead of renamed ones
+                for i, l in enumerate(ls):
+                    result.append(self.identities.share(Layer(self, "%s:%s" % (wsNames[i], name))))
             except UnicodeDecodeError:
                 noAscii = True
 
         if noAscii:
-            iface.messageBar().pushMessage("Warning", "Some layers contain non-ascii characters and could not be loaded",
-                      level = QgsMessageBar.WARNING,
-                      duration = 10)
+            msg = "Some layers contain non-ascii characters and could not be loaded"
+            if QThread.currentThread() == QCoreApplication.instance().thread():
+                iface.messageBar().pushMessage("Warning", msg,
+                          level = QgsMessageBar.WARNING,
+                          duration = 10)
+            else:
+                # the message bar must not be used from QgsTask threads
+                QgsMessageLog.logMessage(msg, "GeoServer", Qgis.Warning)
         return result
-
-
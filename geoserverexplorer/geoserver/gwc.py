@@ -34,7 +34,11 @@ class Gwc(object):
             els = list(layer)
             name = els[0].text
             if name is not None:
-                layers.append(self.layer(name))
+                layers.append(GwcLayer(self, name))
+        # request every layer at once instead of one after another
+        futures = [self.catalog.http_request_async(layer.href) for layer in layers]
+        for layer, future in zip(layers, futures):
+            layer.read(self.catalog.result(future))
         return layers
 
     def layer(self, name):
@@ -67,7 +71,9 @@ class GwcLayer(object):
         self.metaHeight = metaHeight
 
     def fetch(self):
-        resp = self.gwc.catalog.http_request(self.href)
+        self.read(self.gwc.catalog.http_request(self.href))
+
+    def read(self, resp):
         if resp.status_code == 200:
             xml = XML(resp.text)
             self.mimetypes = [mimetype.text for mimetype in xml.iter('string')]
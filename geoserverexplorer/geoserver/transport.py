@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# (c) 2016 Boundless, http://boundlessgeo.com
+# This code is licensed under the GPL 2.0 license.
+#
+from collections import deque
+from concurrent.futures import Future
+import requests
+from requests.structures import CaseInsensitiveDict
+from qgis.core import QgsApplication, QgsNetworkAccessManager
+from qgis.PyQt.QtCore import QObject, QUrl, QEventLoop, QTimer, QByteArray, Qt, pyqtSignal, pyqtSlot
+from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
+
+
+class Response(object):
+    '''the parts of a requests response that the catalog code reads'''
+
+    def __init__(self, status_code, content, headers, reason=""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.reason = reason
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def iter_content(self, chunk_size=1):
+        # the reply is read whole before it is handed out
+        return iter([self.content])
+
+    def close(self):
+        pass
+
+
+def _body(data):
+    if data is None:
+        return QByteArray()
+    if hasattr(data, "read"):
+        data = data.read()
+    if not isinstance(data, bytes):
+        data = data.encode("utf-8")
+    return QByteArray(data)
+
+
+class _Mailbox(QObject):
+    '''runs the functions posted from any thread in the thread it was created in'''
+
+    posted = pyqtSignal(object)
+
+    def __init__(self):
+        QObject.__init__(self)
+        self.posted.connect(self._run, Qt.QueuedConnection)
+
+    @pyqtSlot(object)
+    def _run(self, function):
+        function()
+
+
+class NetworkTransport(object):
+    """
+    Sends requests with QgsNetworkAccessManager, with the authentication
+    configuration `authid`, without waiting for them: request() returns a
+    concurrent.futures.Future resolved when the reply signals it finished,
+    with a Response for any HTTP answer, or with a requests ConnectionError
+    or Timeout exception when there is none. At most `limit` requests are
+    in flight, the others are queued.
+
+    Replies are delivered by the event loop of the thread the transport was
+    created in, so it must only be used from that thread. wait() is the
+    blocking wrapper: it runs the event loop, ignoring user input, until a
+    future is done. later() and soon() schedule work of the callers on that
+    event loop.
+    """
+
+    def __init__(self, authid=None, limit=4):
+        self.authid = authid
+        self.limit = limit
+        self.nam = QgsNetworkAccessManager.instance()
+        self._queue = deque()
+        self._replies = {}
+        self._aborted = set()
+        self._mailbox = _Mailbox()
+        # the timers of later() that have not fired yet
+        self._timers = set()
+
+    def request(self, url, method='get', data=None, headers=None, timeout=None):
+        future = Future()
+        self._queue.append((future, url, method.upper(), data, dict(headers or {}), timeout))
+        self._start()
+        return future
+
+    def _start(self):
+        while self._queue and len(self._replies) < max(self.limit, 1):
+            future, url, method, data, headers, timeout = self._queue.popleft()
+            try:
+                reply = self._send(url, method, data, headers, timeout)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self._replies[reply] = future
+            reply.finished.connect(lambda reply=reply: self._finished(reply))
+
+    def _send(self, url, method, data, headers, timeout):
+        request = QNetworkRequest(QUrl(url))
+        for name, value in headers.items():
+            request.setRawHeader(name.encode("utf-8"), str(value).encode("utf-8"))
+        if timeout and hasattr(request, "setTransferTimeout"):
+            request.setTransferTimeout(int(timeout * 1000))
+        if self.authid:
+            QgsApplication.authManager().updateNetworkRequest(request, self.authid)
+        if method == "GET":
+            reply = self.nam.get(request)
+        elif method == "HEAD":
+            reply = self.nam.head(request)
+        elif method == "DELETE":
+            reply = self.nam.deleteResource(request)
+        elif method == "POST":
+            reply = self.nam.post(request, _body(data))
+        elif method == "PUT":
+            reply = self.nam.put(request, _body(data))
+        else:
+            reply = self.nam.sendCustomRequest(request, method.encode("utf-8"), _body(data))
+        if self.authid:
+            QgsApplication.authManager().updateNetworkReply(reply, self.authid)
+        return reply
+
+    def _finished(self, reply):
+        future = self._replies.pop(reply, None)
+        if future is None:
+            return
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if status is None:
+            msg = "Network error #{}: {}".format(reply.error(), reply.errorString())
+            if reply in self._aborted or reply.error() == QNetworkReply.TimeoutError:
+                future.set_exception(requests.exceptions.Timeout(msg))
+            else:
+                future.set_exception(requests.exceptions.ConnectionError(msg))
+        else:
+            headers = CaseInsensitiveDict((bytes(name).decode("utf-8"), bytes(value).decode("utf-8"))
+                                          for name, value in reply.rawHeaderPairs())
+            reason = reply.attribute(QNetworkRequest.HttpReasonPhraseAttribute) or ""
+            future.set_result(Response(int(status), bytes(reply.readAll()), headers, reason))
+        self._aborted.discard(reply)
+        reply.deleteLater()
+        self._start()
+
+    def abort(self, future):
+        '''give up on the request of future, which fails with a Timeout'''
+        for queued in list(self._queue):
+            if queued[0] is future:
+                self._queue.remove(queued)
+                future.set_exception(requests.exceptions.Timeout("Request aborted before it was sent"))
+                return
+        for reply, pending in list(self._replies.items()):
+            if pending is future:
+                self._aborted.add(reply)
+                reply.abort()
+
+    def later(self, seconds, function):
+        '''call function from the event loop in seconds, only from the thread of the transport'''
+        timer = QTimer()
+        timer.setSingleShot(True)
+        def fire():
+            self._timers.discard(timer)
+            function()
+        timer.timeout.connect(fire)
+        self._timers.add(timer)
+        timer.start(int(max(seconds, 0) * 1000))
+
+    def soon(self, function):
+        '''call function from the event loop of the thread of the transport, from any thread'''
+        self._mailbox.posted.emit(function)
+
+    def wait(self, future, timeout=None, abort=None):
+        '''
+        return the result of future, running the event loop until it is done.
+        After timeout seconds, abort is called, by default the abort of the
+        request of a future of request()
+        '''
+        if not future.done():
+            loop = QEventLoop()
+            future.add_done_callback(lambda f: loop.quit())
+            timer = None
+            if timeout:
+                timer = QTimer()
+                timer.setSingleShot(True)
+                timer.timeout.connect(abort or (lambda: self.abort(future)))
+                timer.start(int(timeout * 1000))
+            # the callback may have run already, and quit() does not outlive exec_()
+            if not future.done():
+                loop.exec_(QEventLoop.ExcludeUserInputEvents)
+            if timer is not None:
+                timer.stop()
+        return future.result()
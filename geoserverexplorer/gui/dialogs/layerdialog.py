@@ -126,9 +126,7 @@ class PublishLayersDialog(QDialog):
                 QSizePolicy(QSizePolicy.Maximum,
                                   QSizePolicy.Fixed))
             try:
-                defaultWorkspace = self.catalog.get_default_workspace()
-                defaultWorkspace.fetch()
-                defaultName = defaultWorkspace.dom.find('name').text
+                defaultName = self.catalog.get_default_workspace().name
             except:
                 defaultName = None
             workspaceNames = [w.name for w in workspaces]
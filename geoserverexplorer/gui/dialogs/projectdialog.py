@@ -29,9 +29,7 @@ class PublishProjectDialog(QDialog):
         self.workspaceBox = QComboBox()
         self.workspaces = self.catalog.get_workspaces()
         try:
-            defaultWorkspace = self.catalog.get_default_workspace()
-            defaultWorkspace.fetch()
-            defaultName = defaultWorkspace.dom.find('name').text
+            defaultName = self.catalog.get_default_workspace().name
         except:
             defaultName = None
         workspaceNames = [w.name for w in self.workspaces]
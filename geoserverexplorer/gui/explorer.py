@@ -19,6 +19,7 @@ from geoserverexplorer.gui.explorertree import ExplorerTreeWidget
 from geoserverexplorer.qgis.utils import UserCanceledOperation
 from qgiscommons2.settings import pluginSetting
 from geoserver.catalog import FailedRequestError
+from geoserver.scheduler import priority, INTERACTIVE
 from geoserverexplorer.gui import setInfo, setWarning, setError
 
 class GeoServerExplorer(QDockWidget):
@@ -105,12 +106,14 @@ class GeoServerExplorer(QDockWidget):
         noerror = True
         QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
         try:
-            command(*params)
-            for item in refresh:
-                if item is not None:
-                    item.refreshContent(self)
-            if None in refresh:
-                self.refreshContent()
+            # the user is waiting for it, its requests go before the background ones
+            with priority(INTERACTIVE):
+                command(*params)
+                for item in refresh:
+                    if item is not None:
+                        item.refreshContent(self)
+                if None in refresh:
+                    self.refreshContent()
             if msg is not None and not self.isProgressVisible:
                 setInfo("Operation <i>" + msg + "</i> correctly executed")
         except UserCanceledOperation:
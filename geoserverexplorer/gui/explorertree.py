@@ -14,6 +14,7 @@ from qgis.PyQt.QtCore import *
 from qgis.PyQt.QtWidgets import *
 from qgis.PyQt.QtWidgets import QMessageBox
 from geoserver.catalog import FailedRequestError
+from geoserver.scheduler import priority, INTERACTIVE
 
 class ExplorerTreeWidget(QTreeWidget):
 
@@ -78,7 +79,8 @@ class ExplorerTreeWidget(QTreeWidget):
         self.lastClicked = item
         if hasattr(item, 'descriptionWidget'):
             try:
-                widget = item.descriptionWidget(self, self.explorer)
+                with priority(INTERACTIVE):
+                    widget = item.descriptionWidget(self, self.explorer)
             except FailedRequestError:
                 QMessageBox.warning(self, "Error retrieving element description",
                                     "The element description cannot be retrieved.\nThe selected element might have been deleted.")
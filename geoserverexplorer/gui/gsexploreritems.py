@@ -21,12 +21,14 @@ from .dialogs.catalogdialog import DefineCatalogDialog
 from geoserver.style import Style
 from geoserver.layer import Layer
 from .dialogs.styledialog import AddStyleToLayerDialog, StyleFromLayerDialog
-from geoserverexplorer.qgis.catalog import CatalogWrapper
+from geoserverexplorer.qgis.catalog import CatalogWrapper, getCatalog, releaseCatalog
 from geoserverexplorer.gui.exploreritems import TreeItem
 from .dialogs.groupdialog import LayerGroupDialog
 from .dialogs.workspacedialog import DefineWorkspaceDialog
 from geoserver.layergroup import UnsavedLayerGroup
 from geoserver.catalog import FailedRequestError
+from geoserver.scheduler import priority, BULK
+from geoserver.diskcache import DiskCache
 import traceback
 from geoserverexplorer.geoserver.settings import Settings
 from geoserverexplorer.gui.parametereditor import ParameterEditor
@@ -41,7 +43,6 @@ from geoserverexplorer.gui.confirm import confirmDelete
 from _ssl import SSLError
 from geoserverexplorer.gui.gsoperations import *
 from geoserverexplorer.geoserver.basecatalog import BaseCatalog
-from geoserverexplorer.geoserver.auth import AuthCatalog
 import xml.dom.minidom
 from qgiscommons2.settings import pluginSetting
 from qgiscommons2.files import tempFilename
@@ -87,6 +88,7 @@ class GsTreeItem(TreeItem):
         else:
             return None
 
+    @priority(BULK)
     def deleteElements(self, selected, tree, explorer):
         elements = []
         uniqueStyles = []
@@ -294,15 +296,11 @@ class GsCatalogsItem(GsTreeItem):
         dlg = DefineCatalogDialog(self._catalogs)
         dlg.exec_()
         if dlg.ok:
+            cat = None
+            geoserverItem = None
             try:
                 QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
-                if dlg.authid:
-                    cache_time = pluginSetting("AuthCatalogXMLCacheTime")
-                    cat = AuthCatalog(dlg.url, dlg.authid, cache_time)
-                    self.catalog = cat
-                else:
-                    cat = BaseCatalog(dlg.url, dlg.username, dlg.password)
-                cat.authid = dlg.authid
+                cat = getCatalog(dlg.url, dlg.username, dlg.password, dlg.authid)
                 v = cat.gsversion()
                 try:
                     major = int(v.split(".")[0])
@@ -332,6 +330,8 @@ class GsCatalogsItem(GsTreeItem):
             except Exception as e:
                 setError("Could not connect to catalog", traceback.format_exc())
             finally:
+                if geoserverItem is None:
+                    releaseCatalog(cat)
                 QApplication.restoreOverrideCursor()
 
     def refreshContent(self, explorer):
@@ -348,9 +348,9 @@ class GsLayersItem(GsTreeItem):
         self.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDropEnabled)
 
     def populate(self):
-        layers = self.catalog.get_layers()
         items = {}
-        for layer in layers:
+        # the items show the title of the resource of each layer
+        for layer in self.catalog.prefetched(self.catalog.iter_layers(), ["resource"]):
             if layer.name in items:
                 items[layer.name].markAsDuplicated()
             else:
@@ -378,6 +378,12 @@ class GsGroupsItem(GsTreeItem):
 
     def populate(self):
         groups = self.catalog.get_layergroups()
+        failed = set([id(group) for group, error in self.catalog.prefetch(groups)])
+        # the layers of the groups get items of their own, which show the title of their resource
+        layers = dict([(layer.name, layer) for layer in self.catalog.get_layers()])
+        names = set([self.catalog.get_namespaced_name(name) for group in groups
+                     if id(group) not in failed for name in (group.layers or []) if name is not None])
+        self.catalog.prefetch([layers[name] for name in names if name in layers], ["resource"])
         for group in groups:
             groupItem = GsGroupItem(group)
             groupItem.populate()
@@ -410,9 +416,7 @@ class GsWorkspacesItem(GsTreeItem):
     def populate(self):
         cat = self.parentCatalog()
         try:
-            defaultWorkspace = cat.get_default_workspace()
-            defaultWorkspace.fetch()
-            defaultName = defaultWorkspace.dom.find('name').text
+            defaultName = cat.get_default_workspace().name
         except:
             defaultName = None
         workspaces = cat.get_workspaces()
@@ -513,8 +517,7 @@ class GsCatalogItem(GsTreeItem):
                 authtype = QgsApplication.authManager().configAuthMethodKey(authid)
                 if not authtype or authtype == '':
                     raise Exception("Cannot restore catalog. Invalid or missing auth information")
-                cache_time =  pluginSetting("AuthCatalogXMLCacheTime")
-                self.catalog = AuthCatalog(url, authid, cache_time)
+                self.catalog = getCatalog(url, authid=authid)
 
             else:
                 password, ok = QInputDialog.getText(None, "Catalog connection",
@@ -522,18 +525,52 @@ class GsCatalogItem(GsTreeItem):
                                           QLineEdit.Password)
                 if not ok:
                     raise UserCanceledOperation()
-                self.catalog = BaseCatalog(url, username, password)
-            self.catalog.authid = authid
+                self.catalog = getCatalog(url, username, password)
             QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
+        else:
+            # refreshing the catalog reads the objects again, which catalog lookups share otherwise
+            self.catalog.identities.clear()
         try:
+            preloaded = self.attachPersistentCache()
             self._populate()
+            self.revalidateInBackground(preloaded)
         except Exception as e:
             if catalogIsNone:
+                releaseCatalog(self.catalog)
                 self.catalog = None
             raise
         finally:
             self.element = self.catalog
 
+    def attachPersistentCache(self):
+        '''
+        Backs the catalog with the on-disk cache of the previous sessions, so
+        the tree can be rendered from it. Returns the preloaded urls
+        '''
+        if not pluginSetting("PersistentCache") or self.catalog._cache.store is not None:
+            return []
+        path = os.path.join(userFolder(), "catalogcache.sqlite")
+        maxBytes = int(pluginSetting("PersistentCacheSize")) * 1024 * 1024
+        return self.catalog.attach_store(DiskCache(path, self.catalog.service_url, self.catalog.identity(), maxBytes))
+
+    def revalidateInBackground(self, urls):
+        if not urls:
+            return
+        catalog = self.catalog
+        def revalidate(task):
+            return catalog.revalidate(urls)
+        def finished(exception, changed=None):
+            self._revalidationTask = None
+            tree = self.treeWidget()
+            if exception is None and changed and self.catalog is catalog and tree is not None:
+                self.refreshContent(tree.explorer)
+        self._revalidationTask = QgsTask.fromFunction("Revalidate GeoServer catalog", revalidate,
+                                                      on_finished=finished)
+        QgsApplication.taskManager().addTask(self._revalidationTask)
+
+    def purgeCache(self, explorer):
+        explorer.run(self.catalog.purge_cache, "Purge cache", [self])
+
     def _populate(self):
         self.isConnected = False
         self.workspacesItem = GsWorkspacesItem(self.catalog)
@@ -600,6 +637,10 @@ class GsCatalogItem(GsTreeItem):
             publishProjectAction = QAction(icon, "Publish QGIS project to this catalog", explorer)
             publishProjectAction.triggered.connect(lambda: self._publishProject(tree, explorer))
             actions.append(publishProjectAction)
+            icon = QIcon(os.path.dirname(__file__) + "/../images/delete.gif")
+            purgeCacheAction = QAction(icon, "Purge cache", explorer)
+            purgeCacheAction.triggered.connect(lambda: self.purgeCache(explorer))
+            actions.append(purgeCacheAction)
 
         icon = QIcon(os.path.dirname(__file__) + "/../images/edit.png")
         editAction = QAction(icon, "Edit...", explorer)
@@ -612,12 +653,9 @@ class GsCatalogItem(GsTreeItem):
         dlg = DefineCatalogDialog(explorer.catalogs(), explorer, self.catalog, self.name)
         dlg.exec_()
         if dlg.ok:
-            if dlg.authid:             
-                cache_time = pluginSetting("AuthCatalogXMLCacheTime")
-                self.catalog = AuthCatalog(dlg.url, dlg.authid, cache_time)          
-            else:
-                self.catalog = BaseCatalog(dlg.url, dlg.username, dlg.password)
-            self.catalog.authid = dlg.authid
+            previous = self.catalog
+            self.catalog = getCatalog(dlg.url, dlg.username, dlg.password, dlg.authid)
+            releaseCatalog(previous)
             if self.name != dlg.name:
                 if self.name in explorer.catalogs():
                     del explorer.catalogs()[self.name]
@@ -642,6 +680,8 @@ class GsCatalogItem(GsTreeItem):
         name = self.text(0)
         if name in self.parent()._catalogs:
             del self.parent()._catalogs[name]
+        releaseCatalog(self.catalog)
+        self.catalog = None
         settings = QSettings()
         settings.beginGroup("/GeoServer/Catalogs/" + name)
         settings.remove("");
@@ -11,6 +11,7 @@ from geoserverexplorer.qgis.catalog import CatalogWrapper
 from geoserverexplorer.gui.confirm import publishLayer
 from geoserverexplorer.gui.dialogs.projectdialog import PublishProjectDialog
 from geoserver.catalog import ConflictingDataError
+from geoserver.scheduler import priority, BULK
 from geoserverexplorer.gui.dialogs.layerdialog import PublishLayersDialog
 from geoserverexplorer.gui import setInfo, setWarning, setError
 from geoserverexplorer.geoserver import GeoserverException
@@ -35,9 +36,11 @@ class PublishLayersTask(QgsTask):
 
     def run(self):
         try:
-            for layerAndParams in self.layers:
-                catalog = CatalogWrapper(self.catalog)
-                catalog.publishLayer(*layerAndParams)
+            # give way to the requests of the user interface
+            with priority(BULK):
+                for layerAndParams in self.layers:
+                    catalog = CatalogWrapper(self.catalog)
+                    catalog.publishLayer(*layerAndParams)
             return True
         except Exception as e:            
             self.exception = e
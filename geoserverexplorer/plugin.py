@@ -13,6 +13,8 @@ from qgis.PyQt.QtWidgets import *
 from qgis import utils 
 from qgis.core import QgsMessageLog
 from geoserverexplorer.qgis import layerwatcher
+from geoserver.registry import registry
+from geoserver.pool import close_sessions
 from qgiscommons2.settings import pluginSetting, setPluginSetting, readSettings
 from qgiscommons2.gui import addHelpMenu, removeHelpMenu, addAboutMenu, removeAboutMenu
 from qgiscommons2.gui.settings import addSettingsMenu, removeSettingsMenu
@@ -36,6 +38,8 @@ class GeoServerExplorerPlugin(object):
         removeAboutMenu("GeoServer", self.iface.removePluginWebMenu)
         self.iface.removePluginWebMenu(u"GeoServer", self.explorerAction)
         layerwatcher.disconnectLayerWasAdded()
+        registry.clear()
+        close_sessions()
         try:
             from qgistester.tests import removeTestModule
             from geoserverexplorer.test import testplugin
@@ -6,11 +6,14 @@
 from builtins import str
 from builtins import object
 import os
+import hashlib
 from qgis.core import *
 from qgis.PyQt import QtCore
 from geoserverexplorer.geoserver import GeoserverException
 from geoserverexplorer.qgis import layers, exporter, utils
 from geoserver.catalog import ConflictingDataError, UploadError, FailedRequestError
+from geoserver.scheduler import priority, PREFETCH, BULK
+from geoserver.registry import registry
 from geoserverexplorer.qgis.sldadapter import adaptGsToQgs, getGsCompatibleSld, setUnits
 from geoserverexplorer.qgis import uri as uri_utils
 from geoserverexplorer.geoserver.auth import AuthCatalog
@@ -23,18 +26,72 @@ from geoserverexplorer.qgis.utils import addTrackedLayer
 from qgiscommons2.settings import pluginSetting
 from qgiscommons2.files import tempFilename
 
+def catalogSettings():
+    '''The keyword arguments of Catalog set in the plugin settings'''
+    return dict(max_workers=int(pluginSetting("ConcurrentRequests")),
+                timeout=float(pluginSetting("RequestTimeout")),
+                upload_timeout=float(pluginSetting("UploadTimeout")),
+                rate_limit=float(pluginSetting("BulkRequestRate")) or None,
+                upload_rate_limit=float(pluginSetting("BulkUploadRate")) * 1024 or None,
+                priority_limits={PREFETCH: int(pluginSetting("PrefetchRequests")),
+                                 BULK: int(pluginSetting("BulkRequests"))})
+
+def createBaseCatalog(service_url, username, password):
+    '''
+    Creates a catalog with the connection settings of the plugin. Catalogs
+    created again for the same server and user share its session, and keep
+    using the connections it has open
+    '''
+    return BaseCatalog(service_url, username, password,
+                       pool_size=int(pluginSetting("ConnectionPoolSize")),
+                       pool_block=pluginSetting("ConnectionPoolBlock"),
+                       keep_alive=pluginSetting("KeepAlive"),
+                       idle_timeout=float(pluginSetting("ConnectionIdleTimeout")) or None,
+                       share_session=True,
+                       **catalogSettings())
+
+def getCatalog(service_url, username=None, password=None, authid=None):
+    '''
+    Returns the catalog for a server and a user, or an authentication
+    configuration if authid is given, creating it the first time. Whoever
+    asks for the same server and identity gets the same catalog, with its
+    open connections and cached responses. Give it back with releaseCatalog
+    when done with it
+    '''
+    create = lambda: _createCatalog(service_url, username, password, authid)
+    if authid:
+        return registry.acquire(service_url, ("authcfg", authid), create)
+    # a changed password makes a new catalog, without keeping the password in the key
+    identity = ("basic", username, hashlib.sha256((password or "").encode("utf-8")).hexdigest())
+    return registry.acquire(service_url, identity, create)
+
+def _createCatalog(service_url, username, password, authid):
+    if authid:
+        catalog = AuthCatalog(service_url, authid, pluginSetting("AuthCatalogXMLCacheTime"), **catalogSettings())
+    else:
+        catalog = createBaseCatalog(service_url, username, password)
+    catalog.authid = authid or None
+    return catalog
+
+def releaseCatalog(catalog):
+    '''Gives back a catalog returned by getCatalog, closing it if nothing else uses it'''
+    if catalog is not None:
+        registry.release(catalog)
+
+def findCatalog(service_url):
+    '''Returns a catalog in use for a server, whatever its user, or None'''
+    return registry.find(service_url)
+
 def createGeoServerCatalog(service_url = "http://localhost:8080/geoserver/rest",
                            username="admin",
                            password="geoserver",
                            authid=None):
+    '''
+    Creates a catalog of its own, outside of those shared by getCatalog, so
+    there is nothing to give back when done with it
+    '''
     # if not authid use basic auth
-    if authid is None:
-        catalog = BaseCatalog(service_url, username, password)
-    else:
-        cache_time = pluginSetting("AuthCatalogXMLCacheTime")
-        catalog = AuthCatalog(service_url, authid, cache_time)
-
-    return CatalogWrapper(catalog)
+    return CatalogWrapper(_createCatalog(service_url, username, password, authid))
 
 
 class CatalogWrapper(object):
@@ -49,17 +106,18 @@ class CatalogWrapper(object):
         self.cleanUnusedStyles()
         self.cleanUnusedResources()
 
+    @priority(BULK)
     def cleanUnusedStyles(self):
         '''cleans styles that are not used by any layer'''
         usedStyles = set()
         styles = self.catalog.get_styles()
         layers = self.catalog.get_layers()
         groups = self.catalog.get_layergroups()
-        for layer in layers:
+        for layer in self.catalog.prefetched(layers):
             if layer.default_style is not None:
                 usedStyles.add(layer.default_style.name)
             usedStyles.update([s.name for s in layer.styles if s is not None])
-        for group in groups:
+        for group in self.catalog.prefetched(groups):
             usedStyles.update([s for s in group.styles if s is not None])
         toDelete = [s for s in styles if s.name not in usedStyles]
         for style in toDelete:
@@ -68,6 +126,7 @@ class CatalogWrapper(object):
             except FailedRequestError:
                 QgsMessageLog.logMessage("Cannot delete style '%s'" % style.name)
 
+    @priority(BULK)
     def cleanUnusedResources(self):
         '''cleans resources that are not published through any layer in the catalog'''
         usedResources = set()
@@ -84,6 +143,7 @@ class CatalogWrapper(object):
             if len(store.get_resources()) == 0:
                 self.catalog.delete(store)
 
+    @priority(BULK)
     def consolidateStyles(self):
         '''
         Deletes styles that are redundant and just keeps one copy of them
@@ -91,8 +151,9 @@ class CatalogWrapper(object):
         '''
         used = {}
         allstyles = self.catalog.get_styles()
-        for style in allstyles:
-            sld = style.sld_body.decode().replace("<sld:Name>%s</sld:Name>" % style.name, "")
+        bodies = self.catalog.fan_out(lambda style: style.sld_body, allstyles)
+        for style, body in zip(allstyles, bodies):
+            sld = body.decode().replace("<sld:Name>%s</sld:Name>" % style.name, "")
             if sld in list(used.keys()):
                 used[sld].append(style)
             else:
@@ -104,7 +165,7 @@ class CatalogWrapper(object):
             #find the layers that use any of the secondary styles in the list, and make them use the first one
             styleNames = [s.name for s in styles[1:]]
             layers = self.catalog.get_layers()
-            for layer in layers:
+            for layer in self.catalog.prefetched(layers):
                 changed = False
                 if layer.default_style.name in styleNames:
                     layer.default_style = styles[0]
@@ -142,9 +203,11 @@ class CatalogWrapper(object):
 
 
     def uploadIcons(self, icons):
-        for icon in icons:
-            url = self.catalog.service_url + "/resource/styles/" + icon[1]
-            r = self.catalog.http_request(url, data=icon[2], method="put")
+        # upload every icon at once instead of one after another
+        futures = [self.catalog.http_request_async(self.catalog.service_url + "/resource/styles/" + icon[1],
+                                                   data=icon[2], method="put") for icon in icons]
+        for future in futures:
+            self.catalog.result(future)
 
 
     def getDataFromLayer(self, layer):
@@ -203,10 +266,14 @@ class CatalogWrapper(object):
                      % layer.name(),  traceback.format_exc())
 
 
-        # Verify the resource was created
-        resources = self.catalog.get_resources(name)
-        if resources:
-            resource = resources[0]
+        # Verify the resource was created, through its layer so that only
+        # the layer and the resource documents are requested. Without a
+        # workspace, the store was created in the default one
+        if workspace is None:
+            workspace = self.catalog.get_default_workspace()
+        gslayer = self.catalog.get_layer("%s:%s" % (getattr(workspace, "name", workspace), name))
+        if gslayer is not None:
+            resource = gslayer.resource
             assert resource.name == name
         else:
             msg = ('could not create layer %s.' % name)
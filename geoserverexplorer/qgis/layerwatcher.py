@@ -14,7 +14,7 @@ from functools import partial
 from qgis.PyQt import QtCore, QtGui, QtWidgets
 from geoserverexplorer.qgis.utils import getTrackingInfo, removeTrackedLayer
 from geoserver.catalog import Catalog
-from geoserverexplorer.qgis.catalog import CatalogWrapper
+from geoserverexplorer.qgis.catalog import CatalogWrapper, findCatalog
 from qgiscommons2.settings import pluginSetting
 from qgiscommons2.files import tempFilename
 from geoserverexplorer.gui import setInfo, setWarning, setError
@@ -68,7 +68,8 @@ def updatePublishedStyle(layer):
             updateButton.setText("Update")
             def updateStyle():
                 url = getTrackingInfo(layer)
-                catalog = Catalog(url)
+                # the catalog of the explorer, connected with its credentials
+                catalog = findCatalog(url) or Catalog(url)
                 wrapper = CatalogWrapper(catalog)
                 wrapper.publishStyle(layer)
                 iface.messageBar().popWidget()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+# (c) 2016 Boundless, http://boundlessgeo.com
+# This code is licensed under the GPL 2.0 license.
+#
+'''
+Benchmarks of the catalog client against a local stand-in of the REST API.
+They report timings on stdout and only assert the expected order of magnitude,
+so they can run along with the unit tests.
+'''
+
+import unittest
+import gc
+import sys
+import time
+import types
+from xml.etree.ElementTree import XML
+from geoserver.catalog import Catalog
+from geoserver.codec import JSON_CODEC, XML_CODEC
+from geoserverexplorer.test.gsconfigtests import RestStandIn, xmlToJson
+
+ENTRIES = 10000
+
+
+def layersXml(count):
+    return "<layers>%s</layers>" % "".join(
+        '<layer><name>layer%i</name><atom:link xmlns:atom="http://www.w3.org/2005/Atom" '
+        'rel="alternate" href="http://localhost/geoserver/rest/layers/layer%i.xml" '
+        'type="application/xml"/></layer>' % (i, i) for i in range(count))
+
+
+def layerJson(name):
+    return ('{"layer": {"name": "%s", "type": "VECTOR", "enabled": true, '
+            '"defaultStyle": {"name": "point", "href": "http://localhost/geoserver/rest/styles/point.json"}, '
+            '"resource": {"@class": "featureType", "name": "ws:%s", '
+            '"href": "http://localhost/geoserver/rest/workspaces/ws/datastores/store/featuretypes/%s.json"}}}'
+            % (name, name, name))
+
+
+def footprint(objects, *excluded):
+    '''the bytes of the objects and of everything they reference, but the excluded objects and code'''
+    seen = set(id(obj) for obj in excluded)
+    size = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+        # recent Pythons keep instance dicts inline until they are asked for, count them anyway
+        attributes = getattr(obj, "__dict__", None)
+        if type(attributes) is dict:
+            stack.append(attributes)
+    return size
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+class ParsedCacheBenchmark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("layers.xml", layersXml(ENTRIES))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def testCachedListingSkipsParse(self):
+        cat = Catalog(self.server.url, cache_time=600)
+        url = "%s/layers.xml" % self.server.url
+        cat.get_xml(url)
+        content = cat._cache.get(url)
+        parse = timed(lambda: XML(content), 10)
+        hit = timed(lambda: cat.get_xml(url), 10)
+        print("\n%i-entry listing: parse %.2f ms, cached get_xml %.4f ms, %.2f ms saved per hit"
+              % (ENTRIES, parse * 1000, hit * 1000, (parse - hit) * 1000))
+        self.assertLess(hit * 10, parse)
+
+
+class CodecBenchmark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = layersXml(ENTRIES).encode("utf-8")
+        cls.json = xmlToJson(layersXml(ENTRIES)).encode("utf-8")
+
+    def testListing(self):
+        dom = timed(lambda: XML(self.xml).findall("layer"), 10)
+        xml = timed(lambda: list(XML_CODEC.listing(self.xml, "layer")), 10)
+        js = timed(lambda: list(JSON_CODEC.listing(self.json, "layer")), 10)
+        print("\n%i-entry listing: XML %i KB, parsed in %.2f ms (tree) and %.2f ms (streamed), "
+              "JSON %i KB, parsed in %.2f ms"
+              % (ENTRIES, len(self.xml) / 1024, dom * 1000, xml * 1000, len(self.json) / 1024, js * 1000))
+        self.assertEqual(list(XML_CODEC.listing(self.xml, "layer"))[-1], list(JSON_CODEC.listing(self.json, "layer"))[-1])
+        self.assertLess(len(self.json), len(self.xml))
+        self.assertLess(js, xml)
+
+    def testDocument(self):
+        # parsed, and read through the element interface the catalog objects use
+        read = lambda root: [node.findtext("name") for node in root.findall("layer")]
+        dom = timed(lambda: read(XML_CODEC.parse(self.xml)), 10)
+        js = timed(lambda: read(JSON_CODEC.parse(self.json)), 10)
+        print("\n%i-entry document: read in %.2f ms from XML, %.2f ms from JSON" % (ENTRIES, dom * 1000, js * 1000))
+        self.assertLess(js, dom)
+
+
+class MemoryBenchmark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("layers.xml", layersXml(ENTRIES))
+        for i in range(ENTRIES):
+            cls.server.add("layers/layer%i.json" % i, layerJson("layer%i" % i))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def testFootprint(self):
+        # the response cache keeps its default bounds
+        cat = Catalog(self.server.url, cache_time=600)
+        layers = cat.get_layers()
+        listed = footprint([cat.index], cat), footprint(layers, cat)
+        enabled = [layer.enabled for layer in layers]
+        gc.collect()
+        fetched = footprint(layers, cat), footprint([cat._cache], cat, cat.index, cat.identities)
+        print("\n%i layers: index %i KB, layers %i KB listed and %i KB once read, response cache %i KB"
+              % (ENTRIES, listed[0] / 1024, listed[1] / 1024, fetched[0] / 1024, fetched[1] / 1024))
+        self.assertEqual(ENTRIES, enabled.count(True))
+
+
+class IdentityMapBenchmark(unittest.TestCase):
+
+    LAYERS = 1000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("layers.xml", layersXml(cls.LAYERS))
+        for i in range(cls.LAYERS):
+            cls.server.add("layers/layer%i.json" % i, layerJson("layer%i" % i))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def testRepeatedLookups(self):
+        # what uniqueStyles does for every layer of a selection, with cached
+        # responses expired in between, as they are after a few seconds
+        cat = Catalog(self.server.url, cache_time=0, cache_max_entries=2 * self.LAYERS)
+        def styles():
+            return [layer.enabled for layer in cat.get_layers()]
+        first = timed(styles, 1)
+        requests = self.server.count()
+        again = timed(styles, 5)
+        print("\n%i layers: first lookup %.3f s, next ones %.4f s and %i requests"
+              % (self.LAYERS, first, again, self.server.count() - requests))
+        # layers.xml is checked again, not the layers
+        self.assertEqual(1, self.server.count("layers/layer0.json"))
+        self.assertLess(again, first)
+
+
+
+class PrefetchBenchmark(unittest.TestCase):
+
+    LAYERS = 200
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("layers.xml", layersXml(cls.LAYERS))
+        for i in range(cls.LAYERS):
+            cls.server.add("layers/layer%i.json" % i, layerJson("layer%i" % i))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def testPrefetch(self):
+        # a server taking 10 ms per answer, read by 4 workers
+        self.server.delay = 0.01
+        def read(prefetch):
+            cat = Catalog(self.server.url, cache_time=600, max_workers=4)
+            layers = cat.get_layers()
+            start = time.perf_counter()
+            if prefetch:
+                cat.prefetch(layers)
+            [layer.enabled for layer in layers]
+            return time.perf_counter() - start
+        serial, prefetched = read(False), read(True)
+        print("\n%i layers read in %.2f s one by one, %.2f s prefetched" % (self.LAYERS, serial, prefetched))
+        self.assertLess(prefetched * 2, serial)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(ParsedCacheBenchmark, 'test'))
+    suite.addTests(unittest.makeSuite(CodecBenchmark, 'test'))
+    suite.addTests(unittest.makeSuite(MemoryBenchmark, 'test'))
+    suite.addTests(unittest.makeSuite(IdentityMapBenchmark, 'test'))
+    suite.addTests(unittest.makeSuite(PrefetchBenchmark, 'test'))
+    return suite
+
+# run all tests using unittest skipping nose or testplugin
+def run_all():
+    unittest.TextTestRunner(verbosity=3, stream=sys.stdout).run(suite())
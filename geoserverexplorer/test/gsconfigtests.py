@@ -0,0 +1,1789 @@
+# -*- coding: utf-8 -*-
+#
+# (c) 2016 Boundless, http://boundlessgeo.com
+# This code is licensed under the GPL 2.0 license.
+#
+
+import unittest
+import gc
+import sys
+import asyncio
+import threading
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from xml.etree.ElementTree import XML
+import urllib3
+from geoserver.catalog import Catalog, FailedRequestError, CircuitOpenError
+from geoserver.retry import RetryPolicy, CircuitBreaker, retry_after
+from geoserver.singleflight import SingleFlight
+from geoserver.scheduler import RequestScheduler, priority, carry_priority, INTERACTIVE, PREFETCH, BULK
+from geoserver.ratelimit import RateLimiter
+from geoserver.registry import CatalogRegistry
+from geoserver import pool
+from geoserver import asynccatalog
+from geoserver.asynccatalog import AsyncCatalog
+from geoserver.cache import ResponseCache, CacheEntry
+from geoserver.identity import IdentityMap
+from geoserver.diskcache import DiskCache
+from geoserver.workspace import Workspace
+from geoserver.layer import Layer
+from geoserver.resource import FeatureType
+from geoserver.listing import ListingParser
+from geoserver.codec import JSON_CODEC, XML_CODEC
+from geoserverexplorer.geoserver.basecatalog import BaseCatalog
+
+
+class RestStandIn(ThreadingMixIn, HTTPServer):
+    '''
+    A local stand-in for the GeoServer REST API. It serves canned documents
+    from a dict of path -> body and counts the requests it receives, so tests
+    can check how many round-trips an operation costs.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), _StandInHandler)
+        self.documents = {}
+        self.errors = {}
+        self.requests = defaultdict(int)
+        self.lock = threading.Lock()
+        # seconds to wait before answering a GET, and the most GETs answered at once
+        self.delay = 0
+        self.active = 0
+        self.peak = 0
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%i/geoserver/rest" % self.server_address[1]
+
+    def add(self, path, body):
+        self.documents["/geoserver/rest/" + path.lstrip("/")] = body
+
+    def fail(self, path, status, message, times=None, headers=None):
+        '''answer the requests of path with an error, every time or the given number of times'''
+        self.errors["/geoserver/rest/" + path.lstrip("/")] = [status, message.encode("utf-8"), times, headers]
+
+    def recover(self, path):
+        self.errors.pop("/geoserver/rest/" + path.lstrip("/"), None)
+
+    def count(self, path=None):
+        with self.lock:
+            if path is None:
+                return sum(self.requests.values())
+            return self.requests["/geoserver/rest/" + path.lstrip("/")]
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.peak = 0
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # clients giving up on slow answers is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            HTTPServer.handle_error(self, request, client_address)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+
+    # keep connections alive, every reply has a Content-Length
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, do not wait for the ACK in between
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        with self.server.lock:
+            self.server.requests[path] += 1
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        try:
+            time.sleep(self.server.delay)
+            self._get(path)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _error(self, path):
+        '''answer with the error set for path, if any, and return whether there was one'''
+        with self.server.lock:
+            error = self.server.errors.get(path)
+            if error is not None and error[2] is not None:
+                error[2] -= 1
+                if error[2] <= 0:
+                    del self.server.errors[path]
+        if error is None:
+            return False
+        status, message, _, headers = error
+        self._reply(status, message, headers=headers)
+        return True
+
+    def _get(self, path):
+        if self._error(path):
+            return
+        body = self.server.documents.get(path)
+        contentType = "application/xml"
+        if body is None and path.endswith(".json"):
+            # like GeoServer, serve every document in JSON as well
+            body = self.server.documents.get(path[:-len(".json")] + ".xml")
+            if body is not None:
+                body, contentType = xmlToJson(body), "application/json"
+        if body is None:
+            self._reply(404, b"No such resource")
+            return
+        etag = '"%s"' % hashlib.md5(body.encode("utf-8")).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self._reply(304, b"", etag)
+        else:
+            self._reply(200, body.encode("utf-8"), etag, contentType=contentType)
+
+    def _write(self, status):
+        path = self.path.split("?")[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests[self.command + " " + path] += 1
+        if not self._error(path):
+            self._reply(status, b"")
+
+    def do_PUT(self):
+        # uploads create stores
+        self._write(201 if "/file." in self.path else 200)
+
+    def do_POST(self):
+        self._write(201)
+
+    def do_DELETE(self):
+        self._write(200)
+
+    def _reply(self, status, body, etag=None, headers=None, contentType="application/xml"):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def xmlToJson(xml):
+    '''
+    The JSON representation GeoServer gives of an XML document: attributes
+    become "@name" keys, repeated elements lists and atom links "href" keys
+    '''
+    def value(node):
+        children = list(node)
+        if not children and not node.attrib:
+            return node.text or ""
+        obj = dict(("@" + k, v) for k, v in node.attrib.items())
+        if node.text and node.text.strip():
+            obj["$"] = node.text
+        for child in children:
+            if child.tag == "{http://www.w3.org/2005/Atom}link":
+                href = child.get("href")
+                obj["href"] = href[:-len(".xml")] + ".json" if href.endswith(".xml") else href
+            elif child.tag not in obj:
+                obj[child.tag] = value(child)
+            elif isinstance(obj[child.tag], list):
+                obj[child.tag].append(value(child))
+            else:
+                obj[child.tag] = [obj[child.tag], value(child)]
+        return obj
+    root = XML(xml)
+    return json.dumps({root.tag: value(root)})
+
+
+def workspacesXml(names):
+    return "<workspaces>%s</workspaces>" % "".join(
+                "<workspace><name>%s</name></workspace>" % n for n in names)
+
+
+def listingXml(root, element, names):
+    return "<%s>%s</%s>" % (root, "".join(
+                "<%s><name>%s</name></%s>" % (element, n, element) for n in names), root)
+
+
+def addCatalog(server, workspaces, stores, resources):
+    '''
+    Add the listings of a catalog with the given workspaces, each with
+    `stores` datastores of `resources` feature types. Layers and styles
+    are named after the feature types, with one global style "point".
+    Returns the layer names.
+    '''
+    layers = []
+    server.add("workspaces.xml", workspacesXml(workspaces))
+    server.add("styles.xml", listingXml("styles", "style", ["point"]))
+    server.add("layergroups.xml", listingXml("layerGroups", "layerGroup", []))
+    for ws in workspaces:
+        server.add("workspaces/%s/coveragestores.xml" % ws, "<coverageStores/>")
+        server.add("workspaces/%s/wmsstores.xml" % ws, "<wmsStores/>")
+        server.add("workspaces/%s/layergroups.xml" % ws, listingXml("layerGroups", "layerGroup", [ws + "_group"]))
+        storeNames = ["%s_store%i" % (ws, i) for i in range(stores)]
+        server.add("workspaces/%s/datastores.xml" % ws, listingXml("dataStores", "dataStore", storeNames))
+        wsLayers = []
+        for store in storeNames:
+            names = ["%s_ft%i" % (store, i) for i in range(resources)]
+            server.add("workspaces/%s/datastores/%s/featuretypes.xml" % (ws, store),
+                       listingXml("featureTypes", "featureType", names))
+            wsLayers.extend(names)
+        server.add("workspaces/%s/styles.xml" % ws, listingXml("styles", "style", wsLayers))
+        layers.extend(wsLayers)
+    server.add("layers.xml", listingXml("layers", "layer", layers))
+    return layers
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("workspaces.xml", workspacesXml(["a", "b"]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+
+    def testTtlIsHonored(self):
+        cat = Catalog(self.server.url, cache_time=60)
+        url = "%s/workspaces.xml" % self.server.url
+        cat.get_xml(url)
+        cat.get_xml(url)
+        self.assertEqual(1, self.server.count("workspaces.xml"))
+        stats = cat.cache_stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+
+    def testZeroTtlDisablesCaching(self):
+        cat = Catalog(self.server.url, cache_time=0)
+        cat.get_workspaces()
+        cat.get_workspaces()
+        self.assertEqual(2, self.server.count("workspaces.xml"))
+
+    def testExpiredEntryIsRevalidated(self):
+        body = workspacesXml(["a", "b"])
+        cat = Catalog(self.server.url, cache_time=0)
+        first = cat.get_workspaces()
+        second = cat.get_workspaces()
+        self.assertEqual([ws.name for ws in first], [ws.name for ws in second])
+        self.assertEqual(2, self.server.count("workspaces.xml"))
+        stats = cat.cache_stats()
+        self.assertEqual(1, stats["revalidations"])
+        self.assertEqual(len(body), stats["bytes_saved"])
+
+    def testChangedDocumentIsDownloaded(self):
+        cat = Catalog(self.server.url, cache_time=0)
+        cat.get_workspaces()
+        self.server.add("workspaces.xml", workspacesXml(["a", "b", "c"]))
+        try:
+            self.assertEqual(3, len(cat.get_workspaces()))
+            self.assertEqual(0, cat.cache_stats()["revalidations"])
+        finally:
+            self.server.add("workspaces.xml", workspacesXml(["a", "b"]))
+
+    def testParsedTreeIsReused(self):
+        cat = Catalog(self.server.url, cache_time=60)
+        url = "%s/workspaces.xml" % self.server.url
+        self.assertIs(cat.get_xml(url), cat.get_xml(url))
+
+    def testRevalidationKeepsParsedTree(self):
+        cat = Catalog(self.server.url, cache_time=0)
+        url = "%s/workspaces.xml" % self.server.url
+        self.assertIs(cat.get_xml(url), cat.get_xml(url))
+        self.assertEqual(1, cat.cache_stats()["revalidations"])
+
+    def testLruEvictionByEntries(self):
+        cache = ResponseCache(60, max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(1, cache.stats()["evictions"])
+
+    def testLruEvictionByBytes(self):
+        cache = ResponseCache(60, max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.put("c", b"12345")
+        self.assertEqual(2, len(cache))
+        self.assertEqual(10, cache.stats()["bytes"])
+        cache.put("d", b"12345678901")
+        self.assertNotIn("d", cache)
+
+    def testEvictionIsNotified(self):
+        cache = ResponseCache(60, max_entries=1)
+        notified = []
+        cache.watchers.append(notified.append)
+        cache.put("a", b"1")
+        entry = cache._entries["a"]
+        entry.tree = object()
+        cache.put("b", b"2")
+        self.assertEqual([["a"], ["b", "a"]], notified)
+        self.assertIsNone(entry.tree)
+
+
+class InvalidationTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("workspaces.xml", workspacesXml(["ws"]))
+        cls.server.add("layers.xml", "<layers><layer><name>roads</name></layer></layers>")
+        cls.server.add("layers/roads.xml", "<layer><name>roads</name></layer>")
+        cls.server.add("workspaces/ws/datastores.xml", "<dataStores/>")
+        cls.server.add("workspaces/ws/coveragestores.xml", "<coverageStores/>")
+        cls.server.add("styles.xml", "<styles/>")
+        cls.server.add("layergroups.xml", "<layerGroups/>")
+        cls.server.add("workspaces/ws/layergroups.xml", "<layerGroups/>")
+        cls.server.add("workspaces/other/layergroups.xml", "<layerGroups/>")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+        for url in ["workspaces.xml", "layers.xml", "layers/roads.xml", "styles.xml",
+                    "workspaces/ws/datastores.xml", "workspaces/ws/coveragestores.xml",
+                    "layergroups.xml", "workspaces/ws/layergroups.xml", "workspaces/other/layergroups.xml"]:
+            self.cat.get_xml("%s/%s" % (self.server.url, url))
+
+    def cached(self, path):
+        return "%s/%s" % (self.server.url, path) in self.cat._cache
+
+    def testSavingLayerKeepsUnrelatedListings(self):
+        layer = Layer(self.cat, "roads")
+        layer.dirty["enabled"] = "true"
+        self.cat.save(layer)
+        self.assertFalse(self.cached("layers.xml"))
+        self.assertFalse(self.cached("layers/roads.xml"))
+        self.assertTrue(self.cached("workspaces.xml"))
+        self.assertTrue(self.cached("styles.xml"))
+        self.assertTrue(self.cached("workspaces/ws/datastores.xml"))
+
+    def testFailedUploadRaises(self):
+        self.server.fail("workspaces/ws/datastores/uploaded/file.shp", 400, "Bad shapefile")
+        self.server.fail("workspaces/ws/coveragestores/mosaic/external.imagemosaic", 400, "Bad granule")
+        fd, path = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        try:
+            self.assertRaises(FailedRequestError, self.cat.create_featurestore, "uploaded", path, "ws", True)
+            self.assertRaises(FailedRequestError, self.cat.add_granule, "/data/granule.tif", "mosaic", "ws")
+        finally:
+            self.server.recover("workspaces/ws/datastores/uploaded/file.shp")
+            self.server.recover("workspaces/ws/coveragestores/mosaic/external.imagemosaic")
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(self.cached("workspaces/ws/datastores.xml"))
+        self.assertTrue(self.cached("workspaces/ws/coveragestores.xml"))
+
+    def testNewStoreInvalidatesItsListingOnly(self):
+        store = self.cat.create_datastore("roads", "ws")
+        self.cat.save(store)
+        self.assertFalse(self.cached("workspaces/ws/datastores.xml"))
+        self.assertTrue(self.cached("workspaces/ws/coveragestores.xml"))
+        self.assertTrue(self.cached("layers.xml"))
+
+    def testDeletingWorkspaceInvalidatesSubtree(self):
+        self.cat.delete(Workspace(self.cat, "ws"), recurse=True)
+        self.assertFalse(self.cached("workspaces.xml"))
+        self.assertFalse(self.cached("workspaces/ws/datastores.xml"))
+        self.assertFalse(self.cached("layers.xml"))
+        self.assertTrue(self.cached("styles.xml"))
+
+    def testReadOnlyRequestsKeepCache(self):
+        self.cat.get_workspaces()
+        self.assertEqual(0, self.cat.cache_stats()["invalidations"])
+        self.assertEqual(9, self.cat.cache_stats()["entries"])
+
+    def testCreatingWorkspaceInvalidatesListing(self):
+        self.cat.create_workspace("new", "http://example.com/new")
+        # the listing is read again to find the new workspace
+        self.assertEqual(2, self.server.count("workspaces.xml"))
+        self.assertTrue(self.cached("layers.xml"))
+
+    def testDeletingLayerInvalidatesItsGroups(self):
+        self.cat.delete(Layer(self.cat, "ws:roads"))
+        self.assertFalse(self.cached("layergroups.xml"))
+        self.assertFalse(self.cached("workspaces/ws/layergroups.xml"))
+        self.assertTrue(self.cached("workspaces/other/layergroups.xml"))
+        self.assertTrue(self.cached("workspaces/ws/datastores.xml"))
+
+
+class DiskCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("workspaces.xml", workspacesXml(["a", "b"]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def testNewSessionStartsFromDisk(self):
+        cat = Catalog(self.server.url, cache_time=0)
+        cat.attach_store(DiskCache(self.path, cat.service_url, cat.identity()))
+        cat.get_workspaces()
+        self.server.reset()
+        cat = Catalog(self.server.url, cache_time=0)
+        preloaded = cat.attach_store(DiskCache(self.path, cat.service_url, cat.identity()))
+        self.assertEqual(2, len(cat.get_workspaces()))
+        self.assertEqual(0, self.server.count())
+        self.assertEqual([], cat.revalidate(preloaded))
+        self.assertEqual(1, self.server.count("workspaces.xml"))
+        self.assertEqual(1, cat.cache_stats()["revalidations"])
+
+    def testRevalidationReportsChanges(self):
+        cat = Catalog(self.server.url)
+        cat.attach_store(DiskCache(self.path, cat.service_url, cat.identity()))
+        cat.get_workspaces()
+        self.server.add("workspaces.xml", workspacesXml(["a", "b", "c"]))
+        try:
+            cat = Catalog(self.server.url)
+            preloaded = cat.attach_store(DiskCache(self.path, cat.service_url, cat.identity()))
+            self.assertEqual(preloaded, cat.revalidate(preloaded))
+            self.assertEqual(3, len(cat.get_workspaces()))
+        finally:
+            self.server.add("workspaces.xml", workspacesXml(["a", "b"]))
+
+    def testCatalogsAreKeptApart(self):
+        entry = CacheEntry(b"12345")
+        first = DiskCache(self.path, "http://one/rest", "user", max_bytes=10)
+        second = DiskCache(self.path, "http://two/rest", "user", max_bytes=10)
+        for i in range(3):
+            first.save("url%i" % i, entry)
+        second.save("url", entry)
+        self.assertEqual(10, first.size())
+        self.assertEqual(["url1", "url2"], [row[0] for row in first.load()])
+        first.purge()
+        self.assertEqual(0, first.size())
+        self.assertEqual(5, second.size())
+
+    def testUsersAreKeptApart(self):
+        cat = Catalog(self.server.url, username="one")
+        cat.attach_store(DiskCache(self.path, cat.service_url, cat.identity()))
+        cat.get_workspaces()
+        other = Catalog(self.server.url, username="two")
+        self.assertNotEqual(cat.identity(), other.identity())
+        self.assertEqual([], other.attach_store(DiskCache(self.path, other.service_url, other.identity())))
+
+    def testStoreDocumentsAreNotWritten(self):
+        disk = DiskCache(self.path, "http://one/rest", "user")
+        for url in ["http://one/rest/workspaces/ws/datastores/ds.xml",
+                    "http://one/rest/workspaces/ws/coveragestores/cs.json?quietOnNotFound=true",
+                    "http://one/rest/workspaces/ws/datastores.xml",
+                    "http://one/rest/workspaces/ws/datastores/ds/featuretypes.xml"]:
+            disk.save(url, CacheEntry(b"<dataStore/>"))
+        self.assertEqual(["http://one/rest/workspaces/ws/datastores.xml",
+                          "http://one/rest/workspaces/ws/datastores/ds/featuretypes.xml"],
+                         [row[0] for row in disk.load()])
+
+
+class CatalogIndexTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1", "ws2"], 2, 3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def testListingsKeepTheirOrder(self):
+        stores = self.cat.get_stores()
+        self.assertEqual(["ws1_store0", "ws1_store1", "ws2_store0", "ws2_store1"], [s.name for s in stores])
+        resources = self.cat.get_resources()
+        self.assertEqual(self.layers, [r.name for r in resources])
+        styles = self.cat.get_styles()
+        self.assertEqual("point", styles[0].name)
+        self.assertIsNone(styles[0].workspace)
+        self.assertEqual(len(self.layers) + 1, len(styles))
+
+    def testLookupsDoNotListAgain(self):
+        self.cat.get_resources()
+        requests = self.server.count()
+        for name in self.layers:
+            res = self.cat.get_resources(names=name)
+            self.assertEqual(1, len(res))
+            self.assertEqual(name.split("_")[0], res[0].workspace.name)
+        self.assertEqual(requests, self.server.count())
+
+    def testFilters(self):
+        stores = self.cat.get_stores(names="ws2_store1, ws1_store0")
+        self.assertEqual(["ws1_store0", "ws2_store1"], [s.name for s in stores])
+        resources = self.cat.get_resources(stores="ws1_store1", workspaces="ws1")
+        self.assertEqual(["ws1_store1_ft0", "ws1_store1_ft1", "ws1_store1_ft2"], [r.name for r in resources])
+        self.assertEqual([], self.cat.get_resources(names="ws1_store0_ft0", workspaces="ws2"))
+        styles = self.cat.get_styles(names="ws2_store0_ft1", workspaces="ws2")
+        self.assertEqual(["ws2"], [s.workspace for s in styles])
+        groups = self.cat.get_layergroups(names="ws1_group")
+        self.assertEqual(["ws1"], [g.workspace for g in groups])
+
+    def testHrefLookup(self):
+        resource = self.cat.get_resources(names="ws2_store1_ft2")[0]
+        entry = self.cat.index.find_href("resource", resource.href)
+        self.assertEqual("ws2_store1", entry.store)
+
+    def testRefreshIsIncremental(self):
+        self.cat.get_resources()
+        resource = self.cat.get_resources(names="ws1_store0_ft0")[0]
+        self.server.reset()
+        self.cat.delete(resource)
+        self.assertEqual(3, len(self.cat.get_resources(stores="ws1_store0", workspaces="ws1")))
+        self.assertEqual(len(self.layers), len(self.cat.get_resources()))
+        self.assertEqual(1, self.server.count("workspaces/ws1/datastores/ws1_store0/featuretypes.xml"))
+        self.assertEqual(0, self.server.count("workspaces.xml"))
+        self.assertEqual(0, self.server.count("workspaces/ws1/datastores/ws1_store1/featuretypes.xml"))
+
+
+def layerXml(name, style, workspace=None, alternates=()):
+    def styleXml(element, name, ws):
+        link = ""
+        if ws is not None:
+            link = ('<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" '
+                    'href="http://localhost/geoserver/rest/workspaces/%s/styles/%s.xml"/>' % (ws, name))
+        return "<%s><name>%s</name>%s</%s>" % (element, name, link, element)
+    return "<layer><name>%s</name>%s<styles>%s</styles></layer>" % (
+            name, styleXml("defaultStyle", style, workspace),
+            "".join(styleXml("style", s, workspace) for s in alternates))
+
+
+class StyleResolutionTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1", "ws2", "ws3"], 1, 100)
+        for name in cls.layers:
+            cls.server.add("layers/%s.xml" % name, layerXml(name, "point", None, [name]))
+        cls.server.add("layers/wsstyled.xml", layerXml("wsstyled", "ws2_store0_ft0", "ws2"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def stylesListings(self):
+        return sum(n for path, n in self.server.requests.items() if path.endswith("styles.xml"))
+
+    def testGlobalStylesNeedOneListing(self):
+        for name in self.layers:
+            style = Layer(self.cat, name).default_style
+            self.assertEqual("point", style.name)
+            self.assertIsNone(style.workspace)
+        self.assertEqual(1, self.stylesListings())
+
+    def testWorkspaceStyles(self):
+        style = Layer(self.cat, "wsstyled").default_style
+        self.assertEqual("ws2", style.workspace)
+        self.assertEqual(1, self.server.count("workspaces/ws2/styles.xml"))
+        self.assertEqual(1, self.stylesListings())
+
+    def testAlternateStylesAreFoundInWorkspaces(self):
+        for name in self.layers:
+            styles = Layer(self.cat, name).styles
+            self.assertEqual([name.split("_")[0]], [s.workspace for s in styles])
+        # the global listing, then every workspace listing once
+        self.assertEqual(1 + 3, self.stylesListings())
+
+
+class NamespacingTests(unittest.TestCase):
+
+    def layersWithRequests(self, layersPerStore):
+        server = RestStandIn()
+        try:
+            addCatalog(server, ["ws1", "ws2", "ws3"], 2, layersPerStore)
+            cat = BaseCatalog(server.url)
+            return cat.get_layers(), server.count()
+        finally:
+            server.stop()
+
+    def testRequestsDoNotGrowWithLayers(self):
+        few, fewRequests = self.layersWithRequests(2)
+        many, manyRequests = self.layersWithRequests(200)
+        self.assertEqual(3 * 2 * 200, len(many))
+        # the version, layers.xml, workspaces.xml, 3 store listings per workspace
+        # and, since the server does not tell its version, a listing per store
+        self.assertEqual(3 + 3 * 3 + 3 * 2, manyRequests)
+        self.assertEqual(fewRequests, manyRequests)
+
+    def testLayersAreNamespaced(self):
+        layers, _ = self.layersWithRequests(1)
+        self.assertEqual(["ws1:ws1_store0_ft0", "ws1:ws1_store1_ft0", "ws2:ws2_store0_ft0"],
+                         sorted(l.name for l in layers)[:3])
+
+    def testDuplicateLayerNames(self):
+        server = RestStandIn()
+        try:
+            addCatalog(server, ["ws1", "ws2"], 1, 1)
+            for ws in ["ws1", "ws2"]:
+                server.add("workspaces/%s/datastores/%s_store0/featuretypes.xml" % (ws, ws),
+                           listingXml("featureTypes", "featureType", ["roads"]))
+            server.add("layers.xml", listingXml("layers", "layer", ["roads", "roads"]))
+            cat = BaseCatalog(server.url)
+            self.assertEqual(["ws1:roads", "ws2:roads"], sorted(l.name for l in cat.get_layers()))
+            self.assertEqual(["ws1:roads", "ws2:roads"], sorted(l.name for l in cat.get_layers()))
+        finally:
+            server.stop()
+
+
+def versionXml(version):
+    return '<about><resource name="GeoServer"><Version>%s</Version></resource></about>' % version
+
+
+class WorkspaceListingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = RestStandIn()
+        self.server.add("about/version.xml", versionXml("2.15.1"))
+        self.layers = addCatalog(self.server, ["ws1", "ws2", "ws3"], 300, 1)
+        for ws in ["ws1", "ws2", "ws3"]:
+            self.server.add("workspaces/%s/featuretypes.xml" % ws, listingXml("featureTypes", "featureType",
+                            [l for l in self.layers if l.startswith(ws + "_")]))
+            self.server.add("workspaces/%s/coverages.xml" % ws, "<coverages/>")
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def storeListings(self):
+        return sum(n for path, n in self.server.requests.items() if "/datastores/" in path)
+
+    def testResourcesAreListedByWorkspace(self):
+        resources = self.cat.get_resources()
+        self.assertEqual(self.layers, [r.name for r in resources])
+        self.assertEqual(0, self.storeListings())
+        # the version, workspaces.xml, then two listings and the wms stores of each workspace
+        self.assertEqual(2 + 3 * 2 + 3, self.server.count())
+
+    def testStoreIsFoundFromTheResource(self):
+        self.server.add("workspaces/ws2/featuretypes/ws2_store7_ft0.xml",
+                        '<featureType><name>ws2_store7_ft0</name><store class="dataStore"><name>ws2:ws2_store7</name>'
+                        '<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" '
+                        'href="http://public.example.com/geoserver/rest/workspaces/ws2/datastores/ws2_store7.xml"/>'
+                        '</store></featureType>')
+        resource = self.cat.get_resources("ws2_store7_ft0", workspaces="ws2")[0]
+        self.assertEqual("ws2_store7", resource.store.name)
+        self.assertEqual("dataStore", resource.store.resource_type)
+        self.assertEqual(0, self.storeListings())
+
+    def testFallbackToStores(self):
+        del self.server.documents["/geoserver/rest/workspaces/ws1/featuretypes.xml"]
+        resources = self.cat.get_resources()
+        self.assertEqual(self.layers, [r.name for r in resources])
+        # only the workspace whose listing failed is walked store by store
+        self.assertEqual(300, self.storeListings())
+
+    def testMutationsRefreshWorkspaceListings(self):
+        self.assertEqual(900, len(self.cat.get_resources()))
+        self.cat.delete(self.cat.get_resources("ws3_store0_ft0")[0])
+        self.cat.get_resources()
+        self.assertEqual(2, self.server.count("workspaces/ws3/featuretypes.xml"))
+        self.assertEqual(1, self.server.count("workspaces/ws1/featuretypes.xml"))
+
+
+class FanOutTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.delay = 0.02
+        cls.workspaces = ["ws%02i" % i for i in range(20)]
+        addCatalog(cls.server, cls.workspaces, 2, 1)
+        # a workspace listed but gone by the time its styles are listed
+        cls.server.add("workspaces.xml", workspacesXml(cls.workspaces + ["gone"]))
+        cls.server.add("workspaces/gone/datastores.xml", "<dataStores/>")
+        cls.server.add("workspaces/gone/coveragestores.xml", "<coverageStores/>")
+        cls.server.add("workspaces/gone/wmsstores.xml", "<wmsStores/>")
+        cls.server.fail("workspaces/gone/styles.xml", 404, "No such workspace: 'gone'")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+
+    def listings(self, workers):
+        cat = Catalog(self.server.url, max_workers=workers)
+        stores = [(s.workspace.name, s.name) for s in cat.get_stores()]
+        styles = [(s.workspace, s.name) for s in cat.get_styles()]
+        return stores, styles
+
+    def testSameResultsInTheSameOrder(self):
+        sequential = self.listings(1)
+        self.assertEqual(1, self.server.peak)
+        self.server.reset()
+        concurrent = self.listings(8)
+        self.assertEqual(sequential, concurrent)
+        self.assertEqual([(ws, "%s_store%i" % (ws, i)) for ws in self.workspaces for i in range(2)], concurrent[0])
+        self.assertTrue(1 < self.server.peak <= 8)
+
+    def testMissingWorkspaceIsSkipped(self):
+        _, styles = self.listings(8)
+        self.assertNotIn("gone", [ws for ws, _ in styles])
+        self.assertEqual(1, self.server.count("workspaces/gone/styles.xml"))
+
+    def testErrorsAreRaised(self):
+        cat = Catalog(self.server.url, max_workers=8)
+        cat.fan_out(lambda i: i, [])
+        self.assertRaises(ZeroDivisionError, cat.fan_out, lambda i: 1 / i, [2, 1, 0, 3])
+        self.assertEqual([2, 1], cat.fan_out(lambda i: 2 // i, [1, 2]))
+
+    def testAsyncRequests(self):
+        for workers in (1, 8):
+            self.server.reset()
+            cat = Catalog(self.server.url, max_workers=workers)
+            urls = ["{}/workspaces/{}/styles.xml".format(cat.service_url, ws) for ws in self.workspaces[:8]]
+            futures = [cat.http_request_async(url) for url in urls]
+            self.assertEqual([200] * 8, [cat.result(f).status_code for f in futures])
+            self.assertEqual(workers > 1, self.server.peak > 1)
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.workspaces = ["ws%02i" % i for i in range(8)]
+        addCatalog(cls.server, cls.workspaces, 1, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.delay = 0
+
+    def fetch(self, cat, urls):
+        cat.fan_out(lambda url: cat.http_request(url).content, urls)
+
+    def urls(self, cat):
+        return ["{}/workspaces/{}.xml".format(cat.service_url, ws) for ws in self.workspaces]
+
+    def testPoolsOfThisUrllib3CanCount(self):
+        # fails when urllib3 changes the pool methods TunedAdapter overrides
+        self.assertTrue(pool.COUNTING, "urllib3 %s is not supported" % urllib3.__version__)
+
+    def testConnectionsAreReused(self):
+        cat = Catalog(self.server.url, max_workers=1)
+        self.fetch(cat, self.urls(cat))
+        self.assertEqual(dict(opened=1, reused=7, discarded=0), cat.connection_stats())
+
+    def testNoKeepAlive(self):
+        cat = Catalog(self.server.url, max_workers=1, keep_alive=False)
+        self.fetch(cat, self.urls(cat))
+        stats = cat.connection_stats()
+        self.assertEqual(8, stats["opened"])
+        self.assertEqual(0, stats["reused"])
+
+    def testIdleConnectionsAreDiscarded(self):
+        cat = Catalog(self.server.url, max_workers=1, idle_timeout=0.05)
+        self.fetch(cat, self.urls(cat)[:2])
+        time.sleep(0.1)
+        self.fetch(cat, self.urls(cat)[:1])
+        self.assertEqual(dict(opened=2, reused=1, discarded=1), cat.connection_stats())
+
+    def testFullPoolDiscardsConnections(self):
+        self.server.delay = 0.05
+        cat = Catalog(self.server.url, max_workers=8, pool_size=2)
+        self.fetch(cat, self.urls(cat))
+        stats = cat.connection_stats()
+        self.assertTrue(stats["opened"] > 2)
+        self.assertEqual(stats["opened"] - 2, stats["discarded"])
+
+    def testBlockingPool(self):
+        self.server.delay = 0.05
+        cat = Catalog(self.server.url, max_workers=8, pool_size=2, pool_block=True)
+        self.fetch(cat, self.urls(cat))
+        self.assertEqual(dict(opened=2, reused=6, discarded=0), cat.connection_stats())
+
+    def testSharedSessions(self):
+        cat = Catalog(self.server.url, "user", share_session=True)
+        same = Catalog(self.server.url, "user", share_session=True)
+        other = Catalog(self.server.url, "other", share_session=True)
+        self.assertIs(cat.client, same.client)
+        self.assertIsNot(cat.client, other.client)
+        self.assertIsNot(cat.client, Catalog(self.server.url, "user").client)
+        self.fetch(cat, self.urls(cat)[:1])
+        self.fetch(same, self.urls(same)[:1])
+        self.assertEqual(1, same.connection_stats()["reused"])
+
+    def testClosedByTheLastCatalog(self):
+        cat = Catalog(self.server.url, "closing", share_session=True)
+        same = Catalog(self.server.url, "closing", share_session=True)
+        self.fetch(cat, self.urls(cat)[:1])
+        # closing twice gives it back once
+        cat.close()
+        cat.close()
+        self.fetch(same, self.urls(same)[:1])
+        self.assertEqual(dict(opened=1, reused=1, discarded=0), same.connection_stats())
+        same.close()
+        self.assertIsNot(same.client, Catalog(self.server.url, "closing", share_session=True).client)
+        # the connection kept open was closed
+        self.fetch(same, self.urls(same)[:1])
+        self.assertEqual(2, same.connection_stats()["opened"])
+
+
+class RetryTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        addCatalog(cls.server, ["ws1", "ws2"], 1, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.server.delay = 0
+        self.cat = Catalog(self.server.url)
+        self.cat.retry = RetryPolicy(backoff=0.01)
+
+    def tearDown(self):
+        self.cat.breaker.close()
+        self.server.recover("workspaces.xml")
+        self.server.recover("about/version.xml")
+
+    def testRetriesUntilAnswered(self):
+        self.server.fail("workspaces.xml", 503, "Busy", times=2)
+        self.assertEqual(["ws1", "ws2"], [ws.name for ws in self.cat.get_workspaces()])
+        self.assertEqual(3, self.server.count("workspaces.xml"))
+
+    def testGivesUpAfterTheLastAttempt(self):
+        self.server.fail("workspaces.xml", 503, "Busy")
+        self.assertRaises(FailedRequestError, self.cat.get_workspaces)
+        self.assertEqual(1 + self.cat.retry.attempts, self.server.count("workspaces.xml"))
+
+    def testRetryAfterIsRespected(self):
+        self.server.fail("workspaces.xml", 429, "Slow down", times=1, headers={"Retry-After": "0.3"})
+        start = time.time()
+        self.cat.get_workspaces()
+        self.assertTrue(time.time() - start >= 0.3)
+        self.assertEqual(2, self.server.count("workspaces.xml"))
+
+    def testRetryAfterBeyondTheDeadline(self):
+        self.server.fail("workspaces.xml", 503, "Maintenance", times=1, headers={"Retry-After": "120"})
+        with self.cat.deadline(1):
+            self.assertRaises(FailedRequestError, self.cat.get_workspaces)
+        self.assertEqual(1, self.server.count("workspaces.xml"))
+
+    def testRetryAfterHeader(self):
+        self.assertIsNone(retry_after({}))
+        self.assertEqual(2, retry_after({"retry-after": "2"}))
+        self.assertEqual(0, retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+
+    def testDeadline(self):
+        self.server.delay = 0.5
+        start = time.time()
+        with self.cat.deadline(0.2):
+            self.assertRaises(FailedRequestError, self.cat.get_workspaces)
+        self.assertTrue(time.time() - start < 0.45)
+
+    def testEnclosingDeadlineWins(self):
+        self.cat.max_workers = 2
+        with self.cat.deadline(5):
+            outer = self.cat._deadline_at()
+            with self.cat.deadline(60):
+                self.assertEqual([outer, outer], self.cat.fan_out(lambda i: self.cat._deadline_at(), [1, 2]))
+        self.assertIsNone(self.cat._deadline_at())
+
+    def testCircuitBreaker(self):
+        self.cat.retry = RetryPolicy(attempts=0)
+        self.cat.breaker.cooldown = 0.1
+        self.server.fail("workspaces.xml", 502, "Bad gateway")
+        self.server.fail("about/version.xml", 502, "Bad gateway")
+        for i in range(self.cat.breaker.threshold):
+            self.assertRaises(FailedRequestError, self.cat.get_workspaces)
+        self.assertRaises(CircuitOpenError, self.cat.get_workspaces)
+        self.assertEqual(self.cat.breaker.threshold, self.server.count("workspaces.xml"))
+        # probed in the background until the server answers
+        time.sleep(0.3)
+        self.assertEqual(CircuitBreaker.OPEN, self.cat.breaker.state)
+        self.assertTrue(self.server.count("about/version.xml") >= 2)
+        self.server.recover("workspaces.xml")
+        self.server.recover("about/version.xml")
+        time.sleep(0.3)
+        self.assertEqual(CircuitBreaker.CLOSED, self.cat.breaker.state)
+        self.assertEqual(2, len(self.cat.get_workspaces()))
+
+    def testCircuitBreakerWithoutProbe(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=0.1)
+        breaker.record(True)
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.15)
+        # one call finds out whether the server answers again
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(False)
+        self.assertTrue(breaker.allow())
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        addCatalog(cls.server, ["ws1", "ws2"], 1, 1)
+        cls.server.fail("styles.xml", 404, "Not here")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.server.delay = 0.2
+        self.cat = Catalog(self.server.url)
+
+    def getConcurrently(self, path, callers=8):
+        url = "{}/{}".format(self.cat.service_url, path)
+        barrier = threading.Barrier(callers)
+        results = [None] * callers
+        def get(i):
+            barrier.wait()
+            try:
+                results[i] = self.cat.get_xml(url)
+            except FailedRequestError as e:
+                results[i] = e
+        threads = [threading.Thread(target=get, args=(i,)) for i in range(callers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def testIdenticalGetsAreCollapsed(self):
+        trees = self.getConcurrently("workspaces.xml")
+        self.assertEqual(1, self.server.count("workspaces.xml"))
+        self.assertTrue(all(tree is trees[0] for tree in trees))
+        self.assertEqual(dict(calls=1, collapsed=7), self.cat.request_stats())
+
+    def testErrorsAreShared(self):
+        errors = self.getConcurrently("styles.xml")
+        self.assertEqual(1, self.server.count("styles.xml"))
+        self.assertTrue(all(isinstance(e, FailedRequestError) for e in errors))
+
+    def testKeys(self):
+        flights = SingleFlight()
+        self.assertEqual(1, flights.do("a", lambda: 1))
+        self.assertEqual(2, flights.do("a", lambda: 2))
+        self.assertEqual(dict(calls=2, collapsed=0), flights.stats())
+
+
+class ThreadSafetyTests(unittest.TestCase):
+    '''many threads using one catalog while its cached responses keep expiring and being dropped'''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        addCatalog(cls.server, ["ws%i" % i for i in range(4)], 2, 3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def listings(self, cat):
+        return ([ws.name for ws in cat.get_workspaces()],
+                [(s.workspace.name, s.name) for s in cat.get_stores()],
+                [(r.workspace.name, r.name) for r in cat.get_resources()],
+                [(s.workspace, s.name) for s in cat.get_styles()])
+
+    def testConcurrentUse(self):
+        expected = self.listings(Catalog(self.server.url))
+        cat = Catalog(self.server.url, cache_time=0.05, max_workers=4)
+        errors = []
+        rounds = [0] * 16
+        stop = time.time() + 2
+        def hammer(i):
+            while time.time() < stop:
+                try:
+                    if i == 0:
+                        cat.purge_cache()
+                        time.sleep(0.01)
+                    elif i == 1:
+                        cat.invalidate(Workspace(cat, "ws%i" % (rounds[i] % 4)))
+                        time.sleep(0.01)
+                    elif self.listings(cat) != expected:
+                        errors.append("thread %i got other listings" % i)
+                except Exception as e:
+                    errors.append("thread %i: %r" % (i, e))
+                rounds[i] += 1
+        threads = [threading.Thread(target=hammer, args=(i,)) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors[:5])
+        self.assertTrue(all(rounds))
+        stats = cat.connection_stats()
+        self.assertTrue(stats["reused"] > stats["opened"])
+
+    def testSessionPerThread(self):
+        cat = Catalog(self.server.url)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(cat.client.session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(cat.client.session(), sessions[0])
+        self.assertIs(cat.client.session(), cat.client.session())
+        self.assertIs(cat.client.get_adapter(cat.service_url), sessions[0].get_adapter(cat.service_url))
+
+
+class SchedulerTests(unittest.TestCase):
+
+    def waitFor(self, scheduler, name, waiting):
+        stop = time.time() + 5
+        while scheduler.stats()[name]["waiting"] < waiting and time.time() < stop:
+            time.sleep(0.005)
+
+    def queue(self, scheduler, name, order, label):
+        def take():
+            scheduler.acquire(name)
+            order.append(label)
+            scheduler.release(name)
+        thread = threading.Thread(target=carry_priority(take))
+        thread.start()
+        return thread
+
+    def testInteractiveGoesFirst(self):
+        scheduler = RequestScheduler(1)
+        order = []
+        scheduler.acquire(BULK)
+        threads = []
+        for i in range(3):
+            threads.append(self.queue(scheduler, BULK, order, "bulk%i" % i))
+            self.waitFor(scheduler, BULK, i + 1)
+        threads.append(self.queue(scheduler, PREFETCH, order, "prefetch"))
+        self.waitFor(scheduler, PREFETCH, 1)
+        threads.append(self.queue(scheduler, INTERACTIVE, order, "interactive"))
+        self.waitFor(scheduler, INTERACTIVE, 1)
+        scheduler.release(BULK)
+        for t in threads:
+            t.join()
+        self.assertEqual(["interactive", "prefetch", "bulk0", "bulk1", "bulk2"], order)
+        stats = scheduler.stats()
+        self.assertEqual(0, stats[BULK]["waiting"] + stats[BULK]["running"])
+        self.assertEqual(4, stats[BULK]["granted"])
+        self.assertTrue(stats[BULK]["max_wait"] >= stats[INTERACTIVE]["max_wait"])
+
+    def testFlowsTakeTurns(self):
+        scheduler = RequestScheduler(1)
+        order = []
+        threads = []
+        def job(label, n):
+            # the threads it starts belong to its flow
+            with priority(BULK):
+                threads.extend(self.queue(scheduler, BULK, order, label) for i in range(n))
+        scheduler.acquire(BULK)
+        job("a", 3)
+        self.waitFor(scheduler, BULK, 3)
+        other = threading.Thread(target=job, args=("b", 2))
+        other.start()
+        other.join()
+        self.waitFor(scheduler, BULK, 5)
+        scheduler.release(BULK)
+        for t in threads:
+            t.join()
+        self.assertEqual(["a", "b", "a", "b", "a"], order)
+
+    def testTimeout(self):
+        scheduler = RequestScheduler(2, {BULK: 1})
+        scheduler.acquire(BULK)
+        self.assertFalse(scheduler.acquire(BULK, 0.01))
+        self.assertEqual(0, scheduler.stats()[BULK]["waiting"])
+        self.assertTrue(scheduler.acquire(INTERACTIVE, 0.01))
+
+    def testBulkLeavesRoomForInteractiveRequests(self):
+        server = RestStandIn()
+        try:
+            addCatalog(server, ["ws%i" % i for i in range(8)], 1, 1)
+            server.delay = 0.05
+            cat = Catalog(server.url, max_workers=8, priority_limits={BULK: 2})
+            urls = ["{}/workspaces/ws{}.xml".format(cat.service_url, i) for i in range(8)]
+            bulk = threading.Thread(target=priority(BULK)(lambda: cat.fan_out(cat.http_request, urls)))
+            bulk.start()
+            self.waitFor(cat.scheduler, BULK, 1)
+            with priority(INTERACTIVE):
+                self.assertEqual(200, cat.http_request(cat.service_url + "/workspaces.xml").status_code)
+            bulk.join()
+            self.assertEqual(3, server.peak)
+            stats = cat.scheduler_stats()
+            self.assertEqual(8, stats[BULK]["granted"])
+            self.assertTrue(stats[BULK]["max_wait"] > 0.05)
+            self.assertTrue(stats[INTERACTIVE]["max_wait"] < 0.05)
+        finally:
+            server.stop()
+
+
+class RateLimitTests(unittest.TestCase):
+
+    def testRequestRate(self):
+        limiter = RateLimiter(50)
+        start = time.time()
+        for i in range(60):
+            self.assertTrue(limiter.wait())
+        self.assertTrue(time.time() - start >= 0.18)
+        self.assertTrue(limiter.stats()["throttled"] >= 9)
+
+    def testUploadRate(self):
+        limiter = RateLimiter(byte_rate=1000)
+        start = time.time()
+        # larger than the bucket, sent at once, and paid for by the next one
+        self.assertTrue(limiter.wait(1500))
+        self.assertTrue(time.time() - start < 0.1)
+        self.assertFalse(limiter.wait(10, timeout=0.1))
+        self.assertTrue(limiter.wait())
+        self.assertTrue(limiter.wait(10, timeout=1))
+
+    def testRateFollowsResponseTimes(self):
+        limiter = RateLimiter(10, 1000)
+        limiter.record(0.01)
+        limiter.record(0.015)
+        self.assertEqual(10, limiter.stats()["rate"])
+        limiter.record(0.5)
+        self.assertEqual((5, 500), (limiter.stats()["rate"], limiter.stats()["byte_rate"]))
+        # once per second at most
+        limiter.record(0.5, overloaded=True)
+        self.assertEqual(5, limiter.stats()["rate"])
+        limiter.record(0.01)
+        self.assertAlmostEqual(6, limiter.stats()["rate"])
+        for i in range(10):
+            limiter.record(0.01)
+        self.assertEqual(10, limiter.stats()["rate"])
+        self.assertEqual(1, limiter.stats()["backoffs"])
+
+    def testUnlimited(self):
+        limiter = RateLimiter()
+        limiter.record(10, overloaded=True)
+        self.assertTrue(all(limiter.wait() for i in range(1000)))
+        self.assertEqual(0, limiter.stats()["backoffs"])
+
+    def testOnlyBulkRequestsAreLimited(self):
+        server = RestStandIn()
+        try:
+            addCatalog(server, ["ws"], 1, 1)
+            cat = Catalog(server.url, rate_limit=20)
+            url = cat.service_url + "/workspaces.xml"
+            start = time.time()
+            for i in range(30):
+                cat.http_request(url)
+            self.assertTrue(time.time() - start < 0.5)
+            self.assertEqual(0, cat.rate_limit_stats()["throttled"])
+            start = time.time()
+            with priority(BULK):
+                for i in range(40):
+                    cat.http_request(url)
+            # a burst of 20, then 20 per second
+            self.assertTrue(time.time() - start >= 0.8)
+            self.assertTrue(cat.rate_limit_stats()["throttled"] >= 15)
+        finally:
+            server.stop()
+
+
+class CatalogRegistryTests(unittest.TestCase):
+
+    url = "http://localhost:8080/geoserver/rest"
+
+    def setUp(self):
+        self.registry = CatalogRegistry()
+        self.created = []
+
+    def factory(self, username):
+        def create():
+            self.created.append(username)
+            return Catalog(self.url, username, max_workers=2)
+        return create
+
+    def testOneCatalogPerServerAndIdentity(self):
+        cat = self.registry.acquire(self.url, "admin", self.factory("admin"))
+        self.assertIs(cat, self.registry.acquire(self.url + "/", "admin", self.factory("admin")))
+        other = self.registry.acquire(self.url, "other", self.factory("other"))
+        self.assertIsNot(cat, other)
+        self.assertEqual(["admin", "other"], self.created)
+        self.assertIn(self.registry.find(self.url), (cat, other))
+        self.assertIsNone(self.registry.find("http://elsewhere/geoserver/rest"))
+
+    def testReleasedByEveryUser(self):
+        cat = self.registry.acquire(self.url, "admin", self.factory("admin"))
+        self.registry.acquire(self.url, "admin", self.factory("admin"))
+        pool = cat._thread_pool()
+        self.registry.release(cat)
+        self.assertIs(cat, self.registry.find(self.url))
+        self.assertIs(pool, cat._thread_pool())
+        self.registry.release(cat)
+        self.assertIsNone(self.registry.find(self.url))
+        # closed, and made again on demand
+        self.assertIsNot(pool, cat._thread_pool())
+        self.assertIsNot(cat, self.registry.acquire(self.url, "admin", self.factory("admin")))
+        self.assertEqual(["admin", "admin"], self.created)
+        # giving back a catalog twice, or one it did not hand out, does nothing
+        self.registry.release(cat)
+        self.registry.release(Catalog(self.url))
+        self.assertEqual(1, len(self.registry.catalogs()))
+
+    def testClear(self):
+        self.registry.acquire(self.url, "admin", self.factory("admin"))
+        self.registry.acquire(self.url, "other", self.factory("other"))
+        self.registry.clear()
+        self.assertEqual([], self.registry.catalogs())
+
+
+class AsyncCatalogTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.delay = 0.02
+        cls.workspaces = ["ws%02i" % i for i in range(10)]
+        cls.layers = addCatalog(cls.server, cls.workspaces, 3, 2)
+        cls.server.add("workspaces/default.xml", "<workspace><name>ws00</name></workspace>")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def testListingsMatchTheCatalog(self):
+        sync = Catalog(self.server.url)
+        expected = [[s.name for s in sync.get_stores()], [r.name for r in sync.get_resources()],
+                    [s.name for s in sync.get_styles()]]
+        syncRequests = self.server.count()
+        self.server.reset()
+
+        async def listings(cat):
+            async with cat:
+                stores, resources, styles = await asyncio.gather(
+                    cat.get_stores(), cat.get_resources(), cat.get_styles())
+                return [[s.name for s in stores], [r.name for r in resources], [s.name for s in styles]]
+        self.assertEqual(expected, self.run_async(listings(AsyncCatalog(self.server.url))))
+        self.assertEqual(syncRequests, self.server.count())
+        self.assertTrue(self.server.peak > 1)
+
+    def testObjectsShareTheCatalog(self):
+        cat = AsyncCatalog(self.server.url)
+        stores = self.run_async(cat.get_stores(workspaces="ws03"))
+        self.assertEqual(["ws03_store0", "ws03_store1", "ws03_store2"], [s.name for s in stores])
+        self.assertIs(cat.catalog, stores[0].catalog)
+        requests = self.server.count()
+        # served by the response cache and the index of the synchronous catalog
+        self.assertEqual(3, len(cat.catalog.get_stores(workspaces="ws03")))
+        self.assertEqual(requests, self.server.count())
+
+    def testMutations(self):
+        cat = AsyncCatalog(self.server.url)
+        store = self.run_async(cat.get_stores("ws01_store0", "ws01"))[0]
+        self.run_async(cat.delete(store, recurse=True))
+        self.assertEqual(1, self.server.requests["DELETE /geoserver/rest/workspaces/ws01/datastores/ws01_store0.xml"])
+        self.assertNotIn("%s/workspaces/ws01/datastores.xml" % self.server.url, cat.catalog._cache)
+        fd, path = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        self.run_async(cat.create_featurestore("uploaded", path, overwrite=True))
+        self.assertEqual(1, self.server.requests["PUT /geoserver/rest/workspaces/ws00/datastores/uploaded/file.shp"])
+        self.assertFalse(os.path.exists(path))
+
+    def testCatalogWithItsOwnTransport(self):
+        # such as AuthCatalog, which only sends requests its own way
+        sent = []
+        class OwnTransportCatalog(Catalog):
+            def _send(self, url, data, method, headers, timeout, stream=False):
+                sent.append(url)
+                return Catalog._send(self, url, data, method, headers, timeout, stream)
+        installed, asynccatalog.aiohttp = asynccatalog.aiohttp, object()
+        try:
+            self.assertTrue(AsyncCatalog(Catalog(self.server.url))._uses_aiohttp())
+            cat = AsyncCatalog(OwnTransportCatalog(self.server.url))
+            self.assertFalse(cat._uses_aiohttp())
+            workspaces = self.run_async(cat.get_workspaces())
+        finally:
+            asynccatalog.aiohttp = installed
+        self.assertEqual(self.workspaces, sorted(w.name for w in workspaces))
+        self.assertIn("%s/workspaces.xml" % self.server.url, sent)
+
+
+class LayerResourceTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        addCatalog(cls.server, ["ws1", "ws2"], 5, 20)
+        # the server advertises its public URL, not the one we connect to
+        href = "http://public.example.com/geoserver/rest/workspaces/ws2/datastores/ws2_store3/featuretypes/ws2_store3_ft7.xml"
+        cls.server.add("layers/ws2_store3_ft7.xml",
+                       '<layer><name>ws2_store3_ft7</name><resource class="featureType"><name>ws2:ws2_store3_ft7</name>'
+                       '<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" href="%s"/>'
+                       '</resource></layer>' % href)
+        cls.server.add("workspaces/ws2/datastores/ws2_store3/featuretypes/ws2_store3_ft7.xml",
+                       "<featureType><name>ws2_store3_ft7</name><title>Seven</title></featureType>")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def testResourceFromHref(self):
+        layer = self.cat.get_layer("ws2_store3_ft7")
+        resource = layer.resource
+        self.assertEqual("featureType", resource.resource_type)
+        self.assertEqual("ws2", resource.workspace.name)
+        self.assertEqual("ws2_store3", resource.store.name)
+        self.assertEqual("Seven", resource.title)
+        # the layer and the resource, without listing any store or resource
+        self.assertEqual(2, self.server.count())
+
+    def testResourceIsMemoized(self):
+        layer = self.cat.get_layer("ws2_store3_ft7")
+        self.assertIs(layer.resource, layer.resource)
+        layer.refresh()
+        self.assertEqual("ws2_store3_ft7", layer.resource.name)
+
+    def testStoreFromHref(self):
+        store = self.cat.index.from_href(self.server.url + "/workspaces/ws1/datastores/ws1_store0.xml")
+        self.assertEqual(("dataStore", "ws1_store0", "ws1"), (store.resource_type, store.name, store.workspace.name))
+        self.assertIsNone(self.cat.index.from_href(self.server.url + "/layers/ws1_store0_ft0.xml"))
+        self.assertEqual(0, self.server.count())
+
+
+class StreamingListingTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1", "ws2"], 3, 10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def testParserReadsChunks(self):
+        xml = listingXml("layers", "layer", ["a", "b", "c"]).encode("utf-8")
+        parser = ListingParser("layer")
+        pairs = []
+        for i in range(0, len(xml), 7):
+            pairs.extend(parser.feed(xml[i:i + 7]))
+        pairs.extend(parser.close())
+        self.assertEqual(["a", "b", "c"], [name for name, _ in pairs])
+        # read entries are not kept
+        self.assertEqual(0, len(parser._root))
+
+    def testIterLayers(self):
+        layers = self.cat.iter_layers()
+        self.assertEqual(0, self.server.count())
+        self.assertEqual(self.layers, [l.name for l in layers])
+        self.assertEqual(1, self.server.count("layers.xml"))
+
+    def testListingIsCached(self):
+        list(self.cat.iter_layers())
+        self.assertEqual(len(self.layers), len(self.cat.get_layers()))
+        list(self.cat.iter_layers())
+        self.assertEqual(1, self.server.count("layers.xml"))
+
+    def testIterStyles(self):
+        names = [s.name for s in self.cat.iter_styles()]
+        self.assertEqual(["point"] + self.layers, names)
+        names = [s.name for s in self.cat.iter_styles(workspaces="ws2")]
+        self.assertEqual([l for l in self.layers if l.startswith("ws2")], names)
+
+    def testIterResources(self):
+        resources = list(self.cat.iter_resources(workspaces=["ws1"]))
+        self.assertEqual([l for l in self.layers if l.startswith("ws1")], [r.name for r in resources])
+        self.assertEqual("ws1_store2", resources[-1].store.name)
+
+    def testStoreResources(self):
+        store = self.cat.get_stores(names="ws1_store1", workspaces="ws1")[0]
+        self.assertEqual(["ws1_store1_ft%i" % i for i in range(10)], [r.name for r in store.iter_resources()])
+        self.assertEqual(10, len(store.get_resources()))
+
+    def testFailedListing(self):
+        self.server.fail("layers.xml", 500, "broken")
+        try:
+            self.assertRaises(FailedRequestError, list, self.cat.iter_layers())
+        finally:
+            self.server.recover("layers.xml")
+
+
+class CompactObjectTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1"], 2, 3)
+        for name in cls.layers:
+            cls.server.add("layers/%s.xml" % name, layerXml(name, "point", None, [name]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def testNoInstanceDict(self):
+        layer = self.cat.get_layers()[0]
+        resource = self.cat.get_resources()[0]
+        for obj in (layer, resource, resource.workspace, self.cat.index.entries("layer")[0]):
+            self.assertFalse(hasattr(obj, "__dict__"), obj)
+
+    def testDirtyOnlyOnChange(self):
+        layer = self.cat.get_layers()[0]
+        self.assertIsNone(layer.enabled)
+        self.assertEqual("point", layer.default_style.name)
+        self.assertIsNone(layer._dirty)
+        layer.enabled = False
+        self.assertEqual(False, layer.dirty["enabled"])
+
+    def testDomGoesWithCache(self):
+        layer = self.cat.get_layers()[0]
+        self.assertEqual("point", layer.default_style.name)
+        self.assertIsNotNone(layer.dom)
+        self.cat._cache.clear()
+        gc.collect()
+        self.assertIsNone(layer.dom)
+        self.assertEqual("point", layer.default_style.name)
+        self.assertEqual(2, self.server.count("layers/%s.json" % layer.name))
+
+    def testDomGoesWithEviction(self):
+        cat = Catalog(self.server.url, cache_time=60, cache_max_entries=1)
+        layer = cat.get_layers()[0]
+        layer.fetch()
+        cat.get_xml("%s/styles.xml" % self.server.url)
+        gc.collect()
+        self.assertIsNone(layer.dom)
+        self.assertEqual("point", layer.document().find("defaultStyle/name").text)
+
+    def testNamesAreShared(self):
+        resource = self.cat.get_resources()[0]
+        entry = self.cat.index.entries("store", "ws1")[0]
+        self.assertIs(entry.workspace, Workspace(self.cat, "".join(["ws", "1"])).name)
+        self.assertIs(entry.workspace, resource.workspace.name)
+
+    def testDefaultWorkspace(self):
+        self.server.add("workspaces/default.xml", "<workspace><name>ws1</name></workspace>")
+        workspace = self.cat.get_default_workspace()
+        self.assertEqual("ws1", workspace.name)
+        self.assertEqual("%s/workspaces/ws1.xml" % self.server.url, workspace.href)
+
+
+class IdentityMapTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1"], 2, 3)
+        for name in cls.layers:
+            cls.server.add("layers/%s.xml" % name, layerXml(name, "point", None, [name]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60)
+
+    def testLookupsShareReads(self):
+        first = self.cat.get_layers()
+        self.assertEqual(["point"] * len(first), [l.default_style.name for l in first])
+        second = self.cat.get_layers()
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual([l.name for l in first], [l.name for l in second])
+        self.assertIsNotNone(second[0].dom)
+        self.assertIsNotNone(self.cat.get_layer(first[0].name).dom)
+        self.assertIsNotNone(next(self.cat.iter_layers()).dom)
+        self.assertEqual(1, self.server.count("layers/%s.json" % first[0].name))
+
+    def testChangesAreNotShared(self):
+        layer = self.cat.get_layers()[0]
+        layer.enabled = False
+        layer.name = "ws1:" + layer.name
+        other = self.cat.get_layers()[0]
+        self.assertEqual(self.layers[0], other.name)
+        self.assertFalse(other._is_dirty("enabled"))
+
+    def testMissingLayerIsNotKept(self):
+        self.assertIsNone(self.cat.get_layer("nowhere"))
+        self.assertEqual(0, len(self.cat.identities))
+
+    def testSavingForgetsObject(self):
+        layer = self.cat.get_layers()[0]
+        layer.enabled = False
+        self.cat.save(layer)
+        self.assertIsNone(self.cat.identities.get(layer.href))
+
+    def testDeletingForgetsSubtree(self):
+        store = self.cat.get_stores(workspaces="ws1")[0]
+        resource = store.get_resources()[0]
+        self.assertIsNotNone(self.cat.identities.get(resource.href))
+        self.cat.delete(store, recurse=True)
+        self.assertIsNone(self.cat.identities.get(resource.href))
+
+    def testCacheChanges(self):
+        layer = self.cat.get_layers()[0]
+        url = "%s/layers/%s.json" % (self.server.url, layer.name)
+        self.assertEqual("point", layer.default_style.name)
+        del layer
+        # the document goes with its cache entry, the object is kept to read the new one
+        self.cat._cache.pop(url)
+        gc.collect()
+        self.assertIsNotNone(self.cat.identities.get("%s/layers/%s.xml" % (self.server.url, self.layers[0])))
+        self.cat.purge_cache()
+        self.assertEqual(0, len(self.cat.identities))
+
+    def testBounded(self):
+        self.cat._identities = IdentityMap(max_objects=2)
+        layers = self.cat.get_layers()
+        self.assertEqual(2, len(self.cat.identities))
+        self.assertIsNone(self.cat.identities.get(layers[0].href))
+        self.assertIsNotNone(self.cat.identities.get(layers[-1].href))
+
+
+class PrefetchTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1"], 1, 8)
+        for name in cls.layers:
+            href = "%s/workspaces/ws1/datastores/ws1_store0/featuretypes/%s.xml" % (cls.server.url, name)
+            cls.server.add("layers/%s.xml" % name,
+                           '<layer><name>%s</name><resource class="featureType"><name>ws1:%s</name>'
+                           '<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" href="%s"/>'
+                           '</resource></layer>' % (name, name, href))
+            cls.server.add("workspaces/ws1/datastores/ws1_store0/featuretypes/%s.xml" % name,
+                           "<featureType><name>%s</name><title>%s</title></featureType>" % (name, name.upper()))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = Catalog(self.server.url, cache_time=60, max_workers=4)
+
+    def tearDown(self):
+        self.server.delay = 0
+        self.server.recover("layers/%s.json" % self.layers[3])
+
+    def testConcurrent(self):
+        layers = self.cat.get_layers()
+        self.server.delay = 0.1
+        start = time.time()
+        self.assertEqual([], self.cat.prefetch(layers))
+        self.assertLess(time.time() - start, 0.1 * len(layers) / 2)
+        self.assertEqual(4, self.server.peak)
+        requests = self.server.count()
+        self.assertEqual(self.layers, [l.name for l in layers if l.dom is not None])
+        self.cat.prefetch(layers)
+        self.assertEqual(requests, self.server.count())
+
+    def testFields(self):
+        layers = self.cat.get_layers()
+        self.cat.prefetch(layers, ["resource"])
+        requests = self.server.count()
+        self.assertEqual([n.upper() for n in self.layers], [l.resource.title for l in layers])
+        self.assertEqual(requests, self.server.count())
+
+    def testPartialFailure(self):
+        layers = self.cat.get_layers()
+        self.server.fail("layers/%s.json" % self.layers[3], 404, "No such layer")
+        failed = self.cat.prefetch(layers, ["resource"])
+        self.assertEqual([layers[3]], [obj for obj, error in failed])
+        self.assertIsInstance(failed[0][1], FailedRequestError)
+        self.assertEqual(7, len([l for l in layers if l is not layers[3] and l.resource.dom is not None]))
+        self.assertRaises(FailedRequestError, lambda: layers[3].resource)
+
+    def testPrefetchedInBatches(self):
+        prefetched = self.cat.prefetched(self.cat.iter_layers(), batch=3)
+        self.assertEqual(self.layers, [l.name for l in prefetched if l.dom is not None])
+
+    def testResourcesFoundThroughTheIndex(self):
+        # resource hrefs the index does not understand make it list the
+        # resources of their workspace, a fan-out within the fan-outs
+        server = RestStandIn()
+        try:
+            layers = addCatalog(server, ["ws1", "ws2"], 2, 2)
+            for name in layers:
+                ws, store = name.split("_")[0], name.rsplit("_", 1)[0]
+                server.add("workspaces/%s/datastores/%s/featuretypes/%s.xml" % (ws, store, name),
+                           "<featureType><name>%s</name></featureType>" % name)
+                href = "%s/workspaces/%s/elsewhere/%s.xml" % (server.url, ws, name)
+                server.add("layers/%s.xml" % name,
+                           '<layer><name>%s</name><resource class="featureType"><name>%s</name>'
+                           '<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" href="%s"/>'
+                           '</resource></layer>' % (name, name, href))
+            cat = Catalog(server.url, cache_time=60, max_workers=2)
+            groups = [cat.get_layers()[i::2] for i in range(2)]
+            def prefetch(group):
+                cat.prefetch(group, ["resource"])
+                return [layer.resource.name for layer in group]
+            found = []
+            thread = threading.Thread(target=lambda: found.extend(cat.fan_out(prefetch, groups)))
+            thread.daemon = True
+            thread.start()
+            thread.join(10)
+            self.assertFalse(thread.is_alive(), "waiting for the threads of the pool")
+            self.assertEqual(sorted(layers), sorted(sum(found, [])))
+        finally:
+            server.stop()
+
+
+FEATURE_TYPE = (
+    '<featureType><name>roads</name><title>Roads</title><enabled>true</enabled>'
+    '<nativeBoundingBox><minx>-180.0</minx><maxx>180.0</maxx><miny>-90.0</miny><maxy>90.0</maxy>'
+    '<crs class="projected">EPSG:4326</crs></nativeBoundingBox>'
+    '<keywords><string>roads</string><string>transport</string></keywords>'
+    '<metadata><entry key="cachingEnabled">false</entry></metadata>'
+    '<attributes><attribute><name>the_geom</name></attribute></attributes>'
+    '<store class="dataStore"><name>ws:store</name><atom:link xmlns:atom="http://www.w3.org/2005/Atom" '
+    'rel="alternate" href="%s/workspaces/ws/datastores/store.xml" type="application/xml"/></store>'
+    '</featureType>')
+
+
+class JsonCodecTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("workspaces/ws/featuretypes/roads.xml", FEATURE_TYPE % cls.server.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+
+    def featureType(self, codec):
+        cat = Catalog(self.server.url, cache_time=60, codec=codec)
+        return FeatureType(cat, None, None, None, href="%s/workspaces/ws/featuretypes/roads.xml" % self.server.url)
+
+    def testSameProperties(self):
+        xml, js = self.featureType("xml"), self.featureType("json")
+        for name in ("title", "enabled", "native_bbox", "keywords", "metadata", "attributes"):
+            self.assertEqual(getattr(xml, name), getattr(js, name))
+        self.assertEqual(("-180.0", "180.0", "-90.0", "90.0", "EPSG:4326"), js.native_bbox)
+        self.assertEqual("store", js.store.name)
+        self.assertEqual(1, self.server.count("workspaces/ws/featuretypes/roads.json"))
+        self.assertEqual(1, self.server.count("workspaces/ws/featuretypes/roads.xml"))
+
+    def testListing(self):
+        content = xmlToJson(listingXml("layers", "layer", ["a", "b"]))
+        self.assertEqual([("a", None), ("b", None)], list(JSON_CODEC.listing(content, "layer")))
+        self.assertEqual([], list(JSON_CODEC.listing('{"layers": ""}', "layer")))
+
+    def testHrefElement(self):
+        layer = JSON_CODEC.parse('{"layer": {"attribution": {"href": "http://example.com", "logoWidth": 10}, '
+                                 '"resource": {"@class": "featureType", "href": "http://example.com/ft.json"}}}')
+        self.assertEqual("http://example.com", layer.findtext("attribution/href"))
+        self.assertEqual("10", layer.findtext("attribution/logoWidth"))
+        resource = layer.find("resource")
+        self.assertEqual("featureType", resource.get("class"))
+        self.assertEqual(["http://example.com/ft.xml"], [n.get("href") for n in resource if "href" in n.attrib])
+
+    def testInvalidationDropsJson(self):
+        ft = self.featureType("json")
+        ft.fetch()
+        url = "%s/workspaces/ws/featuretypes/roads.json" % self.server.url
+        self.assertIn(url, ft.catalog._cache)
+        ft.catalog.invalidate(ft)
+        self.assertNotIn(url, ft.catalog._cache)
+
+    def testFallsBackToXml(self):
+        self.server.add("workspaces/ws/featuretypes/roads.json", "<html>Not here</html>")
+        try:
+            ft = self.featureType("json")
+            self.assertEqual("Roads", ft.title)
+            self.assertIs(XML_CODEC, ft.catalog.codec)
+        finally:
+            del self.server.documents["/geoserver/rest/workspaces/ws/featuretypes/roads.json"]
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(ResponseCacheTests, 'test'))
+    suite.addTests(unittest.makeSuite(InvalidationTests, 'test'))
+    suite.addTests(unittest.makeSuite(DiskCacheTests, 'test'))
+    suite.addTests(unittest.makeSuite(CatalogIndexTests, 'test'))
+    suite.addTests(unittest.makeSuite(StyleResolutionTests, 'test'))
+    suite.addTests(unittest.makeSuite(NamespacingTests, 'test'))
+    suite.addTests(unittest.makeSuite(LayerResourceTests, 'test'))
+    suite.addTests(unittest.makeSuite(WorkspaceListingTests, 'test'))
+    suite.addTests(unittest.makeSuite(FanOutTests, 'test'))
+    suite.addTests(unittest.makeSuite(ConnectionPoolTests, 'test'))
+    suite.addTests(unittest.makeSuite(RetryTests, 'test'))
+    suite.addTests(unittest.makeSuite(SingleFlightTests, 'test'))
+    suite.addTests(unittest.makeSuite(ThreadSafetyTests, 'test'))
+    suite.addTests(unittest.makeSuite(SchedulerTests, 'test'))
+    suite.addTests(unittest.makeSuite(RateLimitTests, 'test'))
+    suite.addTests(unittest.makeSuite(CatalogRegistryTests, 'test'))
+    suite.addTests(unittest.makeSuite(AsyncCatalogTests, 'test'))
+    suite.addTests(unittest.makeSuite(StreamingListingTests, 'test'))
+    suite.addTests(unittest.makeSuite(JsonCodecTests, 'test'))
+    suite.addTests(unittest.makeSuite(CompactObjectTests, 'test'))
+    suite.addTests(unittest.makeSuite(IdentityMapTests, 'test'))
+    suite.addTests(unittest.makeSuite(PrefetchTests, 'test'))
+    return suite
+
+# run all tests using unittest skipping nose or testplugin
+def run_all():
+    unittest.TextTestRunner(verbosity=3, stream=sys.stdout).run(suite())
@@ -14,6 +14,9 @@ from geoserverexplorer.test.deletetests import suite as deleteSuite
 from geoserverexplorer.test.dragdroptests import suite as dragdropSuite
 from geoserverexplorer.test.guitests import suite as guiSuite
 from geoserverexplorer.test.symbologytests import suite as symbologySuite
+from geoserverexplorer.test.gsconfigtests import suite as gsconfigSuite
+from geoserverexplorer.test.benchmarks import suite as benchmarksSuite
+from geoserverexplorer.test.transporttests import suite as transportSuite
 
 # Tests for the QGIS Tester plugin. To know more see
 # https://github.com/boundlessgeo/qgis-tester-plugin
@@ -54,6 +57,9 @@ def unitTests():
     _tests.extend(dragdropSuite())
     _tests.extend(guiSuite())
     _tests.extend(symbologySuite())
+    _tests.extend(gsconfigSuite())
+    _tests.extend(transportSuite())
+    _tests.extend(benchmarksSuite())
     return _tests
 
 def settings():
@@ -70,4 +76,7 @@ def runAllUnitTests():
     suite.addTest(dragdropSuite())
     suite.addTest(guiSuite())
     suite.addTest(symbologySuite())
+    suite.addTest(gsconfigSuite())
+    suite.addTest(transportSuite())
+    suite.addTest(benchmarksSuite())
     unittest.TextTestRunner(verbosity=3, stream=sys.stdout).run(suite)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# (c) 2016 Boundless, http://boundlessgeo.com
+# This code is licensed under the GPL 2.0 license.
+#
+'''
+Tests of the QgsNetworkAccessManager transport and of the AuthCatalog
+requests made through it, against a local stand-in of the REST API. They
+need QGIS, and run its event loop.
+'''
+
+import unittest
+import pickle
+import sys
+import threading
+import time
+import requests
+from geoserver.catalog import FailedRequestError, CircuitOpenError, DeadlineExceeded
+from geoserver.ratelimit import RateLimiter
+from geoserver.retry import RetryPolicy
+from geoserver.scheduler import RequestScheduler, priority, BULK, INTERACTIVE
+from geoserverexplorer.geoserver.auth import AuthCatalog
+from geoserverexplorer.geoserver.transport import NetworkTransport
+from geoserverexplorer.test.gsconfigtests import RestStandIn, addCatalog, workspacesXml
+
+
+class NetworkTransportTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.server.add("workspaces.xml", workspacesXml(["a", "b"]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.transport = NetworkTransport(limit=2)
+
+    def tearDown(self):
+        self.server.delay = 0
+
+    def testRequest(self):
+        resp = self.transport.wait(self.transport.request("%s/workspaces.xml" % self.server.url))
+        self.assertEqual(200, resp.status_code)
+        self.assertIn(b"<name>a</name>", resp.content)
+        self.assertIn("ETag", resp.headers)
+
+    def testHttpErrorIsAResponse(self):
+        resp = self.transport.wait(self.transport.request("%s/nowhere.xml" % self.server.url))
+        self.assertEqual(404, resp.status_code)
+        self.assertFalse(resp.ok)
+
+    def testRequestsInFlightAreLimited(self):
+        self.server.delay = 0.2
+        futures = [self.transport.request("%s/workspaces.xml" % self.server.url) for _ in range(6)]
+        for future in futures:
+            self.assertEqual(200, self.transport.wait(future).status_code)
+        self.assertEqual(2, self.server.peak)
+
+    def testNoAnswerIsAConnectionError(self):
+        future = self.transport.request("http://127.0.0.1:1/geoserver/rest/workspaces.xml")
+        self.assertRaises(requests.exceptions.ConnectionError, self.transport.wait, future)
+
+    def testWaitAbortsAfterTimeout(self):
+        self.server.delay = 2
+        future = self.transport.request("%s/workspaces.xml" % self.server.url)
+        start = time.time()
+        self.assertRaises(requests.exceptions.Timeout, self.transport.wait, future, 0.2)
+        self.assertLess(time.time() - start, 1)
+
+    def testLaterAndSoon(self):
+        calls = []
+        self.server.delay = 0.3
+        answered = self.transport.request("%s/workspaces.xml" % self.server.url)
+        self.transport.later(0.1, lambda: calls.append("later"))
+        # posted from another thread, run in this one
+        thread = threading.Thread(target=lambda: self.transport.soon(lambda: calls.append(threading.current_thread())))
+        thread.start()
+        thread.join()
+        self.transport.wait(answered)
+        self.assertEqual([threading.current_thread(), "later"], calls)
+
+
+class AuthCatalogRequestTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RestStandIn()
+        cls.layers = addCatalog(cls.server, ["ws1", "ws2"], 2, 2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cat = AuthCatalog(self.server.url, None, 60)
+        self.cat.retry = RetryPolicy(attempts=2, backoff=0.05)
+        self.url = "%s/workspaces.xml" % self.server.url
+
+    def tearDown(self):
+        self.server.delay = 0
+        self.server.recover("workspaces.xml")
+
+    def testAsyncRequestIsScheduled(self):
+        with priority(INTERACTIVE):
+            future = self.cat.http_request_async(self.url)
+        self.assertEqual(200, self.cat.result(future).status_code)
+        self.assertEqual(1, self.cat.scheduler.stats()[INTERACTIVE]["granted"])
+        self.assertEqual(0, self.cat.scheduler.stats()[INTERACTIVE]["running"])
+
+    def testAsyncRequestIsRetried(self):
+        self.server.fail("workspaces.xml", 503, "Busy", times=1)
+        self.assertEqual(200, self.cat.result(self.cat.http_request_async(self.url)).status_code)
+        self.assertEqual(2, self.server.count("workspaces.xml"))
+
+    def testAsyncRequestFailsFastWhileBreakerIsOpen(self):
+        self.server.fail("workspaces.xml", 500, "Broken")
+        for _ in range(self.cat.breaker.threshold):
+            self.cat.result(self.cat.http_request_async(self.url))
+        sent = self.server.count()
+        self.assertRaises(CircuitOpenError, self.cat.result, self.cat.http_request_async(self.url))
+        self.assertEqual(sent, self.server.count())
+
+    def testAsyncRequestHasADeadline(self):
+        self.server.delay = 2
+        start = time.time()
+        with self.cat.deadline(0.3):
+            future = self.cat.http_request_async(self.url)
+        self.assertRaises(FailedRequestError, self.cat.result, future)
+        self.assertLess(time.time() - start, 1.5)
+
+    def testBulkAsyncRequestsAreRateLimited(self):
+        self.cat.limiter = RateLimiter(rate=10, adaptive=False)
+        start = time.time()
+        with priority(BULK):
+            futures = [self.cat.http_request_async(self.url) for _ in range(15)]
+        for future in futures:
+            self.cat.result(future)
+        self.assertGreater(time.time() - start, 0.4)
+        self.assertGreater(self.cat.limiter.stats()["throttled"], 0)
+
+    def testQueuedRequestExpires(self):
+        self.cat.scheduler = RequestScheduler(slots=1)
+        self.cat.scheduler.acquire(BULK)
+        try:
+            with priority(BULK), self.cat.deadline(0.2):
+                future = self.cat.http_request_async(self.url)
+            self.assertRaises(DeadlineExceeded, self.cat.result, future)
+        finally:
+            self.cat.scheduler.release(BULK)
+        self.assertEqual(0, self.cat.scheduler.stats()[BULK]["waiting"])
+
+    def testSettingsAndPickling(self):
+        cat = AuthCatalog(self.server.url, None, 60, max_requests=3, timeout=5)
+        self.assertEqual(3, cat.scheduler.slots)
+        self.assertEqual(5, cat.timeout)
+        copy = pickle.loads(pickle.dumps(cat))
+        self.assertEqual(3, copy.scheduler.slots)
+        self.assertEqual(200, copy.http_request(self.url).status_code)
+
+    def testFanOutRunsInTheCallingThread(self):
+        self.server.delay = 0.1
+        threads = set()
+        def fetch(url):
+            threads.add(threading.current_thread())
+            return self.cat.get_content(url)
+        urls = ["%s/workspaces/%s/datastores.xml" % (self.server.url, ws) for ws in ["ws1", "ws2"]]
+        urls.append("%s/nowhere.xml" % self.server.url)
+        self.assertRaises(FailedRequestError, self.cat.fan_out, fetch, urls)
+        self.assertEqual(set([threading.current_thread()]), threads)
+        self.assertEqual(3, self.server.peak)
+        contents = self.cat.fan_out(fetch, urls[:2])
+        self.assertIn(b"ws1_store0", contents[0])
+        self.assertEqual(1, self.server.count("workspaces/ws1/datastores.xml"))
+
+    def testListingWithoutPoolThreads(self):
+        layers = self.cat.get_layers()
+        self.assertEqual(len(self.layers), len(layers))
+        self.assertIsNone(getattr(self.cat, "_pool", None))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(NetworkTransportTests, 'test'))
+    suite.addTests(unittest.makeSuite(AuthCatalogRequestTests, 'test'))
+    return suite
+
+# run all tests using unittest skipping nose or testplugin
+def run_all():
+    unittest.TextTestRunner(verbosity=3, stream=sys.stdout).run(suite())
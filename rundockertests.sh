@@ -22,6 +22,9 @@ $DOCKER_RUN_COMMAND "DISPLAY=:0 qgis_testrunner.sh geoserverexplorer.test.catalo
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.deletetests"
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.guitests"
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.dragdroptests"
+$DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.gsconfigtests"
+$DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.transporttests"
+$DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.benchmarks"
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.pkicatalogtests"
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.pkideletetests"
 $DOCKER_RUN_COMMAND "qgis_testrunner.sh geoserverexplorer.test.pkiguitests"